@@ -2,6 +2,7 @@ import pandas as pd
 import networkx as nx
 import community.community_louvain as community_louvain # Requiere: pip install python-louvain
 from neo4j import GraphDatabase, basic_auth
+from src.graph_metrics import betweenness_centrality
 
 # --- TUS CREDENCIALES ---
 URI = "neo4j://127.0.0.1:7687"
@@ -37,7 +38,18 @@ class KanishAnalyst:
         print(f"✅ Grafo cargado en memoria: {G.number_of_nodes()} nodos, {G.number_of_edges()} conexiones.")
         return G
 
-    def ejecutar_algoritmos_sna(self, G):
+    def obtener_particion_previa(self):
+        """
+        Comunidades ya guardadas en Neo4j (ejecución anterior), para arrancar Louvain en caliente.
+        """
+        query = """
+        MATCH (p:Person) WHERE p.community_louvain IS NOT NULL
+        RETURN p.id AS id, p.community_louvain AS community
+        """
+        with self.driver.session() as session:
+            return {r["id"]: r["community"] for r in session.run(query)}
+
+    def ejecutar_algoritmos_sna(self, G, modo="auto", epsilon=0.05, particion_previa=None):
         """
         Aplica matemáticas de grafos para encontrar VIPs y Comunidades.
         """
@@ -45,11 +57,22 @@ class KanishAnalyst:
         
         # 1. Betweenness Centrality (Quién controla el flujo de información/dinero)
         # Nos dice quién es el intermediario clave.
-        betweenness = nx.betweenness_centrality(G)
+        # Exacto en paralelo para grafos pequeños; con pivotes muestreados (error <= epsilon) si es grande.
+        betweenness = betweenness_centrality(G, mode=modo, epsilon=epsilon)
         
         # 2. Algoritmo de Louvain (Detección de Comunidades)
         # Agrupa a las personas en "Familias" o "Clanes" comerciales.
-        partition = community_louvain.best_partition(G)
+        # Con partición previa: arranque en caliente (los nodos nuevos empiezan en su propia comunidad)
+        inicial = None
+        if particion_previa:
+            siguiente = max(particion_previa.values()) + 1
+            inicial = {}
+            for nodo in G:
+                if nodo in particion_previa:
+                    inicial[nodo] = particion_previa[nodo]
+                else:
+                    inicial[nodo], siguiente = siguiente, siguiente + 1
+        partition = community_louvain.best_partition(G, partition=inicial)
         
         print("   > Centralidad calculada.")
         print(f"   > Comunidades detectadas: {len(set(partition.values()))}")
@@ -95,7 +118,7 @@ if __name__ == "__main__":
     
     if Grafo:
         # 2. Calcular matemáticas
-        scores, comunidades = analista.ejecutar_algoritmos_sna(Grafo)
+        scores, comunidades = analista.ejecutar_algoritmos_sna(Grafo, particion_previa=analista.obtener_particion_previa())
         
         # 3. Guardar en BD
         analista.actualizar_neo4j(scores, comunidades)
@@ -3,6 +3,6 @@
 # Exponemos las clases principales para facilitar la importación
 # desde el script principal (main_pipeline.py)
 
-from .data_loader import DataLoader
+# from .data_loader import DataLoader  <-- data_loader.py todavía no define DataLoader (rompía 'import src' y pytest)
 from .preprocessing import KanishTokenizer
 # from .gematria_registry import GematriaRegistry  <-- Descomenta cuando añadas el archivo del turno anterior
\ No newline at end of file
@@ -1,41 +1,179 @@
+import csv
+import json
+import re
+import sys
+import time
+from functools import lru_cache
+
+# Delimitadores entre signos de una palabra: "KÙ.BABBAR" -> KÙ + BABBAR, "a-šur" -> a + šur
+SIGN_SPLIT = re.compile(r'[.\-]+')
+# Cifras (enteras o decimales) son un único signo: "0.33333 ma-na", "1.5 GÍN.TA"
+NUMBER_WORD = re.compile(r'^\d+(?:\.\d+)?$')
+# Frontera entre palabras: sólo se cruza si la forma del léxico también tiene un espacio ahí
+WORD_BREAK = " "
+# Tipos del léxico eBL -> tipos que entiende el Reconstructor
+LEXICON_TYPES = {"PN": "PERSON", "GN": "LOC", "word": "WORD"}
+BROKEN_TOKENS = {"[BROKEN]", "<BROKEN>"}
+_TERMINAL = None  # Clave de fin de palabra en los nodos del trie (ningún signo es None)
+
+@lru_cache(maxsize=65536)
+def _is_numeric(token):
+    return isinstance(token, str) and token.replace('.', '', 1).isdigit()
+
 class CapeParser:
-    def __init__(self, cipher_data):
+    def __init__(self, cipher_data, lexicon_path=None):
         self.registry = cipher_data['registry']
-        
+        # Reglas de polivalencia compiladas una sola vez (tablas de despacho)
+        self._compile_rules()
+        # Trie de signos para el modo longest-match (registro + formas del léxico eBL)
+        self.trie = self._build_trie(lexicon_path)
+
+    def _build_trie(self, lexicon_path=None):
+        """
+        Prefijo de secuencias de signos -> entrada. El registro tiene prioridad sobre el léxico
+        cuando ambos definen la misma forma.
+        """
+        trie = {}
+
+        def insert(form, entry):
+            node = trie
+            for sign in self.to_signs(form.split()):
+                node = node.setdefault(sign, {})
+            if node is trie:
+                return
+            current = node.get(_TERMINAL)
+            # Formas homógrafas del léxico: la palabra común gana al nombre propio (ma-na = mina)
+            if current is None or (isinstance(current, dict) and current["type"] != "WORD" and entry["type"] == "WORD"):
+                node[_TERMINAL] = entry
+
+        for key in self.registry:
+            insert(key, key)  # Se resuelve contra el registro al parsear (polivalencia)
+
+        if lexicon_path:
+            try:
+                with open(lexicon_path, mode='r', encoding='utf-8') as f:
+                    for row in csv.DictReader(f):
+                        form = row.get('form')
+                        if form:
+                            insert(form, {
+                                "type": LEXICON_TYPES.get(row.get('type'), "WORD"),
+                                "val": form,
+                                "english": row.get('norm') or row.get('lexeme') or form,
+                                "lexeme": row.get('lexeme')
+                            })
+            except FileNotFoundError:
+                print(f"⚠️ No se encontró el léxico {lexicon_path}; trie sólo con el registro.")
+        return trie
+
+    @staticmethod
+    def to_signs(words):
+        """Palabras -> secuencia de signos, con WORD_BREAK entre palabras."""
+        signs = []
+        for word in words:
+            if signs:
+                signs.append(WORD_BREAK)
+            if NUMBER_WORD.match(word):
+                signs.append(word)
+            else:
+                signs.extend(s for s in SIGN_SPLIT.split(word) if s)
+        return signs
+
     def _is_numeric(self, token):
-        return token.replace('.', '', 1).isdigit()
+        return _is_numeric(token)
+
+    def _compile_rules(self):
+        """
+        Compila una vez las reglas de contexto del registro:
+          - static:   token no ambiguo -> entrada.
+          - by_prev:  (token, previo) -> candidato, para los tokens cuyas reglas sólo miran
+                      a la izquierda; con numeric_default/default como respaldo (O(1) por token).
+          - windows:  token -> [(cond_prev, cond_next, candidato)] para reglas con 'next'
+                      o 'window': [prev, next]. Se evalúan en orden, sin recorrer dicts.
+        Se conserva la semántica original: gana el PRIMER candidato cuya regla se cumple.
+        """
+        self.static, self.by_prev, self.windows = {}, {}, {}
+        self.default, self.numeric_default = {}, {}
+
+        for token, candidates in self.registry.items():
+            if not isinstance(candidates, list):
+                self.static[token] = candidates
+                continue
+            self.default[token] = candidates[0]
+
+            conditions = []
+            for candidate in candidates:
+                rule = candidate.get('rule') or {}
+                cond_prev, cond_next = rule.get('prev'), rule.get('next')
+                if 'window' in rule:
+                    cond_prev, cond_next = rule['window']
+                if cond_prev is None and cond_next is None:
+                    continue  # Sin condición reconocida: nunca gana por regla
+                conditions.append((cond_prev, cond_next, candidate))
+
+            if any(cond_next is not None for _, cond_next, _ in conditions):
+                self.windows[token] = conditions
+                continue
 
-    def _resolve_ambiguity(self, token_key, prev_token):
+            # Sólo contexto izquierdo: tabla (token, previo) respetando el orden de candidatos
+            first_numeric = next((k for k, (p, _, _) in enumerate(conditions) if p == "NUMERIC"), None)
+            self.numeric_default[token] = candidates[0] if first_numeric is None else conditions[first_numeric][2]
+            for k in range(len(conditions) - 1, -1, -1):  # En orden inverso: el primero que cumple gana
+                cond_prev, _, candidate = conditions[k]
+                # Un literal numérico sólo gana si va antes que la primera regla NUMERIC
+                if first_numeric is not None and first_numeric < k and _is_numeric(cond_prev):
+                    candidate = conditions[first_numeric][2]
+                self.by_prev[(token, cond_prev)] = candidate
+
+    @staticmethod
+    def _matches(condition, token):
+        return condition is None or condition == token or (condition == "NUMERIC" and _is_numeric(token))
+
+    def _resolve_ambiguity(self, token_key, prev_token, next_token=None):
         """
         Lógica: Deterministic Disambiguation
         Regla: If prev == "KÙ" then UD = "BABBAR"
+        Usa las tablas precompiladas en _compile_rules.
         """
+        entry = self.static.get(token_key)
+        if entry is not None:
+            return entry
+
+        conditions = self.windows.get(token_key)
+        if conditions is not None:
+            for cond_prev, cond_next, candidate in conditions:
+                if self._matches(cond_prev, prev_token) and self._matches(cond_next, next_token):
+                    return candidate
+            return self.default[token_key]
+
+        entry = self.by_prev.get((token_key, prev_token))
+        if entry is not None:
+            return entry
+        # Fallback por defecto (el primero de la lista, o la primera regla NUMERIC si aplica)
+        if _is_numeric(prev_token):
+            return self.numeric_default[token_key]
+        return self.default[token_key]
+
+    def _resolve_by_walk(self, token_key, prev_token):
+        """Resolución original (recorre las reglas en cada aparición). Referencia para el benchmark."""
         candidates = self.registry[token_key]
-        
-        # Si no es una lista, no es ambiguo
         if not isinstance(candidates, list):
             return candidates
-
-        # Lógica de resolución de polivalencia
         for candidate in candidates:
             rule = candidate.get('rule')
             if not rule: continue
-            
-            condition_met = False
-            
-            # Regla de Precedencia (Contexto Izquierdo)
             if 'prev' in rule:
                 expected = rule['prev']
-                if expected == "NUMERIC" and self._is_numeric(prev_token):
+                if expected == "NUMERIC" and _is_numeric(prev_token):
                     return candidate
                 if expected == prev_token:
                     return candidate
-        
-        # Fallback por defecto (el primero de la lista)
         return candidates[0]
 
-    def parse_sequence(self, tokens):
+    def parse_sequence(self, tokens, longest_match=False):
         """Algoritmo de Ventana Deslizante"""
+        if longest_match:
+            return self.parse_signs(self.to_signs(tokens))
+
         parsed_sequence = []
         
         for i, token in enumerate(tokens):
@@ -56,8 +194,123 @@ class CapeParser:
 
             # Resolución Contextual
             prev_val = tokens[i-1] if i > 0 else None
-            resolved_obj = self._resolve_ambiguity(token, prev_val)
+            next_val = tokens[i+1] if i + 1 < len(tokens) else None
+            resolved_obj = self._resolve_ambiguity(token, prev_val, next_val)
             
             parsed_sequence.append(resolved_obj)
             
-        return parsed_sequence
\ No newline at end of file
+        return parsed_sequence
+
+    def parse_signs(self, signs):
+        """
+        Modo longest-match: segmenta y resuelve en una pasada sobre los signos.
+        En cada posición se baja por el trie tanto como se pueda y se toma la última
+        forma completa encontrada (la más larga).
+        """
+        parsed_sequence = []
+        trie = self.trie
+        prev_start = prev_end = 0  # Segmento previo (el texto sólo se arma si hay que resolver)
+        i, n = 0, len(signs)
+
+        while i < n:
+            node, j = trie, i
+            match, match_end = None, i
+            while j < n:
+                node = node.get(signs[j])
+                if node is None:
+                    break
+                j += 1
+                if _TERMINAL in node:
+                    match, match_end = node[_TERMINAL], j
+
+            sign = signs[i]
+            if match is None:
+                if sign == WORD_BREAK:
+                    i += 1
+                    continue
+                if sign in BROKEN_TOKENS:
+                    parsed_sequence.append({"status": "CORRUPT", "prime": -1, "english": "[...]"})
+                elif self._is_numeric(sign):
+                    parsed_sequence.append({"type": "NUM", "val": sign, "english": sign})
+                else:
+                    parsed_sequence.append({"status": "QUARANTINE", "token": f"UNK_{i}", "english": "???"})
+                prev_start, prev_end = i, i + 1
+                i += 1
+                continue
+
+            # Claves del registro: resolución contextual igual que en parse_sequence
+            if isinstance(match, str):
+                prev_val = '.'.join(signs[prev_start:prev_end]).replace('.' + WORD_BREAK + '.', WORD_BREAK) or None
+                k = match_end + 1 if match_end < n and signs[match_end] == WORD_BREAK else match_end
+                match = self._resolve_ambiguity(match, prev_val, signs[k] if k < n else None)
+            parsed_sequence.append(match)
+            prev_start, prev_end = i, match_end
+            i = match_end
+
+        return parsed_sequence
+
+    def parse_text(self, text):
+        """Tablilla completa (transliteración) -> vector parseado por longest-match."""
+        if not isinstance(text, str):
+            text = ""
+        return self.parse_signs(self.to_signs(text.split()))
+
+# --- BENCHMARK ---
+
+def benchmark_parser(cipher_path="master_cipher.json", lexicon_path="OA_Lexicon_eBL.csv", csv_path="train.csv"):
+    """Cobertura y velocidad: tokens sueltos contra el registro vs longest-match con el léxico."""
+    with open(cipher_path, 'r', encoding='utf-8') as f:
+        cipher = json.load(f)
+    with open(csv_path, mode='r', encoding='utf-8') as f:
+        texts = [row.get('transliteration') or "" for row in csv.DictReader(f)]
+
+    t0 = time.perf_counter()
+    parser = CapeParser(cipher, lexicon_path)
+    t_build = time.perf_counter() - t0
+    print(f"--- ⏱️ BENCHMARK CAPE PARSER ({len(texts)} tablillas, trie en {t_build:.3f}s) ---")
+
+    for label, parse in (("registro (tokens)", lambda t: parser.parse_sequence(t.split())),
+                         ("longest-match", parser.parse_text)):
+        t0 = time.perf_counter()
+        vectors = [parse(t) for t in texts]
+        elapsed = time.perf_counter() - t0
+        total = sum(len(v) for v in vectors)
+        quarantine = sum(1 for v in vectors for item in v if item.get("status") == "QUARANTINE")
+        print(f"   {label:<18} {len(texts) / elapsed:>8.0f} tablillas/s | "
+              f"{total} segmentos, {quarantine / max(total, 1):.1%} en QUARANTINE")
+
+def benchmark_resolution(cipher_path="master_cipher.json", n_tokens=200000, seed=7):
+    """
+    Resolución de polivalencia: tablas precompiladas vs recorrido de reglas original.
+    Secuencia sintética cargada de tokens ambiguos (mismo resultado verificado en cada posición).
+    """
+    import random
+    with open(cipher_path, 'r', encoding='utf-8') as f:
+        parser = CapeParser(json.load(f))
+
+    rng = random.Random(seed)
+    vocab = list(parser.registry) + ["5", "12", "1.5", "a-na", "šu-ma", "[BROKEN]"]
+    ambiguous = [t for t in parser.registry if isinstance(parser.registry[t], list)] or vocab
+    tokens = [rng.choice(ambiguous) if rng.random() < 0.5 else rng.choice(vocab) for _ in range(n_tokens)]
+    pairs = [(t, tokens[i - 1] if i else None) for i, t in enumerate(tokens) if t in parser.registry]
+
+    for token, prev in pairs:
+        if token not in parser.windows:
+            assert parser._resolve_ambiguity(token, prev) is parser._resolve_by_walk(token, prev), (token, prev)
+
+    print(f"--- ⏱️ BENCHMARK POLIVALENCIA ({len(pairs)} resoluciones, {len(ambiguous)} tokens ambiguos) ---")
+    for label, resolve in (("recorrido original", parser._resolve_by_walk),
+                           ("tablas compiladas", parser._resolve_ambiguity)):
+        t0 = time.perf_counter()
+        for token, prev in pairs:
+            resolve(token, prev)
+        elapsed = time.perf_counter() - t0
+        print(f"   {label:<18} {len(pairs) / elapsed:>10.0f} resoluciones/s")
+
+    t0 = time.perf_counter()
+    parser.parse_sequence(tokens)
+    print(f"   parse_sequence     {len(tokens) / (time.perf_counter() - t0):>10.0f} tokens/s")
+
+if __name__ == "__main__":
+    benchmark_parser(*sys.argv[1:4])
+    benchmark_resolution(*sys.argv[1:2])
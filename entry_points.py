@@ -1,7 +1,117 @@
 import sys
 import os
+import multiprocessing as mp
+
+import pandas as pd
+
+# Añadir src al path
+sys.path.append(os.path.join(os.getcwd(), 'src'))
+
+from src.refinery_engine import RefineryEngine
+try:
+    from src.config import PATHS
+except ImportError:
+    # Fallback si no existe config.py aún (rutas de settings.json)
+    PATHS = {
+        "RAW_DATA": os.path.join("input", "raw_data"),
+        "OUTPUT_CLEAN": os.path.join("input", "processed", "preprocessing.csv")
+    }
+
+# Columnas candidatas en los CSV crudos (Kaggle / OARE)
+TEXT_COLUMNS = ['transliteration', 'text']
+ID_COLUMNS = ['oare_id', 'id', 'text_uuid', 'sentence_uuid']
+
+# --- STAGE: clean ---
+
+_ENGINE = None
+
+def _init_worker(profile):
+    global _ENGINE
+    _ENGINE = RefineryEngine(profile)
+
+def _refine_batch(texts):
+    return [_ENGINE.refine(t) for t in texts]
+
+def _row_hashes(texts, profile):
+    """Hash de contenido por fila (incluye el perfil: si cambian las reglas, se reprocesa)."""
+    salted = profile + '\x1f' + texts.fillna('').astype(str)
+    return pd.util.hash_pandas_object(salted, index=False).to_numpy()
+
+def run_clean_stage(inputs=None, output_path=None, profile="refinery",
+                    chunk_size=5000, workers=None, batch_size=500):
+    """
+    Limpieza incremental de los CSV crudos -> input/processed/preprocessing.csv.
+    Lee en bloques, reparte la Refinería en un pool de procesos y sólo reprocesa
+    las filas cuyo hash de contenido no estaba en la salida anterior.
+    """
+    inputs = inputs or [os.path.join(PATHS.get("RAW_DATA", "input/raw_data"), "train.csv")]
+    output_path = output_path or PATHS.get("OUTPUT_CLEAN", "input/processed/preprocessing.csv")
+    workers = workers or os.cpu_count() or 1
+    print(f"🧹 STAGE clean: {len(inputs)} archivo(s) -> {output_path} (perfil '{profile}', {workers} procesos)")
+
+    # Salida anterior: hash -> clean_text ya calculado
+    previous = {}
+    if os.path.exists(output_path):
+        prev_df = pd.read_csv(output_path, usecols=['row_hash', 'clean_text'], dtype={'row_hash': 'uint64'})
+        previous = dict(zip(prev_df['row_hash'], prev_df['clean_text'].fillna('')))
+        print(f"   > Salida previa: {len(previous)} filas reutilizables")
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    reused = processed = 0
+    header = True
+
+    with mp.get_context("fork").Pool(workers, initializer=_init_worker, initargs=(profile,)) as pool:
+        for path in inputs:
+            if not os.path.exists(path):
+                print(f"⚠️ No existe {path}, se omite.")
+                continue
+            for chunk in pd.read_csv(path, chunksize=chunk_size):
+                col_text = next((c for c in TEXT_COLUMNS if c in chunk.columns), None)
+                if col_text is None:
+                    print(f"⚠️ {path} no tiene columna de transliteración, se omite.")
+                    break
+                col_id = next((c for c in ID_COLUMNS if c in chunk.columns), None)
+
+                hashes = _row_hashes(chunk[col_text], profile)
+                clean = [previous.get(h) for h in hashes]
+                todo = [i for i, c in enumerate(clean) if c is None]
+
+                # Sólo las filas nuevas o modificadas pasan por el pool
+                texts = chunk[col_text].iloc[todo].tolist()
+                batches = [texts[s:s + batch_size] for s in range(0, len(texts), batch_size)]
+                refined = [t for batch in pool.map(_refine_batch, batches) for t in batch]
+                for i, text in zip(todo, refined):
+                    clean[i] = text
+                reused += len(clean) - len(todo)
+                processed += len(todo)
+
+                out = pd.DataFrame({
+                    'source': os.path.basename(path),
+                    'id': chunk[col_id].values if col_id else chunk.index.values,
+                    'transliteration': chunk[col_text].values,
+                    'clean_text': clean,
+                    'translation': chunk['translation'].values if 'translation' in chunk.columns else None,
+                    'row_hash': hashes
+                })
+                out.to_csv(tmp_path, mode='w' if header else 'a', header=header, index=False)
+                header = False
+
+    if header:
+        print("❌ No se generó ninguna fila.")
+        return
+    os.replace(tmp_path, output_path)
+    print(f"✅ preprocessing.csv listo: {processed} filas procesadas, {reused} reutilizadas.")
+
+STAGES = {
+    "clean": lambda args: run_clean_stage(inputs=args or None),
+}
 
 if __name__ == "__main__":
     print("--- KANISH ORCHESTRATOR ---")
-    print("Uso: python entry_points.py [clean|graph|train|infer]")
-    # Aquí iría la lógica de llamadas a los scripts de src/
+    if len(sys.argv) < 2 or sys.argv[1] not in STAGES:
+        print("Uso: python entry_points.py [clean|graph|train|infer]")
+        print("     python entry_points.py clean [raw1.csv raw2.csv ...]")
+        # Aquí iría la lógica de llamadas al resto de scripts de src/
+    else:
+        STAGES[sys.argv[1]](sys.argv[2:])
@@ -1,84 +1,255 @@
+import bisect
 import csv
+import hashlib
 import logging
-from typing import Dict, List, Optional
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import Counter
+from collections.abc import Mapping, MutableMapping
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Tokens neutros: no aportan valor al hash
+NEUTRAL_TOKENS = frozenset(["[DMG]", "[MISSING]", "[UNK]", "x"])
+# Tokens de valor 0 que NO cuentan como desconocidos en el hash ([UNK] sí se reporta)
+SILENT_TOKENS = frozenset(["[DMG]", "[MISSING]", "x"])
+
+# Snapshot binario: cabecera (magic, versión, nº tokens, sha256 del léxico, bytes de cadenas)
+SNAPSHOT_MAGIC = b"KGEM"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sII32sQ")
+SNAPSHOT_ALIGN = 64
+
+def lexicon_checksum(filepath: str) -> bytes:
+    """sha256 del fichero de léxico (el snapshot sólo es válido para ese léxico exacto)."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+class PrimeSieve:
+    """
+    Generador de primos por criba segmentada (Eratóstenes por bloques).
+    Crece bajo demanda: sólo se criba el siguiente segmento cuando hace falta.
+    """
+
+    def __init__(self, segment_size: int = 1 << 16):
+        self.segment_size = segment_size
+        self.primes = np.empty(0, dtype=np.int64)
+        self.limit = 1  # Todos los primos <= limit ya están en self.primes
+
+    @staticmethod
+    def _simple_sieve(n: int) -> np.ndarray:
+        """Criba clásica hasta n (sólo para los primos base de un segmento)."""
+        is_prime = np.ones(n + 1, dtype=bool)
+        is_prime[:2] = False
+        for p in range(2, math.isqrt(n) + 1):
+            if is_prime[p]:
+                is_prime[p * p::p] = False
+        return np.flatnonzero(is_prime).astype(np.int64)
+
+    def _sieve_segment(self):
+        # El segmento crece con el límite: el número de pasadas es logarítmico
+        lo = self.limit + 1
+        hi = lo + max(self.segment_size, self.limit)
+        root = math.isqrt(hi - 1)
+        base = self.primes[self.primes <= root] if self.limit >= root else self._simple_sieve(root)
+
+        segment = np.ones(hi - lo, dtype=bool)
+        for p in base.tolist():
+            start = max(p * p, -(-lo // p) * p)
+            segment[start - lo::p] = False
+        if lo < 2:
+            segment[:2 - lo] = False
+
+        self.primes = np.concatenate([self.primes, np.flatnonzero(segment) + lo])
+        self.limit = hi - 1
+
+    def ensure(self, count: int) -> np.ndarray:
+        """Garantiza al menos `count` primos y devuelve el array (orden ascendente)."""
+        while len(self.primes) < count:
+            self._sieve_segment()
+        return self.primes
+
+class SignMapView(Mapping):
+    """Vista de sólo lectura token -> primo, compatible con el antiguo dict sign_map."""
+
+    def __init__(self, registry: "GematriaRegistry"):
+        self._registry = registry
+
+    def __getitem__(self, token: str) -> int:
+        return int(self._registry.primes[self._registry.token_index[token]])
+
+    def __contains__(self, token) -> bool:
+        return token in self._registry.token_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._registry.token_index)
+
+    def __len__(self) -> int:
+        return len(self._registry.token_index)
+
+class _SortedKeys:
+    """Secuencia de las claves UTF-8 ordenadas del snapshot (para bisect, sin decodificar todo)."""
+
+    def __init__(self, mm, offsets, blob_start: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._blob_start = blob_start
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        base = self._blob_start
+        return self._mm[base + self._offsets[i]:base + self._offsets[i + 1]]
+
+class SnapshotIndex(MutableMapping):
+    """
+    Índice token -> posición respaldado por un snapshot en mmap (modo lazy de from_snapshot).
+    La tabla de cadenas ordenada se consulta por búsqueda binaria (bisect) y los tokens
+    nuevos van a un dict superpuesto (overlay); el fichero nunca se modifica.
+    Coste: abrir es inmediato, pero cada búsqueda es ~15x la de un dict (35k tokens del eBL).
+    """
+
+    def __init__(self, mm, offsets, order, blob_start: int):
+        self._keys = _SortedKeys(mm, offsets, blob_start)
+        self._order = order
+        self._size = len(order)
+        self.overlay: Dict[str, int] = {}
+
+    def _find(self, token) -> Optional[int]:
+        if not isinstance(token, str):
+            return None
+        key = token.encode("utf-8")
+        pos = bisect.bisect_left(self._keys, key)
+        if pos < self._size and self._keys[pos] == key:
+            return self._order[pos]
+        return None
+
+    def __getitem__(self, token: str) -> int:
+        idx = self.overlay.get(token)
+        if idx is None:
+            idx = self._find(token)
+            if idx is None:
+                raise KeyError(token)
+        return idx
+
+    def get(self, token, default=None):
+        idx = self.overlay.get(token)
+        if idx is None:
+            idx = self._find(token)
+        return default if idx is None else idx
+
+    def __contains__(self, token) -> bool:
+        return token in self.overlay or self._find(token) is not None
+
+    def __setitem__(self, token: str, idx: int):
+        self.overlay[token] = idx
+
+    def __delitem__(self, token: str):
+        raise TypeError("El índice del snapshot es de sólo lectura (los primos son definitivos)")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._size):
+            yield self._keys[i].decode("utf-8")
+        yield from self.overlay
+
+    def __len__(self) -> int:
+        return self._size + len(self.overlay)
+
+    def to_dict(self) -> Dict[str, int]:
+        """Decodifica todas las claves una vez -> dict token -> posición (búsquedas a velocidad de dict)."""
+        offsets = self._keys._offsets.tolist()
+        start = self._keys._blob_start
+        blob = self._keys._mm[start:start + offsets[-1]]
+        index = {sys.intern(blob[offsets[i]:offsets[i + 1]].decode("utf-8")): idx
+                 for i, idx in enumerate(self._order.tolist())}
+        index.update(self.overlay)
+        return index
+
 class GematriaRegistry:
     """
     Gestiona la asignación de valores primos a raíces y signos.
     Actúa como la fuente de verdad (Truth Source) y base de datos en memoria.
+    Almacenamiento: token (interned) -> índice, y un array NumPy de primos por índice.
     """
-    
+
     def __init__(self, lexicon_path: str = None):
-        self.sign_map: Dict[str, int] = {}
-        self.prime_cursor = 2  # Primer número primo
+        self.token_index: Dict[str, int] = {}
+        self.sieve = PrimeSieve()
+        self.sign_map = SignMapView(self)
         self.collision_log: List[str] = []
-        
+
         # Carga inicial (Mock o Real si se provee path)
         if lexicon_path:
             self.load_lexicon(lexicon_path)
         else:
             self._initialize_mock_data()
 
-    def _is_prime(self, n: int) -> bool:
-        """Helper básico para verificar primos."""
-        if n <= 1: return False
-        for i in range(2, int(n**0.5) + 1):
-            if n % i == 0:
-                return False
-        return True
-
-    def _get_next_prime(self) -> int:
-        """Obtiene el siguiente número primo disponible."""
-        while True:
-            if self._is_prime(self.prime_cursor):
-                val = self.prime_cursor
-                self.prime_cursor += 1
-                return val
-            self.prime_cursor += 1
+    @property
+    def primes(self) -> np.ndarray:
+        """Primo asignado a cada índice (el i-ésimo token registrado recibe el i-ésimo primo)."""
+        return self.sieve.primes[:len(self.token_index)]
 
     def _initialize_mock_data(self):
         """Datos semilla para pruebas unitarias sin el CSV completo."""
         logging.info("Inicializando registro con datos semilla (MOCK)...")
         # Ejemplo: Asignando primos arbitrarios a signos conocidos
         mock_data = ["É", "GAL", "DUMU", "MUNUS", "be", "lí", "ni"]
-        for token in mock_data:
-            self.register_token(token)
+        self.register_tokens(mock_data)
 
     def load_lexicon(self, filepath: str):
         """
         Carga OA_Lexicon_eBL.csv.
-        Estructura esperada CSV: sign, reading, interpretation
+        Estructura esperada CSV: sign, reading, interpretation (o type, form, norm, lexeme del eBL)
         """
         try:
             with open(filepath, mode='r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    # Asumimos columna 'sign' o 'reading' como clave
-                    key = row.get('reading', row.get('sign'))
-                    if key:
-                        self.register_token(key)
-            logging.info(f"Lexicon cargado. Total entradas: {len(self.sign_map)}")
+                # Asumimos columna 'reading', 'sign' o 'form' (eBL) como clave
+                keys = (row.get('reading') or row.get('sign') or row.get('form') for row in reader)
+                self.register_tokens(key for key in keys if key)
+            logging.info(f"Lexicon cargado. Total entradas: {len(self.token_index)}")
         except FileNotFoundError:
             logging.error(f"No se encontró el archivo de léxico: {filepath}")
 
+    def register_tokens(self, tokens: Iterable[str]) -> int:
+        """Registro masivo: asigna índices en orden de aparición y criba los primos una sola vez."""
+        index = self.token_index
+        for token in tokens:
+            if token not in index:
+                index[sys.intern(token)] = len(index)
+        self.sieve.ensure(len(index))
+        return len(index)
+
     def register_token(self, token: str) -> int:
         """Asigna un valor primo único a un token si no existe."""
-        if token not in self.sign_map:
-            prime = self._get_next_prime()
-            self.sign_map[token] = prime
-        return self.sign_map[token]
+        idx = self.token_index.get(token)
+        if idx is None:
+            idx = self.token_index[sys.intern(token)] = len(self.token_index)
+            self.sieve.ensure(idx + 1)
+        return int(self.sieve.primes[idx])
 
     def get_gematria_value(self, token: str) -> int:
         """
         Retorna el valor primo del token.
         Retorna 0 para tokens neutros ([DMG], [UNK]).
         """
-        if token in ["[DMG]", "[MISSING]", "[UNK]", "x"]:
+        if token in NEUTRAL_TOKENS:
             return 0
-        return self.sign_map.get(token, 0)
+        idx = self.token_index.get(token)
+        return 0 if idx is None else int(self.sieve.primes[idx])
 
     def calculate_hash(self, token_list: List[str]) -> int:
         """
@@ -90,4 +261,202 @@ class GematriaRegistry:
             if val == 0 and token not in ["[DMG]", "[MISSING]", "x"]:
                 logging.warning(f"Token desconocido encontrado en cálculo: {token}")
             vector_sum += val
-        return vector_sum
\ No newline at end of file
+        return vector_sum
+
+    def token_ids(self, tokens: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+        """
+        Mapea tokens a ids de vocabulario local en una pasada.
+        Devuelve (ids por token, vocabulario en orden de primera aparición).
+        """
+        vocab: Dict[str, int] = {}
+        ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in tokens), dtype=np.int64)
+        return ids, list(vocab)
+
+    def calculate_hash_batch(self, token_lists: Sequence[List[str]]) -> Tuple[np.ndarray, Counter]:
+        """
+        Versión vectorizada de calculate_hash para muchas frases a la vez.
+        Los tokens se aplanan, se mapean a ids una sola vez y las sumas de primos
+        se calculan por segmentos con np.add.reduceat.
+        Devuelve (hashes int64 por frase, Counter de tokens desconocidos) sin un log por token.
+        """
+        token_lists = token_lists if isinstance(token_lists, list) else list(token_lists)
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        ids, vocab = self.token_ids(chain.from_iterable(token_lists))
+
+        vocab_values = np.fromiter((self.get_gematria_value(t) for t in vocab), dtype=np.int64, count=len(vocab))
+        values = vocab_values[ids]
+
+        hashes = np.zeros(len(token_lists), dtype=np.int64)
+        nonempty = lengths > 0
+        if values.size:
+            starts = np.cumsum(lengths) - lengths
+            hashes[nonempty] = np.add.reduceat(values, starts[nonempty])
+
+        # Estadística agregada de desconocidos (ocurrencias por token)
+        unknown = Counter()
+        missing = [i for i, (t, v) in enumerate(zip(vocab, vocab_values.tolist())) if v == 0 and t not in SILENT_TOKENS]
+        if missing:
+            counts = np.bincount(ids, minlength=len(vocab))
+            unknown.update({vocab[i]: int(counts[i]) for i in missing})
+            logging.info(f"calculate_hash_batch: {sum(unknown.values())} tokens desconocidos "
+                         f"({len(unknown)} distintos) en {len(token_lists)} frases")
+        return hashes, unknown
+
+    # --- SNAPSHOT BINARIO ---
+
+    def save_snapshot(self, path: str, lexicon_path: Optional[str] = None):
+        """
+        Guarda el registro en un snapshot binario mapeable en memoria:
+        cabecera | offsets (uint64) | orden (uint32) | primos (int64) | cadenas UTF-8 ordenadas.
+        """
+        tokens = sorted(self.token_index, key=self.token_index.__getitem__)
+        encoded = [t.encode("utf-8") for t in tokens]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(encoded[i]) for i in order], out=offsets[1:])
+        blob = b"".join(encoded[i] for i in order)
+        checksum = lexicon_checksum(lexicon_path) if lexicon_path else bytes(32)
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(tokens), checksum, len(blob)))
+            f.write(b"\0" * (SNAPSHOT_ALIGN - SNAPSHOT_HEADER.size))
+            f.write(offsets.tobytes())
+            f.write(np.asarray(order, dtype=np.uint32).tobytes())
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(np.ascontiguousarray(self.primes, dtype=np.int64).tobytes())
+            f.write(blob)
+        os.replace(tmp_path, path)
+        logging.info(f"Snapshot guardado en {path} ({len(tokens)} tokens)")
+
+    @classmethod
+    def from_snapshot(cls, path: str, lexicon_path: Optional[str] = None, lazy: bool = False) -> "GematriaRegistry":
+        """
+        Abre un snapshot con mmap: los primos se quedan en el fichero (páginas compartidas entre procesos).
+        Por defecto el índice de tokens se decodifica a un dict (~50ms para el eBL, frente a ~0.3s
+        desde el CSV) y las búsquedas cuestan lo mismo que con el registro construido.
+        lazy=True deja el índice en el mmap (SnapshotIndex): apertura en ~0.1ms, pero cada búsqueda
+        es una bisección ~15x más lenta; sólo compensa para pocas consultas.
+        Si se indica lexicon_path, el snapshot debe corresponder a ese léxico.
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, checksum, blob_len = SNAPSHOT_HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot incompatible: {path} (magic={magic!r}, versión={version})")
+        if lexicon_path and checksum != lexicon_checksum(lexicon_path):
+            raise ValueError(f"El snapshot {path} no corresponde a {lexicon_path} (checksum distinto)")
+
+        view = memoryview(mm)
+        start = SNAPSHOT_ALIGN
+        offsets = view[start:start + 8 * (count + 1)].cast("Q")
+        start += 8 * (count + 1)
+        order = view[start:start + 4 * count].cast("I")
+        start += 4 * count
+        start += -start % 8
+        primes = np.frombuffer(mm, dtype=np.int64, count=count, offset=start)
+        start += 8 * count
+
+        registry = cls.__new__(cls)
+        index = SnapshotIndex(mm, offsets, order, start)
+        registry.token_index = index if lazy else index.to_dict()
+        registry.sieve = PrimeSieve()
+        registry.sieve.primes = primes
+        registry.sieve.limit = int(primes[-1]) if count else 1
+        registry.sign_map = SignMapView(registry)
+        registry.collision_log = []
+        registry.snapshot_path = path
+        return registry
+
+    @classmethod
+    def load_or_build(cls, lexicon_path: str, snapshot_path: str) -> "GematriaRegistry":
+        """Usa el snapshot si existe y coincide con el léxico; si no, lo reconstruye desde el CSV."""
+        if os.path.exists(snapshot_path):
+            try:
+                return cls.from_snapshot(snapshot_path, lexicon_path)
+            except ValueError as e:
+                logging.warning(f"{e}. Reconstruyendo snapshot...")
+        registry = cls(lexicon_path)
+        registry.save_snapshot(snapshot_path, lexicon_path)
+        return registry
+
+# --- BENCHMARK ---
+
+def _legacy_primes(count: int) -> List[int]:
+    """Asignación original: división por tentativa candidato a candidato."""
+    primes, cursor = [], 2
+    while len(primes) < count:
+        if all(cursor % i for i in range(2, int(cursor ** 0.5) + 1)):
+            primes.append(cursor)
+        cursor += 1
+    return primes
+
+def benchmark_lexicon_load(lexicon_path: str = "OA_Lexicon_eBL.csv", snapshot_path: Optional[str] = None):
+    """Carga completa del léxico con la criba frente a la división por tentativa original (y el snapshot)."""
+    t0 = time.perf_counter()
+    registry = GematriaRegistry(lexicon_path)
+    t_sieve = time.perf_counter() - t0
+    n = len(registry.token_index)
+
+    t0 = time.perf_counter()
+    legacy = _legacy_primes(n)
+    t_legacy = time.perf_counter() - t0
+
+    assert legacy == registry.primes.tolist(), "La criba no reproduce la secuencia de primos original"
+    print(f"--- ⏱️ BENCHMARK GEMATRIA ({n} tokens, último primo {legacy[-1] if legacy else '-'}) ---")
+    print(f"   Criba segmentada (carga completa): {t_sieve:.3f}s")
+    print(f"   División por tentativa (sólo primos): {t_legacy:.3f}s | x{t_legacy / max(t_sieve, 1e-9):.1f}")
+
+    if snapshot_path:
+        registry.save_snapshot(snapshot_path, lexicon_path)
+        tokens = list(registry.token_index)
+        print(f"   Snapshot mmap ({os.path.getsize(snapshot_path) / 1024:.0f} KB, con checksum):")
+        for label, lazy in (("índice dict", False), ("índice lazy", True)):
+            t0 = time.perf_counter()
+            snap = GematriaRegistry.from_snapshot(snapshot_path, lexicon_path, lazy=lazy)
+            t_open = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            values = [snap.get_gematria_value(t) for t in tokens]
+            t_lookup = time.perf_counter() - t0
+            assert values == registry.primes.tolist()
+            print(f"      {label}: apertura {t_open * 1000:6.1f}ms | {len(tokens)} búsquedas {t_lookup * 1000:6.1f}ms")
+        t0 = time.perf_counter()
+        [registry.get_gematria_value(t) for t in tokens]
+        print(f"      registro desde CSV: {len(tokens)} búsquedas {(time.perf_counter() - t0) * 1000:6.1f}ms")
+
+def benchmark_batch_hash(registry: GematriaRegistry, csv_path: str = "train.csv", column: str = "transliteration"):
+    """
+    calculate_hash frase a frase frente a calculate_hash_batch sobre todo el corpus,
+    los dos sobre el mismo registro (con el índice lazy del snapshot el bucle pagaría
+    la bisección en cada token y la comparación saldría inflada).
+    """
+    if isinstance(registry.token_index, SnapshotIndex):
+        raise ValueError("benchmark_batch_hash necesita un índice dict (from_snapshot con lazy=False)")
+    with open(csv_path, mode='r', encoding='utf-8') as f:
+        token_lists = [(row.get(column) or "").split() for row in csv.DictReader(f)]
+
+    t0 = time.perf_counter()
+    logging.disable(logging.WARNING)  # El bucle original sin E/S de logs (cota optimista)
+    try:
+        legacy = [registry.calculate_hash(tokens) for tokens in token_lists]
+    finally:
+        logging.disable(logging.NOTSET)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    hashes, unknown = registry.calculate_hash_batch(token_lists)
+    t_batch = time.perf_counter() - t0
+
+    assert hashes.tolist() == legacy, "calculate_hash_batch no reproduce calculate_hash"
+    print(f"   Hash de {len(token_lists)} frases: bucle {t_loop:.3f}s | batch {t_batch:.3f}s "
+          f"| x{t_loop / max(t_batch, 1e-9):.1f} ({len(unknown)} tokens desconocidos distintos)")
+
+if __name__ == "__main__":
+    lexicon = sys.argv[1] if len(sys.argv) > 1 else "OA_Lexicon_eBL.csv"
+    snapshot = sys.argv[2] if len(sys.argv) > 2 else "cache/gematria.snapshot"
+    benchmark_lexicon_load(lexicon, snapshot)
+    if os.path.exists("train.csv"):
+        benchmark_batch_hash(GematriaRegistry.from_snapshot(snapshot, lexicon, lazy=False))
\ No newline at end of file
@@ -1,9 +1,17 @@
+import numpy as np
 import pandas as pd
 import networkx as nx
+from scipy import sparse
 import community.community_louvain as community_louvain # Requiere: pip install python-louvain
 import os
 import re
 import sys
+import time
+
+try:
+    from .graph_metrics import betweenness_centrality
+except ImportError:
+    from graph_metrics import betweenness_centrality
 
 # Ajuste de rutas para importar configuración
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,16 +22,24 @@ except ImportError:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     PATHS = {
         "OUTPUT_CLEAN": os.path.join(BASE_DIR, "input", "processed", "preprocessing.csv"),
-        "SOCIAL_METRICS": os.path.join(BASE_DIR, "input", "processed", "social_metrics.csv")
+        "SOCIAL_METRICS": os.path.join(BASE_DIR, "input", "processed", "social_metrics.csv"),
+        "SOCIAL_STATE": os.path.join(BASE_DIR, "input", "processed", "social_graph_state.npz")
     }
 
+# Columnas candidatas con la identidad estable de una tablilla (Kaggle / OARE)
+TABLET_ID_COLUMNS = ['id', 'oare_id', 'text_id', 'sentence_uuid']
+
 class SocialGraphEngine:
     """
     Motor de Análisis de Redes Sociales (SNA).
     Convierte texto en grafos matemáticos para entender la estructura de Kanesh.
     """
     def __init__(self):
-        self.G = nx.Graph()
+        self._G = None
+        # Representación dispersa: A (tablilla x entidad) y co-ocurrencias AᵀA (triángulo superior)
+        self.entities = np.array([], dtype=object)
+        self.incidence = None
+        self.cooccurrence = None
         # Regex simple para detectar posibles Nombres Propios (Mayúscula inicial)
         # En producción, esto se reemplaza por el output de GLiNER.
         self.name_pattern = re.compile(r'\b[A-Z][a-z]+\b')
@@ -43,7 +59,58 @@ class SocialGraphEngine:
         unique_names = list(set([c for c in candidates if c not in self.stoplist and len(c) > 2]))
         return unique_names
 
-    def build_graph(self, csv_path):
+    @property
+    def G(self):
+        """Grafo networkx; se exporta desde la matriz de co-ocurrencia sólo cuando se pide."""
+        if self._G is None:
+            self._G = self.to_networkx()
+        return self._G
+
+    @G.setter
+    def G(self, graph):
+        self._G = graph
+
+    def to_networkx(self):
+        G = nx.Graph()
+        if self.cooccurrence is not None:
+            C = self.cooccurrence
+            G.add_weighted_edges_from(zip(self.entities[C.row].tolist(), self.entities[C.col].tolist(),
+                                          C.data.tolist()))
+        return G
+
+    def build_cooccurrence(self, texts):
+        """
+        Builder disperso: entidad -> id entero, incidencia A (fila, entidad) en CSR
+        y pesos de co-ocurrencia con un solo producto AᵀA.
+        Devuelve el nº de transacciones (tablillas con más de una entidad).
+        """
+        texts = pd.Series(texts).reset_index(drop=True)
+        names = texts.where(texts.map(lambda t: isinstance(t, str)), '').str.findall(self.name_pattern).explode()
+        names = names[names.notna() & (names.str.len() > 2) & ~names.isin(self.stoplist)]
+        # Una incidencia por (tablilla, entidad), como el set() de la heurística
+        pairs = pd.DataFrame({'row': names.index, 'entity': names.values}).drop_duplicates()
+
+        ids, self.entities = pd.factorize(pairs['entity'])
+        self.entities = np.asarray(self.entities, dtype=object)
+        rows = pairs['row'].to_numpy()
+        self.incidence = sparse.csr_matrix((np.ones(len(pairs), dtype=np.int64), (rows, ids)),
+                                           shape=(len(texts), len(self.entities)))
+
+        # AᵀA: diagonal = menciones por entidad; fuera de la diagonal = tablillas compartidas
+        self.cooccurrence = sparse.triu(self.incidence.T @ self.incidence, k=1).tocoo()
+        self._G = None
+        return int((np.bincount(rows, minlength=len(texts)) > 1).sum())
+
+    @staticmethod
+    def _text_column(df, text_column=None):
+        # Asumimos columna 'clean_text' o 'transliteration'
+        col_text = text_column or ('clean_text' if 'clean_text' in df.columns else 'transliteration')
+        if col_text not in df.columns:
+            # Intento final
+            col_text = df.columns[1]
+        return col_text
+
+    def build_graph(self, csv_path, text_column=None):
         print(f"🕸️  Construyendo Grafo Social desde: {csv_path}...")
         
         if not os.path.exists(csv_path):
@@ -51,36 +118,17 @@ class SocialGraphEngine:
             return
 
         df = pd.read_csv(csv_path)
-        
-        # Asumimos columna 'clean_text' o 'transliteration'
-        col_text = 'clean_text' if 'clean_text' in df.columns else 'transliteration'
-        if col_text not in df.columns:
-            # Intento final
-            col_text = df.columns[1] 
+        col_text = self._text_column(df, text_column)
 
-        transaction_count = 0
-        
-        for _, row in df.iterrows():
-            text = str(row[col_text])
-            entities = self._extract_entities_heuristic(text)
-            
-            if len(entities) > 1:
-                transaction_count += 1
-                # Crear enlaces (clique) entre todos los mencionados en la tablilla
-                # Si Puzur, Enlil y Amur están en el texto, se conocen entre sí.
-                for i in range(len(entities)):
-                    for j in range(i + 1, len(entities)):
-                        # Añadimos peso (weight) si ya existe la relación
-                        if self.G.has_edge(entities[i], entities[j]):
-                            self.G[entities[i]][entities[j]]['weight'] += 1
-                        else:
-                            self.G.add_edge(entities[i], entities[j], weight=1)
+        # Si Puzur, Enlil y Amur están en el texto, se conocen entre sí (clique con peso = tablillas compartidas)
+        transaction_count = self.build_cooccurrence(df[col_text].astype(str))
 
+        nodes = np.unique(np.concatenate([self.cooccurrence.row, self.cooccurrence.col]))
         print(f"   > Transacciones procesadas: {transaction_count}")
-        print(f"   > Nodos (Personas): {self.G.number_of_nodes()}")
-        print(f"   > Aristas (Relaciones): {self.G.number_of_edges()}")
+        print(f"   > Nodos (Personas): {len(nodes)}")
+        print(f"   > Aristas (Relaciones): {self.cooccurrence.nnz}")
 
-    def analyze_and_save(self, output_path):
+    def analyze_and_save(self, output_path, betweenness="auto", epsilon=0.05, workers=None):
         if len(self.G.nodes) == 0:
             print("⚠️ El grafo está vacío. Revisa la extracción de entidades.")
             return
@@ -89,8 +137,9 @@ class SocialGraphEngine:
         
         # 1. Betweenness Centrality (¿Quién controla el flujo?)
         # Esto nos dice quiénes son los mercaderes más importantes.
-        print("   > Calculando Centralidad...")
-        centrality = nx.betweenness_centrality(self.G)
+        # "exact": todas las fuentes en paralelo; "approx": pivotes con error <= epsilon; "auto": según tamaño
+        print(f"   > Calculando Centralidad ({betweenness})...")
+        centrality = betweenness_centrality(self.G, mode=betweenness, epsilon=epsilon, workers=workers)
         
         # 2. Louvain Community Detection (¿A qué familia pertenecen?)
         # Agrupa los nodos en clanes comerciales.
@@ -127,11 +176,254 @@ class SocialGraphEngine:
         print(f"✅ Métricas Sociales guardadas en: {output_path}")
         print(f"   Top 3 'Padrinos' de Kanesh:\n{df_metrics.head(3)}")
 
+    # --- MODO INCREMENTAL ---
+
+    @staticmethod
+    def _id_column(df, id_column=None):
+        """Columna con la identidad estable de cada tablilla (primera candidata sin repetidos)."""
+        for col in ([id_column] if id_column else TABLET_ID_COLUMNS):
+            if col in df.columns and df[col].notna().all() and df[col].is_unique:
+                return col
+        return None
+
+    @staticmethod
+    def load_state(state_path):
+        """
+        Estado persistido: entidades, aristas (triángulo superior), partición, betweenness sin normalizar,
+        nº de nodos del grafo y, por tablilla (id estable), hash del texto y entidades (CSR inc_ptr/inc_ent).
+        """
+        if not os.path.exists(state_path):
+            return None
+        with np.load(state_path, allow_pickle=False) as data:
+            state = {key: data[key] for key in data.files}
+        if 'tablet_ids' not in state:
+            print(f"   ⚠️ {state_path} es de una versión anterior (sin ids de tablilla); se reconstruye.")
+            return None
+        return state
+
+    @staticmethod
+    def save_state(state_path, state):
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        tmp_path = state_path + ".tmp.npz"
+        np.savez(tmp_path, **state)
+        os.replace(tmp_path, state_path)
+
+    @staticmethod
+    def _empty_state():
+        return {'entities': np.array([], dtype=str), 'edge_row': np.array([], dtype=np.int64),
+                'edge_col': np.array([], dtype=np.int64), 'edge_weight': np.array([], dtype=np.int64),
+                'partition': np.array([], dtype=np.int64), 'raw_betweenness': np.array([], dtype=np.float64),
+                'n_nodes': np.array(0, dtype=np.int64), 'tablet_ids': np.array([], dtype=str),
+                'tablet_hash': np.array([], dtype=np.uint64), 'inc_ptr': np.zeros(1, dtype=np.int64),
+                'inc_ent': np.array([], dtype=np.int64)}
+
+    def update_incremental(self, csv_path, state_path, output_path, text_column=None, id_column=None,
+                           betweenness="auto", epsilon=0.05, workers=None):
+        """
+        Actualización diaria. Cada tablilla se identifica por su id (id / oare_id / ...) y se compara
+        el hash de su texto: las nuevas suman sus co-ocurrencias y las editadas restan antes las que
+        aportaban. Louvain (desde la partición previa) y la centralidad se recalculan sólo en las
+        componentes conexas que cambian. Las tablillas ausentes del CSV se conservan.
+        Escribe el CSV completo y un *_delta.csv con toda entidad cuya fila de métricas cambió.
+        """
+        print(f"🕸️  Actualización incremental del Grafo Social desde: {csv_path}...")
+        if not os.path.exists(csv_path):
+            print(f"❌ Error: No existe {csv_path}. Ejecuta primero preprocessing.py")
+            return
+
+        df = pd.read_csv(csv_path)
+        texts = df[self._text_column(df, text_column)].astype(str).reset_index(drop=True)
+        col_id = self._id_column(df, id_column)
+        if col_id is None:
+            print("   ⚠️ Sin columna de id única: se usa la posición de la fila (sólo válido si el CSV sólo crece).")
+            tablet_ids = np.arange(len(df)).astype(str)
+        else:
+            tablet_ids = df[col_id].astype(str).to_numpy()
+        # Sólo el texto define las co-ocurrencias: reexportar con otras columnas no cambia nada
+        text_hash = pd.util.hash_pandas_object(texts, index=False).to_numpy()
+
+        state = self.load_state(state_path)
+        if state is None:
+            print("   > Sin estado previo: se construye el grafo completo.")
+            state = self._empty_state()
+        position = {tid: i for i, tid in enumerate(state['tablet_ids'].tolist())}
+        prior = np.array([position.get(tid, -1) for tid in tablet_ids], dtype=np.int64)
+        is_new = prior < 0
+        is_changed = np.zeros(len(prior), dtype=bool)
+        is_changed[~is_new] = state['tablet_hash'][prior[~is_new]] != text_hash[~is_new]
+        dirty = is_new | is_changed
+        print(f"   > Tablillas nuevas: {int(is_new.sum())}, editadas: {int(is_changed.sum())} de {len(texts)}")
+        if not dirty.any():
+            print("✅ Nada que actualizar.")
+            return
+
+        # 1. Entidades de las tablillas nuevas/editadas, con ids locales -> ids globales
+        self.build_cooccurrence(texts[dirty])
+        names = state['entities'].astype(object).tolist()
+        ids = {name: i for i, name in enumerate(names)}
+        local_to_global = np.array([ids.setdefault(name, len(ids)) for name in self.entities], dtype=np.int64)
+        names.extend(list(ids)[len(names):])
+        n_entities = len(names)
+
+        inc = self.incidence.tocoo()
+        added = sparse.csr_matrix((inc.data, (inc.row, local_to_global[inc.col])),
+                                  shape=(int(dirty.sum()), n_entities))
+        old_inc = sparse.csr_matrix((np.ones(len(state['inc_ent']), dtype=np.int64), state['inc_ent'],
+                                     state['inc_ptr']), shape=(len(state['tablet_ids']), n_entities))
+        removed = old_inc[prior[is_changed]]
+
+        # Co-ocurrencias: + AᵀA de los textos actuales, - AᵀA de la versión previa de las editadas
+        delta = sparse.triu(added.T @ added - removed.T @ removed, k=1).tocoo()
+        old_edges = sparse.coo_matrix((state['edge_weight'], (state['edge_row'], state['edge_col'])),
+                                      shape=(n_entities, n_entities))
+        edges = (old_edges.tocsr() + delta.tocsr())
+        edges.eliminate_zeros()
+        edges = edges.tocoo()
+
+        prev_degree = np.bincount(old_edges.row, minlength=n_entities) + np.bincount(old_edges.col, minlength=n_entities)
+        partition = np.full(n_entities, -1, dtype=np.int64)
+        partition[:len(state['partition'])] = state['partition']
+        prev_partition = partition.copy()
+        raw_bc = np.zeros(n_entities, dtype=np.float64)
+        raw_bc[:len(state['raw_betweenness'])] = state['raw_betweenness']
+        prev_raw_bc = raw_bc.copy()
+
+        # 2. Componentes conexas tocadas por aristas que ganan o pierden peso
+        _, labels = sparse.csgraph.connected_components(edges, directed=False)
+        degree = np.bincount(edges.row, minlength=n_entities) + np.bincount(edges.col, minlength=n_entities)
+        changed_edges = delta.data != 0
+        touched = np.unique(np.concatenate([delta.row[changed_edges], delta.col[changed_edges]]))
+        affected = np.isin(labels, labels[touched]) & (degree > 0)
+        raw_bc[touched] = 0.0  # Nodos que se quedan sin aristas: fuera del grafo
+        keep = affected[edges.row]
+        entity_names = np.asarray(names, dtype=object)
+        sub = nx.Graph()
+        sub.add_weighted_edges_from(zip(entity_names[edges.row[keep]].tolist(), entity_names[edges.col[keep]].tolist(),
+                                        edges.data[keep].tolist()))
+        print(f"   > Componentes recalculadas: {sub.number_of_nodes()} nodos de {int((degree > 0).sum())}")
+
+        # 3. Louvain con arranque en caliente: partición previa + una comunidad propia por nodo nuevo
+        next_id = int(partition.max()) + 1 if len(partition) else 0
+        init = {}
+        for node in sub:
+            prior_label = partition[ids[node]]
+            if prior_label < 0:
+                prior_label, next_id = next_id, next_id + 1
+            init[node] = int(prior_label)
+        try:
+            found = community_louvain.best_partition(sub, partition=init, random_state=42)
+        except Exception:
+            print("   ⚠️ Error en Louvain. Se mantiene la partición previa.")
+            found = init
+        # Etiquetas estables: cada comunidad hereda la etiqueta previa mayoritaria si nadie la reclamó
+        members = {}
+        for node, community in found.items():
+            members.setdefault(community, []).append(node)
+        claimed = set()
+        for community, nodes in sorted(members.items(), key=lambda item: -len(item[1])):
+            priors = pd.Series([partition[ids[node]] for node in nodes])
+            priors = priors[(priors >= 0) & ~priors.isin(claimed)]
+            label = int(priors.mode().iloc[0]) if len(priors) else next_id
+            if label == next_id:
+                next_id += 1
+            claimed.add(label)
+            for node in nodes:
+                partition[ids[node]] = label
+
+        # 4. Betweenness sin normalizar (sólo depende de la componente): se recalcula en las tocadas
+        for node, value in betweenness_centrality(sub, mode=betweenness, epsilon=epsilon, workers=workers,
+                                                  normalized=False).items():
+            raw_bc[ids[node]] = value
+
+        # 5. Persistir: las tablillas editadas se sustituyen y las nuevas se añaden al final
+        kept = np.ones(len(state['tablet_ids']), dtype=bool)
+        kept[prior[is_changed]] = False
+        incidence = sparse.vstack([old_inc[np.flatnonzero(kept)], added]).tocsr()
+        incidence.sort_indices()
+        in_graph = degree > 0
+        n = int(in_graph.sum())
+        self.entities, self.incidence, self.cooccurrence, self._G = entity_names, None, edges, None
+        self.save_state(state_path, {
+            'entities': np.asarray(names, dtype=str), 'edge_row': edges.row.astype(np.int64),
+            'edge_col': edges.col.astype(np.int64), 'edge_weight': edges.data.astype(np.int64),
+            'partition': partition, 'raw_betweenness': raw_bc, 'n_nodes': np.array(n, dtype=np.int64),
+            'tablet_ids': np.concatenate([state['tablet_ids'][kept].astype(str), tablet_ids[dirty].astype(str)]),
+            'tablet_hash': np.concatenate([state['tablet_hash'][kept], text_hash[dirty]]).astype(np.uint64),
+            'inc_ptr': incidence.indptr.astype(np.int64), 'inc_ent': incidence.indices.astype(np.int64)})
+
+        # 6. Métricas: la normalización depende de n, así que el delta compara filas completas
+        #    (un nodo nuevo en otra componente cambia el score de todos)
+        def normalized(raw, n_nodes):
+            return raw * (2 / ((n_nodes - 1) * (n_nodes - 2)) if n_nodes > 2 else 0.0)
+
+        df_metrics = pd.DataFrame({
+            'entity': entity_names,
+            'centrality_score': normalized(raw_bc, n),
+            'community_id': partition,
+            'degree_connections': degree
+        })
+        prev_score = normalized(prev_raw_bc, int(state['n_nodes']))
+        changed = ((df_metrics['centrality_score'].to_numpy() != prev_score) | (partition != prev_partition)
+                   | (degree != prev_degree))
+        df_delta = df_metrics[changed].sort_values(by='centrality_score', ascending=False)
+        df_metrics = df_metrics[in_graph].sort_values(by='centrality_score', ascending=False)
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        delta_path = os.path.splitext(output_path)[0] + "_delta.csv"
+        df_metrics.to_csv(output_path, index=False)
+        df_delta.to_csv(delta_path, index=False)
+        print(f"✅ Métricas Sociales guardadas en: {output_path} (delta: {len(df_delta)} entidades en {delta_path})")
+
+def _legacy_build(engine, texts):
+    """Construcción original (clique de aristas networkx por tablilla), para verificar."""
+    G = nx.Graph()
+    for text in texts:
+        entities = engine._extract_entities_heuristic(str(text))
+        for i in range(len(entities)):
+            for j in range(i + 1, len(entities)):
+                if G.has_edge(entities[i], entities[j]):
+                    G[entities[i]][entities[j]]['weight'] += 1
+                else:
+                    G.add_edge(entities[i], entities[j], weight=1)
+    return G
+
+def benchmark_graph_build(csv_path="Sentences_Oare_FirstWord_LinNum.csv", text_column="translation"):
+    """Builder disperso vs clique networkx sobre el corpus de frases OARE (mismas aristas y pesos)."""
+    texts = pd.read_csv(csv_path)[text_column].astype(str)
+    engine = SocialGraphEngine()
+    print(f"--- ⏱️ BENCHMARK GRAFO SOCIAL ({len(texts)} textos de {csv_path}) ---")
+
+    t0 = time.perf_counter()
+    legacy = _legacy_build(engine, texts)
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    engine.build_cooccurrence(texts)
+    t_sparse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    G = engine.G
+    t_export = time.perf_counter() - t0
+
+    print(f"   Clique networkx: {t_legacy:.2f}s")
+    print(f"   Disperso (AᵀA):  {t_sparse:.2f}s (+{t_export:.2f}s exportando a networkx)")
+    same = (set(map(frozenset, legacy.edges())) == set(map(frozenset, G.edges()))
+            and all(G[u][v]['weight'] == d['weight'] for u, v, d in legacy.edges(data=True)))
+    assert same, "El builder disperso cambia el grafo"
+    print(f"   ✅ Grafo idéntico: {G.number_of_nodes()} nodos, {G.number_of_edges()} aristas")
+
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_graph_build()
+        sys.exit(0)
+
     # Definir ruta de salida si no viene de config
     out_path = PATHS.get("SOCIAL_METRICS", "input/processed/social_metrics.csv")
     in_path = PATHS.get("OUTPUT_CLEAN", "input/processed/preprocessing.csv")
     
     engine = SocialGraphEngine()
-    engine.build_graph(in_path)
-    engine.analyze_and_save(out_path)
\ No newline at end of file
+    if "--incremental" in sys.argv:
+        state_path = PATHS.get("SOCIAL_STATE", "input/processed/social_graph_state.npz")
+        engine.update_incremental(in_path, state_path, out_path)
+    else:
+        engine.build_graph(in_path)
+        engine.analyze_and_save(out_path)
\ No newline at end of file
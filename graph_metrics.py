@@ -0,0 +1,129 @@
+# src/graph_metrics.py
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from functools import partial
+
+import networkx as nx
+
+# Por debajo de este tamaño el cálculo exacto es barato y "auto" no muestrea
+EXACT_MAX_NODES = 5000
+
+# Grafo heredado por los workers vía fork (no se serializa por tarea)
+_GRAPH = None
+
+def pivot_sample_size(n, epsilon=0.05, delta=0.1):
+    """
+    Nº de pivotes (fuentes muestreadas) para que TODA la centralidad normalizada
+    quede a menos de epsilon del valor exacto con probabilidad >= 1 - delta.
+    Hoeffding sobre las dependencias δ_s(v)/(n-2) ∈ [0, 1] + unión sobre los n nodos:
+        k = ln(2n/δ) / (2ε²)
+    """
+    if n < 3:
+        return n
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+def error_bound(n, k, delta=0.1):
+    """Inverso de pivot_sample_size: epsilon garantizado con k pivotes."""
+    if k >= n or n < 3:
+        return 0.0
+    return math.sqrt(math.log(2 * n / delta) / (2 * k))
+
+def _partial_betweenness(sources, weight=None):
+    """Worker: suma (sin normalizar) de las dependencias de un bloque de fuentes."""
+    return nx.betweenness_centrality_subset(_GRAPH, sources, list(_GRAPH), normalized=False, weight=weight)
+
+def _sum_partials(G, sources, workers, weight=None):
+    global _GRAPH
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sources)))
+    if workers == 1:
+        return nx.betweenness_centrality_subset(G, sources, list(G), normalized=False, weight=weight)
+
+    # Varios bloques por proceso para repartir la carga (los hubs cuestan más)
+    size = math.ceil(len(sources) / (workers * 4))
+    chunks = [sources[i:i + size] for i in range(0, len(sources), size)]
+    _GRAPH = G
+    try:
+        totals = dict.fromkeys(G, 0.0)
+        with mp.get_context("fork").Pool(workers) as pool:
+            for block in pool.imap_unordered(partial(_partial_betweenness, weight=weight), chunks):
+                for node, value in block.items():
+                    totals[node] += value
+        return totals
+    finally:
+        _GRAPH = None
+
+def betweenness_centrality(G, mode="auto", epsilon=0.05, delta=0.1, workers=None, seed=42, weight=None,
+                           normalized=True):
+    """
+    Betweenness normalizada (misma escala que nx.betweenness_centrality); con normalized=False,
+    la suma de pares sin normalizar (sólo depende de la componente conexa del nodo).
+      exact:  todas las fuentes, repartidas en un pool de procesos y sumadas.
+      approx: k = pivot_sample_size(n, epsilon, delta) pivotes al azar, escalado n/k;
+              error máximo <= epsilon con probabilidad >= 1 - delta.
+      auto:   exacto si el grafo es pequeño o si el muestreo no ahorra fuentes.
+    """
+    n = G.number_of_nodes()
+    if n < 3 or G.number_of_edges() == 0:
+        return dict.fromkeys(G, 0.0)
+
+    nodes = list(G)
+    k = pivot_sample_size(n, epsilon, delta)
+    if mode == "auto":
+        mode = "exact" if n <= EXACT_MAX_NODES or k >= n else "approx"
+    if mode == "exact":
+        sources, scale = nodes, 1.0
+    elif mode == "approx":
+        sources = random.Random(seed).sample(nodes, k)
+        scale = n / k
+    else:
+        raise ValueError(f"Modo de betweenness desconocido: {mode}")
+
+    raw = _sum_partials(G, sources, workers, weight)
+
+    # betweenness_centrality_subset ya divide entre 2 los pares de grafos no dirigidos
+    norm = scale
+    if normalized:
+        norm /= (n - 1) * (n - 2) / (1 if G.is_directed() else 2)
+    return {node: value * norm for node, value in raw.items()}
+
+# --- BENCHMARK ---
+
+def benchmark_betweenness(sizes=(10_000, 30_000, 100_000), epsilon=0.05, delta=0.1, workers=None,
+                          exact_limit=10_000, seed=7):
+    """
+    Exacto vs aproximado sobre grafos sintéticos de red comercial (powerlaw con clustering).
+    El exacto sólo se calcula hasta exact_limit nodos; por encima se extrapola su tiempo
+    desde una muestra de fuentes.
+    """
+    print(f"--- ⏱️ BENCHMARK BETWEENNESS (ε={epsilon}, δ={delta}) ---")
+    for n in sizes:
+        G = nx.powerlaw_cluster_graph(n, 3, 0.1, seed=seed)
+        k = pivot_sample_size(n, epsilon, delta)
+        print(f"   n={n}, aristas={G.number_of_edges()}, pivotes={k}")
+
+        t0 = time.perf_counter()
+        approx = betweenness_centrality(G, "approx", epsilon, delta, workers, seed=seed)
+        t_approx = time.perf_counter() - t0
+
+        if n <= exact_limit:
+            t0 = time.perf_counter()
+            exact = betweenness_centrality(G, "exact", workers=workers)
+            t_exact = time.perf_counter() - t0
+            err = max(abs(approx[v] - exact[v]) for v in G)
+            top = lambda bc: set(sorted(bc, key=bc.get, reverse=True)[:20])
+            print(f"      exacto (paralelo) {t_exact:8.1f}s | aprox {t_approx:6.1f}s | "
+                  f"error máx {err:.4f} (cota {epsilon}) | top-20 común {len(top(exact) & top(approx))}/20")
+        else:
+            sample = random.Random(seed).sample(list(G), 50)
+            t0 = time.perf_counter()
+            nx.betweenness_centrality_subset(G, sample, list(G), normalized=False)
+            t_exact = (time.perf_counter() - t0) * n / len(sample) / max(1, workers or os.cpu_count() or 1)
+            print(f"      exacto (estimado) {t_exact:8.1f}s | aprox {t_approx:6.1f}s")
+
+if __name__ == "__main__":
+    sizes = tuple(int(a) for a in sys.argv[1:]) or (10_000, 30_000, 100_000)
+    benchmark_betweenness(sizes)
@@ -0,0 +1,341 @@
+# src/graph_store.py
+import bisect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Formato: un directorio con ficheros NumPy que se abren en mmap (nada se parsea al arrancar)
+#   meta.json                    versión, tamaños, etiquetas, tipos de relación y columnas
+#   names.offsets.npy/names.bin  nombres de nodo UTF-8 ordenados (búsqueda binaria)
+#   labels.npy                   etiqueta de cada nodo (código -> meta['labels'])
+#   indptr.npy/indices.npy       adyacencia CSR (vecinos de cada nodo)
+#   weights.npy/types.npy        peso y tipo de relación de cada arista (código -> meta['relation_types'])
+#   prop.<col>.npy               columnas numéricas por nodo
+#   prop.<col>.offsets.npy/.bin  columnas de texto por nodo
+STORE_FORMAT = "kanish-graph-csr"
+STORE_VERSION = 1
+
+def _write_strings(path_prefix, values):
+    encoded = [("" if v is None else str(v)).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    np.save(path_prefix + ".offsets.npy", offsets)
+    with open(path_prefix + ".bin", "wb") as f:
+        f.write(b"".join(encoded))
+
+class _StringColumn:
+    """Columna de cadenas en mmap: offsets (uint64) + blob UTF-8; decodifica sólo lo que se lee."""
+    def __init__(self, path_prefix):
+        self.offsets = np.load(path_prefix + ".offsets.npy", mmap_mode="r")
+        size = int(self.offsets[-1])
+        self.blob = np.memmap(path_prefix + ".bin", dtype=np.uint8, mode="r") if size else np.zeros(0, np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes()
+
+    def __getitem__(self, i):
+        return self.raw(i).decode("utf-8")
+
+class _SortedKeys:
+    """Vista de bytes para bisect sobre los nombres ordenados."""
+    def __init__(self, column):
+        self.column = column
+
+    def __len__(self):
+        return len(self.column)
+
+    def __getitem__(self, i):
+        return self.column.raw(i)
+
+def write_graph_store(path, names, sources, targets, weights=None, relation_types=None, labels=None,
+                      node_props=None, directed=False):
+    """
+    Escribe un snapshot CSR a partir de listas de aristas (nombres de nodo).
+    Sin directed, cada arista se guarda en ambos sentidos. Las aristas repetidas se conservan
+    (p. ej. dos relaciones de tipo distinto entre el mismo par).
+    """
+    names = list(dict.fromkeys(list(names) + list(sources) + list(targets)))
+    order = sorted(range(len(names)), key=lambda i: names[i].encode("utf-8"))
+    sorted_names = [names[i] for i in order]
+    node_id = {name: i for i, name in enumerate(sorted_names)}
+    n = len(sorted_names)
+
+    src = np.fromiter((node_id[s] for s in sources), dtype=np.int64, count=len(sources))
+    dst = np.fromiter((node_id[t] for t in targets), dtype=np.int64, count=len(targets))
+    w = np.ones(len(src), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+    type_names = sorted(set(relation_types)) if relation_types is not None else []
+    type_codes = {t: i for i, t in enumerate(type_names)}
+    rel = (np.zeros(len(src), dtype=np.int16) if relation_types is None else
+           np.fromiter((type_codes[t] for t in relation_types), dtype=np.int16, count=len(src)))
+    if not directed:
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+        w, rel = np.concatenate([w, w]), np.concatenate([rel, rel])
+
+    # CSR: aristas ordenadas por origen (y destino, para vecinos en orden estable)
+    perm = np.lexsort((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    index_dtype = np.int32 if n < 2 ** 31 else np.int64
+
+    labels = labels or {}
+    label_names = sorted(set(labels.values()) | {""})
+    label_codes = {l: i for i, l in enumerate(label_names)}
+
+    # Directorio temporal único por escritor: dos procesos que convierten el mismo JSON no se pisan
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_path = tempfile.mkdtemp(prefix=os.path.basename(path.rstrip("/")) + ".tmp.", dir=parent)
+    os.chmod(tmp_path, 0o755)
+    try:
+        _write_strings(os.path.join(tmp_path, "names"), sorted_names)
+        np.save(os.path.join(tmp_path, "labels.npy"),
+                np.array([label_codes[labels.get(name, "")] for name in sorted_names], dtype=np.int16))
+        np.save(os.path.join(tmp_path, "indptr.npy"), indptr)
+        np.save(os.path.join(tmp_path, "indices.npy"), dst[perm].astype(index_dtype))
+        np.save(os.path.join(tmp_path, "weights.npy"), w[perm])
+        np.save(os.path.join(tmp_path, "types.npy"), rel[perm])
+
+        columns = {}
+        for col, values in (node_props or {}).items():
+            column = [values.get(name) for name in sorted_names]
+            numeric = all(v is None or isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+                          for v in column)
+            if numeric:
+                np.save(os.path.join(tmp_path, f"prop.{col}.npy"),
+                        np.array([np.nan if v is None else v for v in column], dtype=np.float64))
+                columns[col] = "float64"
+            else:
+                _write_strings(os.path.join(tmp_path, f"prop.{col}"), column)
+                columns[col] = "str"
+
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"format": STORE_FORMAT, "version": STORE_VERSION, "nodes": n, "edges": int(len(src)),
+                       "directed": directed, "labels": label_names, "relation_types": type_names,
+                       "columns": columns}, f, ensure_ascii=False, indent=2)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    # Sustitución atómica del directorio anterior
+    old_path = tmp_path + ".old"
+    try:
+        os.replace(path, old_path)
+    except FileNotFoundError:
+        pass  # Primera escritura, u otro escritor lo acaba de apartar
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Otro escritor publicó su snapshot entre medias: se conserva el suyo
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            raise
+    shutil.rmtree(old_path, ignore_errors=True)
+    print(f"💾 Grafo guardado en {path}: {n} nodos, {len(src)} aristas (CSR)")
+
+class GraphStore:
+    """
+    Snapshot CSR del grafo de conocimiento abierto en mmap.
+    El arranque sólo lee meta.json: el coste no depende del tamaño del grafo.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != STORE_FORMAT or self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Snapshot de grafo incompatible: {path}")
+        self.path = path
+        self.names = _StringColumn(os.path.join(path, "names"))
+        self._keys = _SortedKeys(self.names)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.labels = load("labels.npy")
+        self.indptr = load("indptr.npy")
+        self.indices = load("indices.npy")
+        self.weights = load("weights.npy")
+        self.types = load("types.npy")
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta["nodes"]
+
+    def __contains__(self, name):
+        return self.node_id(name) is not None
+
+    def node_id(self, name):
+        key = name.encode("utf-8")
+        pos = bisect.bisect_left(self._keys, key)
+        if pos < len(self) and self._keys[pos] == key:
+            return pos
+        return None
+
+    def label(self, name):
+        i = self.node_id(name)
+        return None if i is None else self.meta["labels"][self.labels[i]]
+
+    def neighbors(self, name):
+        """[(vecino, peso, tipo de relación)] del nodo; lista vacía si no existe."""
+        i = self.node_id(name)
+        if i is None:
+            return []
+        start, end = int(self.indptr[i]), int(self.indptr[i + 1])
+        types = self.meta["relation_types"]
+        return [(self.names[int(j)], float(w), types[t] if types else None)
+                for j, w, t in zip(self.indices[start:end], self.weights[start:end], self.types[start:end])]
+
+    def degree(self, name):
+        i = self.node_id(name)
+        return 0 if i is None else int(self.indptr[i + 1] - self.indptr[i])
+
+    def column(self, col):
+        if col not in self._columns:
+            kind = self.meta["columns"][col]
+            prefix = os.path.join(self.path, f"prop.{col}")
+            self._columns[col] = np.load(prefix + ".npy", mmap_mode="r") if kind != "str" else _StringColumn(prefix)
+        return self._columns[col]
+
+    def property(self, name, col, default=None):
+        i = self.node_id(name)
+        if i is None or col not in self.meta["columns"]:
+            return default
+        value = self.column(col)[i]
+        return float(value) if self.meta["columns"][col] != "str" else value
+
+    def nodes_with_label(self, label):
+        """Nombres de los nodos de una etiqueta (filtro vectorizado sobre la columna de códigos)."""
+        if label not in self.meta["labels"]:
+            return []
+        code = self.meta["labels"].index(label)
+        return [self.names[int(i)] for i in np.flatnonzero(self.labels == code)]
+
+    def commodities(self):
+        """
+        Mercancías acadio -> [glosas inglesas] (lo que MardukValidator lee de la ontología).
+        Sin glosa (nodos creados por OntologyInjector, sólo con name) vale el propio nombre.
+        """
+        return {name: (self.property(name, "english") or name).split("; ")
+                for name in self.nodes_with_label("Commodity")}
+
+# --- EXPORTADORES ---
+
+def export_social_engine(engine, path, metrics=None):
+    """
+    Grafo de co-ocurrencias de SocialGraphEngine (matriz dispersa) -> snapshot.
+    metrics: DataFrame opcional de analyze_and_save (entity, centrality_score, community_id, ...).
+    """
+    C = engine.cooccurrence
+    if C is None:
+        raise ValueError("El motor no tiene grafo: ejecuta build_graph o update_incremental antes")
+    names = engine.entities
+    sources, targets = names[C.row].tolist(), names[C.col].tolist()
+    nodes = list(dict.fromkeys(sources + targets))
+    props = {}
+    if metrics is not None:
+        metrics = metrics.set_index('entity')
+        props = {col: metrics[col].to_dict() for col in metrics.columns}
+    write_graph_store(path, nodes, sources, targets, weights=C.data, relation_types=["CO_OCCURS"] * len(sources),
+                      labels=dict.fromkeys(nodes, "Person"), node_props=props)
+
+def export_neo4j(driver, path, database=None):
+    """
+    Grafo completo de Neo4j (nodos con etiqueta y propiedades sociales; todas las relaciones).
+    Identidad del nodo: id (Tablet, grafo social) o name (Person/Commodity/... de OntologyInjector).
+    """
+    node_query = """
+    MATCH (n) WHERE coalesce(n.id, n.name) IS NOT NULL
+    RETURN coalesce(n.id, n.name) AS id, labels(n)[0] AS label, n.community_louvain AS community,
+           n.centrality_score AS centrality, n.english AS english
+    """
+    edge_query = """
+    MATCH (n)-[r]->(m) WHERE coalesce(n.id, n.name) IS NOT NULL AND coalesce(m.id, m.name) IS NOT NULL
+    RETURN coalesce(n.id, n.name) AS source, coalesce(m.id, m.name) AS target, type(r) AS type,
+           coalesce(r.weight, 1.0) AS weight
+    """
+    with driver.session(database=database) as session:
+        nodes = [r.data() for r in session.run(node_query)]
+        edges = [r.data() for r in session.run(edge_query)]
+    names = [str(n["id"]) for n in nodes]
+    props = {col: {str(n["id"]): n[col] for n in nodes if n[col] is not None}
+             for col in ("community", "centrality", "english")}
+    write_graph_store(path, names, [str(e["source"]) for e in edges], [str(e["target"]) for e in edges],
+                      weights=[e["weight"] for e in edges], relation_types=[e["type"] for e in edges],
+                      labels={str(n["id"]): n["label"] or "" for n in nodes}, node_props=props, directed=True)
+
+def export_brain_json(json_path, path):
+    """
+    Cerebro congelado (kanish_brain_frozen.json) -> snapshot.
+    entities: nombre -> [descripciones]; commodities: acadio -> inglés; relations: [{source, target, type}] o [s, t, tipo].
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        brain = json.load(f)
+    labels, english, description = {}, {}, {}
+    for name, info in brain.get("entities", {}).items():
+        labels[name] = "Person"
+        description[name] = "; ".join(info) if isinstance(info, list) else str(info)
+    for token, gloss in brain.get("commodities", {}).items():
+        labels[token] = "Commodity"
+        english[token] = gloss if isinstance(gloss, str) else "; ".join(gloss)
+    sources, targets, types = [], [], []
+    for rel in brain.get("relations", []):
+        source, target, kind = ((rel.get("source"), rel.get("target"), rel.get("type", "RELATED"))
+                                if isinstance(rel, dict) else (rel[0], rel[1], rel[2] if len(rel) > 2 else "RELATED"))
+        sources.append(str(source))
+        targets.append(str(target))
+        types.append(kind)
+    write_graph_store(path, list(labels), sources, targets, relation_types=types, labels=labels,
+                      node_props={"english": english, "description": description}, directed=True)
+
+def open_brain(path):
+    """
+    Carga offline del cerebro: si path es un JSON, se convierte una vez a <path sin .json>.graph
+    (y se reconvierte si el JSON es más nuevo); después siempre se abre el snapshot en mmap.
+    """
+    if path.endswith(".json"):
+        store_path = path[:-len(".json")] + ".graph"
+        meta = os.path.join(store_path, "meta.json")
+        if not os.path.exists(meta) or os.path.getmtime(meta) < os.path.getmtime(path):
+            export_brain_json(path, store_path)
+        path = store_path
+    return GraphStore(path)
+
+# --- BENCHMARK ---
+
+def benchmark_cold_start(sizes=(10_000, 100_000, 1_000_000), seed=7):
+    """Arranque en frío: json.load del grafo completo vs abrir el snapshot CSR (y una consulta de vecinos)."""
+    rng = np.random.default_rng(seed)
+    workdir = tempfile.mkdtemp(prefix="graph_store_")
+    print("--- ⏱️ BENCHMARK ARRANQUE EN FRÍO (JSON vs CSR en mmap) ---")
+    for n in sizes:
+        names = [f"person-{i}" for i in range(n)]
+        src, dst = rng.integers(0, n, 3 * n), rng.integers(0, n, 3 * n)
+        json_path = os.path.join(workdir, f"brain_{n}.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"entities": {name: ["unknown lineage"] for name in names}, "commodities": {},
+                       "relations": [[names[s], names[t], "KNOWS"] for s, t in zip(src, dst)]}, f)
+        store_path = os.path.join(workdir, f"brain_{n}.graph")
+        export_brain_json(json_path, store_path)
+
+        t0 = time.perf_counter()
+        with open(json_path, "r", encoding="utf-8") as f:
+            brain = json.load(f)
+        hits = [r for r in brain["relations"] if r[0] == names[n // 2]]
+        t_json = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        store = GraphStore(store_path)
+        found = store.neighbors(names[n // 2])
+        t_store = time.perf_counter() - t0
+        assert sorted(t for _, t, _ in hits) == sorted(name for name, _, _ in found)
+        print(f"   n={n:>9}: JSON {t_json:7.3f}s | CSR {t_store * 1000:7.2f} ms")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        # python graph_store.py kanish_brain_frozen.json kanish_brain.graph
+        export_brain_json(sys.argv[1], sys.argv[2])
+    else:
+        benchmark_cold_start()
@@ -0,0 +1,99 @@
+# src/inference_pool.py
+import multiprocessing as mp
+import os
+import torch
+from collections import deque
+
+# Motor heredado por los workers vía fork (los pesos se comparten, no se copian)
+_ENGINE = None
+
+def _init_worker(intra_op_threads):
+    # Presupuesto de hilos por proceso: evita que N workers x M hilos saturen la CPU
+    torch.set_num_threads(intra_op_threads)
+
+def _translate_shard(args):
+    texts, batch_size = args
+    return _ENGINE._translate_uncached(texts, batch_size)
+
+class InferencePool:
+    """
+    Pool de Inferencia Multi-Proceso (sólo CPU).
+    Carga el modelo una vez en el proceso padre, lo mueve a memoria compartida
+    y hace fork de N workers que traducen fragmentos (shards) del corpus.
+    La memoria de traducciones y Marduk se quedan en el padre; los resultados
+    vuelven en streaming, bloque a bloque y en el orden original.
+    """
+    def __init__(self, engine, num_workers=2, intra_op_threads=None, shard_size=64):
+        if engine.device != "cpu":
+            raise ValueError("InferencePool está pensado para CPU; en GPU usa predict_batch().")
+        self.engine = engine
+        self.num_workers = num_workers
+        self.intra_op_threads = intra_op_threads or max(1, (os.cpu_count() or 1) // num_workers)
+        self.shard_size = shard_size
+
+        global _ENGINE
+        _ENGINE = engine
+        engine.model.share_memory()
+        ctx = mp.get_context("fork")
+        self.pool = ctx.Pool(num_workers, initializer=_init_worker, initargs=(self.intra_op_threads,))
+        print(f"🧵 Pool de inferencia: {num_workers} procesos x {self.intra_op_threads} hilos")
+
+    def imap_predict_chunks(self, chunks, batch_size=None, max_inflight=None):
+        """
+        Traduce un iterador de bloques (etiqueta, textos) y devuelve (etiqueta, salidas de
+        predict_batch()) en el orden de entrada.
+        Los shards de bloques sucesivos se encolan en una ventana FIFO de `max_inflight`
+        tareas (por defecto 2 por worker): los workers no esperan al shard más lento de
+        cada bloque y con muchos workers todos tienen trabajo aunque el bloque sea pequeño.
+        """
+        batch_size = batch_size or self.engine.batch_size
+        max_inflight = max_inflight or 2 * self.num_workers
+        window = deque()
+        inflight = 0
+        for tag, texts in chunks:
+            texts = list(texts)
+            # Un texto repetido en dos bloques de la ventana aún no está en la memoria y se traduce dos veces
+            translations, pending = self.engine._cache_lookup(texts)
+            keys = list(pending)
+            shards = []
+            for start in range(0, len(keys), self.shard_size):
+                block = keys[start:start + self.shard_size]
+                todo = [texts[pending[key][0]] for key in block]
+                shards.append((block, self.pool.apply_async(_translate_shard, ((todo, batch_size),))))
+            window.append((tag, texts, translations, pending, shards))
+            inflight += len(shards)
+
+            # Emitimos bloques completos sólo cuando la ventana está llena
+            while window and inflight > max_inflight:
+                inflight -= len(window[0][4])
+                yield self._collect(*window.popleft())
+
+        while window:
+            yield self._collect(*window.popleft())
+
+    def _collect(self, tag, texts, translations, pending, shards):
+        """Espera los shards de un bloque, guarda en la memoria y pasa cada fila por Marduk."""
+        for block, result in shards:
+            outputs = result.get()
+            for key, translation in zip(block, outputs):
+                for i in pending[key]:
+                    translations[i] = translation
+            self.engine._cache_store(zip(block, outputs))
+        return tag, [self.engine._judge(text, translation) for text, translation in zip(texts, translations)]
+
+    def imap_predict(self, texts, batch_size=None):
+        """Como engine.predict_batch(), pero repartido entre procesos."""
+        for _, outputs in self.imap_predict_chunks([(None, texts)], batch_size):
+            yield from outputs
+
+    def close(self):
+        global _ENGINE
+        self.pool.close()
+        self.pool.join()
+        _ENGINE = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
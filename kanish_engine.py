@@ -1,48 +1,210 @@
 # src/kanish_engine.py
+import os
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from .marduk_validator import MardukValidator
+from .translation_cache import TranslationCache
 
 class KanishInferenceEngine:
-    def __init__(self, model_path="models/nllb-kanish-finetuned"):
+    def __init__(self, model_path="models/nllb-kanish-finetuned", batch_size=16,
+                 cache_path="cache/kanish_translations.sqlite",
+                 quantize=False, quantized_path=None, ontology_path=None):
         print(f"⚙️ Cargando Kanish Engine desde {model_path}...")
+        self.quantized = quantize
+        if quantize and quantized_path:
+            # El int8 guardado lleva en el nombre la huella de los pesos que lo produjeron
+            quantized_path = self.quantized_file(model_path, quantized_path)
+        if quantize and quantized_path and os.path.exists(quantized_path):
+            # Arranque rápido: el modelo int8 ya convertido se carga tal cual
+            print(f"⚡ Cargando modelo cuantizado (int8) desde {quantized_path}")
+            self.tokenizer = self._load_tokenizer(model_path)
+            self.model = torch.load(quantized_path, weights_only=False)
+        else:
+            try:
+                self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+                self.model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+            except:
+                print("⚠️ Modelo no encontrado. Usando base facebook/nllb-200-distilled-600M")
+                self.tokenizer = AutoTokenizer.from_pretrained("facebook/nllb-200-distilled-600M")
+                self.model = AutoModelForSeq2SeqLM.from_pretrained("facebook/nllb-200-distilled-600M")
+            if quantize:
+                self.model = self._quantize_dynamic(self.model, quantized_path)
+
+        # La cuantización dinámica int8 sólo tiene kernels de CPU
+        self.device = "cuda" if torch.cuda.is_available() and not quantize else "cpu"
+        self.model.to(self.device)
+        self.model.eval()
+        self.batch_size = batch_size
+
+        # Parámetros de generación compartidos por predict y predict_batch
+        self.generation_params = {
+            "max_length": 128,
+            "num_beams": 5 # Beam Search para mejor calidad
+        }
+
+        # Memoria de traducciones (None = desactivada)
+        self.cache = TranslationCache(cache_path) if cache_path else None
+        self.model_fingerprint = self._fingerprint_model()
+
+        # Instanciar al Juez (con la ontología de mercancías si se indica: JSON o snapshot .graph)
+        self.marduk = MardukValidator(ontology_path)
+
+    @staticmethod
+    def _load_tokenizer(model_path):
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+            return AutoTokenizer.from_pretrained(model_path)
         except:
-            print("⚠️ Modelo no encontrado. Usando base facebook/nllb-200-distilled-600M")
-            self.tokenizer = AutoTokenizer.from_pretrained("facebook/nllb-200-distilled-600M")
-            self.model = AutoModelForSeq2SeqLM.from_pretrained("facebook/nllb-200-distilled-600M")
-            
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model.to(self.device)
-        
-        # Instanciar al Juez
-        self.marduk = MardukValidator()
+            return AutoTokenizer.from_pretrained("facebook/nllb-200-distilled-600M")
+
+    @staticmethod
+    def _weights_signature(path):
+        """Ficheros de pesos (nombre, tamaño, fecha) de un directorio de modelo."""
+        weights = []
+        if os.path.isdir(path):
+            for fname in sorted(os.listdir(path)):
+                if fname.endswith((".bin", ".safetensors")):
+                    st = os.stat(os.path.join(path, fname))
+                    weights.append((fname, st.st_size, int(st.st_mtime)))
+        return weights
+
+    @classmethod
+    def quantized_file(cls, model_path, quantized_path):
+        """
+        models/nllb-int8.pt -> models/nllb-int8.<huella>.pt
+        La huella cubre ruta, config y pesos del modelo fp32 (sin cargarlo) y la versión de torch,
+        así un int8 de otro modelo o de pesos reentrenados nunca se reutiliza.
+        """
+        config = ""
+        config_path = os.path.join(model_path, "config.json")
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = f.read()
+        fingerprint = TranslationCache.fingerprint(os.path.abspath(model_path) if os.path.isdir(model_path) else model_path,
+                                                   config, cls._weights_signature(model_path), torch.__version__)
+        root, ext = os.path.splitext(quantized_path)
+        return f"{root}.{fingerprint[:12]}{ext or '.pt'}"
+
+    @staticmethod
+    def _quantize_dynamic(model, quantized_path=None):
+        """
+        Cuantización dinámica int8 de las capas Linear (pesos int8, activaciones fp32).
+        Si se indica quantized_path, el modelo convertido se guarda para saltar
+        la conversión en el próximo arranque.
+        """
+        print("🗜️ Aplicando cuantización dinámica int8 (nn.Linear)...")
+        model.eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if quantized_path:
+            if os.path.dirname(quantized_path):
+                os.makedirs(os.path.dirname(quantized_path), exist_ok=True)
+            torch.save(model, quantized_path)
+            print(f"💾 Modelo int8 guardado en {quantized_path}")
+        return model
+
+    def _fingerprint_model(self):
+        """Identidad del modelo cargado: ruta + config + tamaño/fecha de los pesos en disco."""
+        name = self.model.name_or_path
+        weights = self._weights_signature(name)
+        precision = "int8" if self.quantized else "fp32"
+        return TranslationCache.fingerprint(name, self.model.config.to_json_string(), weights, precision)
+
+    def _generate(self, texts):
+        """Una pasada de model.generate sobre un lote ya agrupado (padding dinámico)."""
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.device)
 
-    def predict(self, text):
-        # 1. Inferencia Neuronal
-        inputs = self.tokenizer(text, return_tensors="pt").to(self.device)
-        
         # Forzamos que el idioma de salida sea Inglés
         forced_bos_token_id = self.tokenizer.lang_code_to_id["eng_Latn"]
-        
+
         with torch.no_grad():
             generated_tokens = self.model.generate(
                 **inputs,
                 forced_bos_token_id=forced_bos_token_id,
-                max_length=128,
-                num_beams=5 # Beam Search para mejor calidad
+                **self.generation_params
             )
-            
-        translation = self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)[0]
-        
+
+        return self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
+
+    def _cache_lookup(self, texts):
+        """
+        Consulta la memoria de traducciones.
+        Devuelve (traducciones conocidas o None, {clave: posiciones pendientes}).
+        Las claves pendientes conservan el orden de primera aparición y cada una
+        necesita un solo forward aunque el texto se repita.
+        """
+        translations = [None] * len(texts)
+        if self.cache is None:
+            return translations, {i: [i] for i in range(len(texts))}
+
+        # La clave incluye los parámetros de generación vigentes
+        fingerprint = TranslationCache.fingerprint(self.model_fingerprint, self.generation_params, "eng_Latn")
+        keys = [self.cache.make_key(text, fingerprint) for text in texts]
+        cached = self.cache.get_many(keys)
+        pending = {}
+        for i, key in enumerate(keys):
+            if key in cached:
+                translations[i] = cached[key]
+            else:
+                pending.setdefault(key, []).append(i)
+        return translations, pending
+
+    def _cache_store(self, items):
+        if self.cache is not None:
+            self.cache.put_many(items)
+
+    def translate_batch(self, texts, batch_size=None):
+        """
+        Inferencia Neuronal por cubetas de longitud (Length Bucketing).
+        Consulta primero la memoria de traducciones; sólo los textos nuevos
+        pasan por el modelo, ordenados por número de tokens para minimizar padding.
+        Devuelve las traducciones en el orden original.
+        """
+        batch_size = batch_size or self.batch_size
+        texts = list(texts)
+        translations, pending = self._cache_lookup(texts)
+        todo = [texts[positions[0]] for positions in pending.values()]
+
+        outputs = self._translate_uncached(todo, batch_size)
+
+        for positions, translation in zip(pending.values(), outputs):
+            for i in positions:
+                translations[i] = translation
+        if outputs:
+            self._cache_store(zip(pending.keys(), outputs))
+        return translations
+
+    def _translate_uncached(self, texts, batch_size):
+        """Generación pura (sin caché) agrupando por longitud de tokens."""
+        if not texts:
+            return []
+        lengths = [len(ids) for ids in self.tokenizer(texts)["input_ids"]]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+        translations = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            outputs = self._generate([texts[i] for i in bucket])
+            for i, translation in zip(bucket, outputs):
+                translations[i] = translation
+        return translations
+
+    def _judge(self, text, translation):
         # 2. Validación Simbólica (Marduk)
         confidence, warnings = self.marduk.validate(text, translation)
-        
+
         return {
             "source": text,
             "translation": translation,
             "confidence": confidence,
             "flags": warnings
-        }
\ No newline at end of file
+        }
+
+    def predict(self, text):
+        # 1. Inferencia Neuronal (pasa por la memoria de traducciones)
+        translation = self.translate_batch([text], batch_size=1)[0]
+        return self._judge(text, translation)
+
+    def predict_batch(self, texts, batch_size=None):
+        """Versión por lotes de predict(): mismo formato de salida, mismo orden de entrada."""
+        texts = list(texts)
+        translations = self.translate_batch(texts, batch_size)
+        return [self._judge(text, translation) for text, translation in zip(texts, translations)]
@@ -2,66 +2,288 @@
 import pandas as pd
 import sys
 import os
+import io
+import csv
+import json
+import time
+import torch
 
 # Añadir src al path
 sys.path.append(os.path.join(os.getcwd(), 'src'))
 
 from src.kanish_engine import KanishInferenceEngine
-from src.config import PATHS
+from src.inference_pool import InferencePool
+from src.marduk_validator import MardukValidator
+try:
+    from src.config import PATHS
+except ImportError:
+    # Fallback si no existe config.py aún (rutas de settings.json)
+    PATHS = {
+        "RAW_TEST": os.path.join("input", "raw_data", "test.csv")
+    }
 
-def run_inference_pipeline():
+class SubmissionWriter:
+    """
+    Escritor incremental de submission.csv + audit_report_marduk.csv.
+    Vuelca filas a disco cada `flush_every` registros y guarda un checkpoint
+    (último id + offsets de ambos archivos) para reanudar una ejecución interrumpida.
+    """
+    def __init__(self, submission_path, audit_path, checkpoint_path, flush_every=100):
+        self.submission_path = submission_path
+        self.audit_path = audit_path
+        self.checkpoint_path = checkpoint_path
+        self.flush_every = flush_every
+        self.rows_done = 0
+        self.last_id = None
+        self.flagged = 0
+        self._pending = 0
+
+        checkpoint = self._read_checkpoint()
+        if checkpoint:
+            # Reanudar: recortamos cualquier fila escrita después del último checkpoint
+            self.rows_done = checkpoint['rows_done']
+            self.last_id = checkpoint['last_id']
+            self.flagged = checkpoint.get('flagged', 0)
+            self.f_sub = open(submission_path, 'r+', newline='', encoding='utf-8')
+            self.f_sub.truncate(checkpoint['submission_offset'])
+            self.f_sub.seek(0, os.SEEK_END)
+            self.f_audit = open(audit_path, 'r+', newline='', encoding='utf-8')
+            self.f_audit.truncate(checkpoint['audit_offset'])
+            self.f_audit.seek(0, os.SEEK_END)
+            self.w_sub = csv.writer(self.f_sub)
+            self.w_audit = csv.writer(self.f_audit)
+            print(f"⏯️ Reanudando desde el id {self.last_id} ({self.rows_done} filas ya escritas)")
+        else:
+            self.f_sub = open(submission_path, 'w', newline='', encoding='utf-8')
+            self.f_audit = open(audit_path, 'w', newline='', encoding='utf-8')
+            self.w_sub = csv.writer(self.f_sub)
+            self.w_audit = csv.writer(self.f_audit)
+            # Para Kaggle solo necesitamos id y translation
+            self.w_sub.writerow(['id', 'translation'])
+            # Campos extra para auditoría (no se envían a Kaggle, pero sirven para ti)
+            self.w_audit.writerow(['id', 'translation', 'confidence', 'marduk_flags'])
+            self.checkpoint()
+
+    def _read_checkpoint(self):
+        if not (os.path.exists(self.checkpoint_path)
+                and os.path.exists(self.submission_path) and os.path.exists(self.audit_path)):
+            return None
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, row_id, output):
+        self.w_sub.writerow([row_id, output['translation']])
+        self.w_audit.writerow([row_id, output['translation'], output['confidence'], str(output['flags'])])
+        if output['confidence'] < 0.7:
+            self.flagged += 1
+        self.rows_done += 1
+        self.last_id = row_id
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Flush + fsync de ambos CSV y escritura atómica del checkpoint."""
+        for f in (self.f_sub, self.f_audit):
+            f.flush()
+            os.fsync(f.fileno())
+        state = {
+            'rows_done': self.rows_done,
+            'last_id': self.last_id,
+            'flagged': self.flagged,
+            'submission_offset': self.f_sub.tell(),
+            'audit_offset': self.f_audit.tell()
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, default=str)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._pending = 0
+
+    def close(self, completed=False):
+        self.checkpoint()
+        self.f_sub.close()
+        self.f_audit.close()
+        # Ejecución completa: la próxima vez se empieza de cero
+        if completed:
+            os.remove(self.checkpoint_path)
+
+def skip_records(chunks, n):
+    """
+    Descarta los primeros n registros CSV de un lector por bloques.
+    Cuenta registros ya parseados (no líneas físicas), así un campo entrecomillado
+    con saltos de línea no desplaza la reanudación.
+    """
+    for chunk in chunks:
+        if n >= len(chunk):
+            n -= len(chunk)
+            continue
+        yield chunk.iloc[n:]
+        n = 0
+
+def iter_batches(chunks, offset=0):
+    """
+    (ids, textos) por bloque de test.csv. Sin columna id las filas se numeran
+    desde `offset` (filas ya escritas al reanudar).
+    """
+    for df_chunk in chunks:
+        # Asegurarnos de usar la columna correcta
+        col_text = 'transliteration' if 'transliteration' in df_chunk.columns else 'text'
+        texts = df_chunk[col_text].tolist()
+        ids = df_chunk['id'].tolist() if 'id' in df_chunk.columns else range(offset, offset + len(texts))
+        offset += len(texts)
+
+        # Limpieza rápida en tiempo de inferencia (si es necesario)
+        # texts = [refinery.process_text(t) for t in texts] <-- Opcional si ya está limpio
+        yield ids, texts
+
+def run_inference_pipeline(batch_size=16, num_workers=1, intra_op_threads=None, quantize=False,
+                           model_path="models/nllb-kanish-finetuned",
+                           quantized_path="models/nllb-kanish-int8.pt",
+                           ontology_path=None,
+                           chunk_size=256, flush_every=100,
+                           submission_path="submission.csv",
+                           audit_path="audit_report_marduk.csv",
+                           checkpoint_path="submission.checkpoint.json"):
     print("--- 🏛️ KANISH SYSTEM: INFERENCE PROTOCOL ---")
     
-    # 1. Cargar Datos de Prueba (Kaggle Test)
+    # 1. Leer Datos de Prueba (Kaggle Test) en bloques
     try:
-        df_test = pd.read_csv(PATHS['RAW_TEST'])
-        # Asegurarnos de usar la columna correcta
-        col_text = 'transliteration' if 'transliteration' in df_test.columns else 'text'
-        texts = df_test[col_text].tolist()
-        ids = df_test['id'].tolist() if 'id' in df_test.columns else range(len(texts))
+        reader = pd.read_csv(PATHS['RAW_TEST'], chunksize=chunk_size)
     except Exception as e:
         print(f"❌ Error cargando test data: {e}")
         return
 
     # 2. Iniciar Motor
-    engine = KanishInferenceEngine() # Cargará el modelo entrenado si existe
-    
-    results = []
-    print(f"🔄 Procesando {len(texts)} tablillas...")
-    
-    for i, text in enumerate(texts):
-        # Limpieza rápida en tiempo de inferencia (si es necesario)
-        # text = refinery.process_text(text) <-- Opcional si ya está limpio
-        
-        output = engine.predict(text)
-        
-        # Lógica de Marduk: Si la confianza es muy baja, marcar para revisión humana
-        # (O en Kaggle, quizás usar un fallback seguro)
-        status = "APPROVED" if output['confidence'] > 0.7 else "FLAGGED"
-        
-        results.append({
-            'id': ids[i],
-            'translation': output['translation'],
-            # Campos extra para auditoría (no se envían a Kaggle, pero sirven para ti)
-            'confidence': output['confidence'],
-            'marduk_flags': str(output['flags'])
-        })
-        
-        if i % 100 == 0:
-            print(f"   [{i}/{len(texts)}] Última: {output['translation']} | Score: {output['confidence']}")
+    # Cargará el modelo entrenado si existe; en int8 reutiliza la conversión guardada para esos pesos
+    engine = KanishInferenceEngine(model_path=model_path, batch_size=batch_size, quantize=quantize,
+                                   quantized_path=quantized_path, ontology_path=ontology_path)
 
-    # 3. Guardar Submission
-    df_submission = pd.DataFrame(results)
-    
-    # Para Kaggle solo necesitamos id y translation
-    submission_path = "submission.csv"
-    df_submission[['id', 'translation']].to_csv(submission_path, index=False)
+    # 3. Preparar escritura incremental (reanuda si hay checkpoint). Sólo ahora, con los datos
+    # y el modelo listos: sin checkpoint el writer trunca la submission anterior
+    writer = SubmissionWriter(submission_path, audit_path, checkpoint_path, flush_every=flush_every)
+    chunks = skip_records(reader, writer.rows_done)
     
-    # Guardar reporte de auditoría completo
-    df_submission.to_csv("audit_report_marduk.csv", index=False)
+    # Traducción por lotes ordenados por longitud (el orden original se conserva)
+    # Con num_workers > 1 (sólo CPU) el corpus se reparte entre procesos y vuelve en streaming
+    pool = None
+    if num_workers > 1 and engine.device == "cpu":
+        pool = InferencePool(engine, num_workers=num_workers, intra_op_threads=intra_op_threads)
     
+    print(f"🔄 Procesando tablillas en bloques de {chunk_size} (lotes de {batch_size})...")
+    completed = False
+    try:
+        batches = iter_batches(chunks, writer.rows_done)
+        if pool is not None:
+            # Los shards de varios bloques se solapan entre workers; los bloques vuelven en orden
+            results = pool.imap_predict_chunks(batches, batch_size=batch_size)
+        else:
+            results = ((ids, engine.predict_batch(texts, batch_size=batch_size)) for ids, texts in batches)
+
+        for ids, outputs in results:
+            for row_id, output in zip(ids, outputs):
+                # Lógica de Marduk: Si la confianza es muy baja, marcar para revisión humana
+                # (O en Kaggle, quizás usar un fallback seguro)
+                writer.write(row_id, output)
+            
+            print(f"   [{writer.rows_done}] Última: {output['translation']} | Score: {output['confidence']}")
+        completed = True
+    finally:
+        if pool is not None:
+            pool.close()
+        writer.close(completed=completed)
+
     print(f"\n✅ Misión Cumplida. Archivo generado: {submission_path}")
-    print(f"🛡️ Registros marcados por Marduk: {len(df_submission[df_submission['confidence'] < 0.7])}")
+    print(f"🛡️ Registros marcados por Marduk: {writer.flagged}")
+    if engine.cache is not None:
+        print(f"💾 Memoria de traducciones: {engine.cache.stats()}")
+
+def audit_submission(submission_path="submission.csv", audit_path="audit_batch_marduk.csv",
+                     ontology_path=None):
+    """
+    Re-auditoría de una submission ya escrita (sin cargar el modelo).
+    Marduk valida todas las filas como operaciones de columna; se puede repetir
+    cada vez que cambian las reglas.
+    """
+    t0 = time.perf_counter()
+    df_sub = pd.read_csv(submission_path)
+    df_test = pd.read_csv(PATHS['RAW_TEST'])
+    col_text = 'transliteration' if 'transliteration' in df_test.columns else 'text'
+    df = df_sub.merge(df_test[['id', col_text]], on='id', how='left')
+
+    marduk = MardukValidator(ontology_path)
+    report = marduk.validate_batch(df[col_text], df['translation'])
+    report.insert(0, 'id', df['id'].values)
+    report['marduk_flags'] = [str(marduk.flag_names(f, m)) for f, m in zip(report['flag_bits'], report['entity_mask'])]
+    report.to_csv(audit_path, index=False)
+
+    print(f"🛡️ Auditoría Marduk: {len(report)} filas en {time.perf_counter() - t0:.2f}s -> {audit_path}")
+    print(f"   Marcadas (confianza < 0.7): {(report['confidence'] < 0.7).sum()}")
+    return report
+
+def _model_size_mb(model):
+    """Tamaño serializado de los pesos (incluye los paquetes int8 de las capas cuantizadas)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / 1e6
+
+def _rss_mb():
+    """Memoria residente del proceso (Linux); None si no está disponible."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        return None
+
+def benchmark_quantization(batch_size=16):
+    """
+    Compara fp32 vs int8 dinámico en CPU sobre el test set:
+    tiempo de carga, latencia por tablilla, tamaño del modelo, RSS y coincidencia de salidas.
+    """
+    print("--- ⏱️ BENCHMARK: fp32 vs int8 (CPU) ---")
+    df_test = pd.read_csv(PATHS['RAW_TEST'])
+    col_text = 'transliteration' if 'transliteration' in df_test.columns else 'text'
+    texts = df_test[col_text].astype(str).tolist()
+
+    torch.set_num_threads(os.cpu_count() or 1)
+    report = []
+    outputs = {}
+    for quantize in (False, True):
+        label = "int8" if quantize else "fp32"
+        rss_before = _rss_mb()
+        t0 = time.perf_counter()
+        # Sin memoria de traducciones: queremos medir el forward real
+        engine = KanishInferenceEngine(batch_size=batch_size, cache_path=None, quantize=quantize)
+        engine.device = "cpu"
+        engine.model.to("cpu")
+        load_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        outputs[label] = engine.translate_batch(texts, batch_size=batch_size)
+        infer_s = time.perf_counter() - t0
+        rss_after = _rss_mb()
+
+        report.append({
+            'mode': label,
+            'load_s': round(load_s, 2),
+            'latency_ms_per_tablet': round(1000 * infer_s / max(len(texts), 1), 1),
+            'model_mb': round(_model_size_mb(engine.model), 1),
+            'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None else None
+        })
+        del engine
+
+    agreement = sum(a == b for a, b in zip(outputs['fp32'], outputs['int8'])) / max(len(texts), 1)
+    df_report = pd.DataFrame(report)
+    print(df_report.to_string(index=False))
+    print(f"🔁 Traducciones idénticas fp32 vs int8: {agreement:.1%}")
+    return df_report
 
 if __name__ == "__main__":
-    run_inference_pipeline()
\ No newline at end of file
+    if "--benchmark-quant" in sys.argv:
+        benchmark_quantization()
+    elif "--audit" in sys.argv:
+        audit_submission()
+    else:
+        run_inference_pipeline(quantize="--quantize" in sys.argv)
\ No newline at end of file
@@ -1,52 +1,115 @@
 import sys
+import os
+import csv
 import json
+import time
+import multiprocessing as mp
+from collections import deque
+
+import pandas as pd
 # Importamos nuestros módulos locales
-from src.data_loader import DataLoader
 from src.cape_parser import CapeParser
 from src.reconstructor import SyntacticReconstructor
+from src.refinery_engine import RefineryEngine
 
 # --- CONFIGURACIÓN ---
 CIPHER_PATH = "config/master_cipher.json"
+LEXICON_PATH = "OA_Lexicon_eBL.csv"
+INPUTS = ["test.csv"]
+OUTPUT_PATH = "sdic_g_translations.csv"
+
+# Columnas candidatas en los CSV (Kaggle / OARE)
+ID_COLUMNS = ['id', 'oare_id', 'text_id']
+TEXT_COLUMN = 'transliteration'
+# Perfil de la Refinería antes del parser: sólo signos rotos. El perfil "refinery" separa
+# los clíticos ("um-ma" -> "um -ma") y rompe el longest-match del léxico.
+PARSE_PROFILE = "broken_signs"
+
+# Motores heredados por los workers vía fork (el trie del léxico se construye una vez)
+_REFINERY = None
+_PARSER = None
+_COMPILER = None
+
+def _translate_chunk(rows):
+    """Worker: [(id, fuente, transliteración)] -> [(id, fuente, traducción, traza)]."""
+    results = []
+    for row_id, source, text in rows:
+        # FASE 1: Refinería SDA-02 ([x], (xx), [...] -> <BROKEN>; los clíticos quedan unidos)
+        text = _REFINERY.refine(text)
+        # FASE 2: Parsing Determinista (longest-match sobre el trie)
+        parsed_vector = _PARSER.parse_text(text)
+        # FASE 3: Reconstrucción Sintáctica
+        translation = _COMPILER.reconstruct(parsed_vector)
+        # Trazabilidad Matemática: glosa y tipo/estado de cada segmento
+        trace = [[t.get('english', 'ERR'), t.get('type', t.get('status', 'MISC'))] for t in parsed_vector]
+        results.append((row_id, source, translation, json.dumps(trace, ensure_ascii=False)))
+    return results
 
-def run_sdic_g_system():
+def init_engines(cipher, lexicon_path=LEXICON_PATH):
+    """Refinería, parser y reconstructor en el proceso actual (antes del fork, los heredan los workers)."""
+    global _REFINERY, _PARSER, _COMPILER
+    _REFINERY = RefineryEngine(PARSE_PROFILE)
+    _PARSER = CapeParser(cipher, lexicon_path if lexicon_path and os.path.exists(lexicon_path) else None)
+    _COMPILER = SyntacticReconstructor()
+
+def iter_chunks(csv_paths, chunk_size=256):
+    """Generador de bloques [(id, fuente, transliteración)] leídos en streaming de los CSV."""
+    for path in csv_paths:
+        source = os.path.basename(path)  # test.csv / train.csv: los ids pueden repetirse entre fuentes
+        if not os.path.exists(path):
+            print(f"⚠️ No existe {path}, se omite.")
+            continue
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            if TEXT_COLUMN not in chunk.columns:
+                print(f"⚠️ {path} no tiene columna '{TEXT_COLUMN}', se omite.")
+                break
+            col_id = next((c for c in ID_COLUMNS if c in chunk.columns), None)
+            ids = chunk[col_id].tolist() if col_id else chunk.index.tolist()
+            texts = chunk[TEXT_COLUMN].fillna('').astype(str).tolist()
+            yield [(row_id, source, text) for row_id, text in zip(ids, texts)]
+
+def run_sdic_g_system(inputs=INPUTS, output_path=OUTPUT_PATH, workers=None, chunk_size=256,
+                      cipher_path=CIPHER_PATH, lexicon_path=LEXICON_PATH, max_inflight=None):
     print("--- 🏛️ SDIC-G SYSTEM SPEC v7.1 [SCIENTIFIC] ---")
     print("Estado: Deterministic Translation Engine Initialized.\n")
 
     # 1. Cargar Cimientos (Sprint 1)
     try:
-        loader = DataLoader(CIPHER_PATH)
+        with open(cipher_path, 'r', encoding='utf-8') as f:
+            cipher = json.load(f)
     except FileNotFoundError:
-        print(f"❌ Error: No se encuentra {CIPHER_PATH}. Ejecuta el Sprint 1.")
+        print(f"❌ Error: No se encuentra {cipher_path}. Ejecuta el Sprint 1.")
         return
 
-    # 2. Inicializar Motores (Sprint 2 & 3)
-    parser = CapeParser(loader.cipher)
-    compiler = SyntacticReconstructor()
-
-    # --- SIMULACIÓN DE DATOS DE ENTRADA (Como si vinieran del CSV) ---
-    # Caso 1: Polivalencia UD (Precedido por KÙ -> Debe ser 'white/pure')
-    # Caso 2: Polivalencia UD (Precedido por Número -> Debe ser 'day')
-    test_cases = [
-        ["DAM.GÀR", "KÙ", "UD", "ANA", "Enlil"],
-        ["5", "UD", "DUB", "É.GAL"],
-        ["DAM.GÀR", "[...]", "UNK_SIGN"]
-    ]
-
-    print("--- 🔬 PROCESSING BATCH ---")
-    
-    for idx, raw_tokens in enumerate(test_cases):
-        print(f"\n>>> CASE {idx+1}: {raw_tokens}")
-        
-        # FASE 2: Parsing Determinista
-        parsed_vector = parser.parse_sequence(raw_tokens)
-        
-        # Debugging del Vector (Trazabilidad Matemática)
-        print(f"    [Trace]: {[t.get('english', 'ERR') for t in parsed_vector]}")
+    # 2. Inicializar Motores (Sprint 2 & 3) en el padre, antes del fork
+    init_engines(cipher, lexicon_path)
 
-        # FASE 3: Reconstrucción Sintáctica
-        translation = compiler.reconstruct(parsed_vector)
-        
-        print(f"    [OUTPUT]: {translation}")
+    workers = workers or os.cpu_count() or 1
+    # Bloques en vuelo acotados: Pool.imap consumiría todo el CSV por adelantado
+    max_inflight = max_inflight or 2 * workers
+    print(f"--- 🔬 PROCESSING BATCH ({', '.join(inputs)} -> {output_path}, {workers} procesos) ---")
+
+    t0 = time.perf_counter()
+    rows = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as f_out, \
+            mp.get_context("fork").Pool(workers) as pool:
+        writer = csv.writer(f_out)
+        writer.writerow(['id', 'source', 'translation', 'trace'])
+        # Ventana FIFO de tareas: conserva el orden y lee el CSV sólo al ritmo de los workers
+        pending = deque()
+        for chunk in iter_chunks(inputs, chunk_size):
+            pending.append(pool.apply_async(_translate_chunk, (chunk,)))
+            if len(pending) >= max_inflight:
+                results = pending.popleft().get()
+                writer.writerows(results)
+                rows += len(results)
+        while pending:
+            results = pending.popleft().get()
+            writer.writerows(results)
+            rows += len(results)
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {rows} tablillas traducidas en {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} tablillas/s)")
 
 if __name__ == "__main__":
-    run_sdic_g_system()
\ No newline at end of file
+    run_sdic_g_system(inputs=sys.argv[1:] or INPUTS)
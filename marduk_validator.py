@@ -1,14 +1,124 @@
 # src/marduk_validator.py
-import re
+import json
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .metrology import NUMBER_WORDS, SOURCE_HAS_NUMBER, parse_source, missing_quantities
+    from .graph_store import open_brain
+except ImportError:
+    from metrology import NUMBER_WORDS, SOURCE_HAS_NUMBER, parse_source, missing_quantities
+    from graph_store import open_brain
+
+try:
+    import ahocorasick  # pyahocorasick: autómata en C (opcional)
+except ImportError:
+    # Sin pyahocorasick: se usa el autómata en Python puro (mismo resultado)
+    ahocorasick = None
+
+# Bits de la columna 'flag_bits' de validate_batch
+FLAG_MISSING_NUMBER = 1
+FLAG_MISSING_ENTITY = 2
+FLAG_HALLUCINATION = 4
+
+# Por debajo de este nº de patrones, los "in" de C son más rápidos que recorrer el autómata
+# (punto de cruce medido sobre las traducciones de train.csv)
+MIN_PATTERNS_AUTOMATON = 32 if ahocorasick is not None else 160
+
+class PatternAutomaton:
+    """
+    Autómata Aho–Corasick: detecta TODOS los patrones presentes en un texto
+    (incluidos los solapados) en una sola pasada, sin importar cuántos patrones haya.
+    Con pocos patrones se queda en búsqueda directa de subcadenas (mismo resultado).
+    """
+    def __init__(self, patterns, min_patterns=None):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self._native = None
+        self.scan = len(self.patterns) < (MIN_PATTERNS_AUTOMATON if min_patterns is None else min_patterns)
+        if self.scan:
+            return
+        if ahocorasick is not None:
+            self._native = ahocorasick.Automaton()
+            for i, pattern in enumerate(self.patterns):
+                self._native.add_word(pattern, i)
+            self._native.make_automaton()
+            return
+
+        # Trie (goto) + enlaces de fallo + salidas acumuladas por estado
+        self.goto = [{}]
+        self.out = [frozenset()]
+        for i, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.out.append(frozenset())
+                state = nxt
+            self.out[state] = self.out[state] | {i}
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] | self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """Índices de los patrones que aparecen en text."""
+        if self.scan:
+            return {i for i, pattern in enumerate(self.patterns) if pattern in text}
+        if self._native is not None:
+            return {i for _, i in self._native.iter(text)}
+
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+    def find_matrix(self, texts):
+        """
+        Matriz booleana (textos x patrones). En modo escaneo es una operación de columna
+        (str.contains) por patrón; con autómata, una pasada por texto.
+        """
+        texts = pd.Series(texts, dtype=object)
+        matrix = np.zeros((len(texts), len(self.patterns)), dtype=bool)
+        if self.scan:
+            for i, pattern in enumerate(self.patterns):
+                matrix[:, i] = texts.str.contains(pattern, regex=False).to_numpy(dtype=bool)
+            return matrix
+        for u, text in enumerate(texts):
+            hits = self.find(text)
+            if hits:
+                matrix[u, list(hits)] = True
+        return matrix
 
 class MardukValidator:
     """
     El Juez Neuro-Simbólico.
     Valida la consistencia lógica entre Fuente (Acadio) y Destino (Inglés).
+    Los logogramas y sus traducciones esperadas se compilan en dos autómatas
+    Aho–Corasick: una pasada por la fuente y otra por la traducción.
     """
-    def __init__(self):
+    def __init__(self, ontology_path=None):
+        # Cifra -> numeral inglés. Se conserva por compatibilidad: la validación numérica
+        # ya no lo consulta (compara valores normalizados por metrology: minas, siclos, numerales)
+        self.num_map = dict(NUMBER_WORDS)
         # Mapeos críticos de consistencia
-        self.num_map = {'1': 'one', '2': 'two', '3': 'three', '10': 'ten', '5': 'five'}
         self.entity_map = {
             'KÙ.BABBAR': ['silver', 'money'],
             'KÙ.GI': ['gold'],
@@ -16,9 +126,50 @@ class MardukValidator:
             'TÚG': ['textile', 'garment', 'cloth'],
             'DUMU': ['son']
         }
+        # Ontología externa (kanish_brain_frozen.json o su snapshot .graph): mercancías acadio -> inglés
+        if ontology_path:
+            self.load_ontology(ontology_path)
+        else:
+            self._compile()
+
+    def load_ontology(self, ontology_path):
+        try:
+            try:
+                # Snapshot CSR en mmap (sólo se leen los nodos Commodity); un .json se convierte
+                # una vez a <nombre>.graph y las cargas siguientes abren el snapshot
+                commodities = open_brain(ontology_path).commodities()
+            except OSError:
+                # No se pudo escribir el snapshot (montaje de sólo lectura como /kaggle/input, EROFS;
+                # sin permisos) o el JSON no tiene extensión .json: lectura directa
+                with open(ontology_path, 'r', encoding='utf-8') as f:
+                    commodities = json.load(f).get('commodities', {})
+        except FileNotFoundError:
+            print(f"⚠️ No se encontró la ontología {ontology_path}; se usa el mapa base.")
+            commodities = {}
+        for token, english in commodities.items():
+            expected = self.entity_map.setdefault(token, [])
+            for word in ([english] if isinstance(english, str) else english):
+                if word.lower() not in expected:
+                    expected.append(word.lower())
+        self._compile()
+
+    def _compile(self):
+        """Precompila los autómatas (fuente: logogramas; destino: palabras inglesas esperadas)."""
+        self.entity_tokens = list(self.entity_map)
+        self.src_automaton = PatternAutomaton(self.entity_tokens)
+        self.trg_automaton = PatternAutomaton(w for words in self.entity_map.values() for w in words)
+        word_ids = {w: i for i, w in enumerate(self.trg_automaton.patterns)}
+        # Por logograma: índices de las palabras que lo confirman
+        self.entity_words = [frozenset(word_ids[w] for w in self.entity_map[t] if w in word_ids)
+                             for t in self.entity_tokens]
+        # Incidencia palabra x logograma: qué logogramas confirma cada palabra encontrada
+        self.word_entities = np.zeros((len(word_ids), len(self.entity_tokens)), dtype=np.int32)
+        for i, ids in enumerate(self.entity_words):
+            self.word_entities[list(ids), i] = 1
 
     def extract_numbers(self, text):
-        return re.findall(r'\d+', text)
+        """Cantidades normalizadas del original (pesos en siclos, ver metrology)."""
+        return list(parse_source(text))
 
     def validate(self, source_text, translated_text):
         """
@@ -31,21 +182,19 @@ class MardukValidator:
         trg_lower = translated_text.lower()
 
         # 1. Validación Numérica (Aritmética Sagrada)
-        src_nums = self.extract_numbers(source_text)
-        for num in src_nums:
-            # Si hay un "10" en acadio, debe haber un "10" o "ten" en inglés
-            num_word = self.num_map.get(num, num) # fallback al mismo digito
-            if num not in translated_text and num_word not in trg_lower:
-                warnings.append(f"MISSING_NUMBER_{num}")
-                score -= 0.3
-
-        # 2. Validación de Mercancías (Ontología)
-        for token, expected_words in self.entity_map.items():
-            if token in source_text: # Si el logograma está en el original
+        # Se compara por valor: "0.33333 ma-na 2 GÍN" acepta "22 shekels" o "1/3 mina 2 shekels"
+        for quantity in missing_quantities(source_text, translated_text):
+            warnings.append(f"MISSING_NUMBER_{quantity.text}")
+            score -= 0.3
+
+        # 2. Validación de Mercancías (Ontología): una pasada por cada texto
+        present = self.src_automaton.find(source_text) # Logogramas en el original
+        if present:
+            found_words = self.trg_automaton.find(trg_lower)
+            for i in sorted(present):
                 # Verificar si alguna de las traducciones esperadas aparece
-                match = any(w in trg_lower for w in expected_words)
-                if not match:
-                    warnings.append(f"MISSING_ENTITY_{token}")
+                if not (self.entity_words[i] & found_words):
+                    warnings.append(f"MISSING_ENTITY_{self.entity_tokens[i]}")
                     score -= 0.2
 
         # 3. Detector de Alucinación (Longitud)
@@ -54,4 +203,96 @@ class MardukValidator:
              warnings.append("POSSIBLE_HALLUCINATION_LENGTH")
              score -= 0.1
 
-        return max(0.0, score), warnings
\ No newline at end of file
+        return max(0.0, score), warnings
+
+    @staticmethod
+    def _score(n_numbers, n_entities, hallucination):
+        """Mismo cálculo (y mismo redondeo flotante) que validate()."""
+        score = 1.0
+        for _ in range(n_numbers):
+            score -= 0.3
+        for _ in range(n_entities):
+            score -= 0.2
+        if hallucination:
+            score -= 0.1
+        return max(0.0, score)
+
+    def validate_batch(self, sources, translations):
+        """
+        Auditoría de una submission completa.
+        Devuelve un DataFrame (mismo índice que sources) con:
+          confidence, flag_bits (bits FLAG_*), entity_mask (bit i = entity_tokens[i] sin traducir),
+          missing_numbers, missing_entities, length_ratio.
+        El score es idéntico al de validate() fila a fila.
+        Mercancías, longitudes y score son operaciones de columna sobre los textos distintos
+        (códigos de pd.factorize). La comparación numérica no: el análisis metrológico es un
+        tokenizador en Python por texto y domina el coste, así que sobre filas todas distintas
+        cuesta lo mismo que el bucle de validate(); se gana cuando fuentes o traducciones se repiten.
+        """
+        src = pd.Series(sources).fillna('').astype(str)
+        # Alineación por posición (el índice de translations no cuenta)
+        trg = pd.Series(translations).set_axis(src.index).fillna('').astype(str)
+        n = len(src)
+        # Cada texto distinto se analiza una sola vez (fórmulas y traducciones repetidas)
+        src_codes, src_uniq = pd.factorize(src)
+        trg_codes, trg_uniq = pd.factorize(trg)
+        src_uniq = pd.Series(list(src_uniq), dtype=object)
+        trg_uniq = pd.Series(list(trg_uniq), dtype=object)
+        trg_lower_uniq = trg_uniq.str.lower()
+
+        # 1. Validación Numérica: sólo fuentes con algún token numérico (filtro de columna) y
+        #    cantidades, una vez por par (fuente, traducción) distinto
+        missing_numbers = np.zeros(n, dtype=np.int64)
+        has_quantities = np.array(src_uniq.str.contains(SOURCE_HAS_NUMBER, regex=True), dtype=bool)
+        for u in np.flatnonzero(has_quantities).tolist():
+            has_quantities[u] = bool(parse_source(src_uniq[u]))
+        rows = np.flatnonzero(has_quantities[src_codes]) if n else np.zeros(0, dtype=np.int64)
+        if len(rows):
+            width = len(trg_uniq)
+            pairs, inverse = np.unique(src_codes[rows].astype(np.int64) * width + trg_codes[rows],
+                                       return_inverse=True)
+            counts = np.fromiter((len(missing_quantities(src_uniq[p // width], trg_uniq[p % width]))
+                                  for p in pairs.tolist()), dtype=np.int64, count=len(pairs))
+            missing_numbers[rows] = counts[inverse]
+
+        # 2. Validación de Mercancías: matrices (texto distinto x logograma) indexadas por los códigos
+        present = self.src_automaton.find_matrix(src_uniq)
+        covered = (self.trg_automaton.find_matrix(trg_lower_uniq).astype(np.int32) @ self.word_entities) > 0
+        missing = present[src_codes] & ~covered[trg_codes]
+        missing_entities = missing.sum(axis=1)
+        if len(self.entity_tokens) <= 63:
+            entity_mask = missing.astype(np.int64) @ (np.int64(1) << np.arange(len(self.entity_tokens), dtype=np.int64))
+        else:
+            entity_mask = [sum(1 << int(i) for i in np.flatnonzero(row)) for row in missing]
+
+        # 3. Detector de Alucinación (Longitud)
+        src_len = src_uniq.str.lower().str.len().to_numpy(dtype=np.int64)[src_codes]
+        trg_len = trg_lower_uniq.str.len().to_numpy(dtype=np.int64)[trg_codes]
+        hallucination = (trg_len > src_len * 4) & (src_len > 5)
+
+        flags = ((missing_numbers > 0) * FLAG_MISSING_NUMBER
+                 | (missing_entities > 0) * FLAG_MISSING_ENTITY
+                 | hallucination * FLAG_HALLUCINATION)
+
+        # Score: se calcula una vez por combinación distinta de penalizaciones
+        combo_codes, combos = pd.MultiIndex.from_arrays([missing_numbers, missing_entities, hallucination]).factorize()
+        confidence = np.array([self._score(*c) for c in combos], dtype=np.float64)[combo_codes]
+
+        return pd.DataFrame({
+            'confidence': confidence,
+            'flag_bits': flags.astype(np.int64),
+            'entity_mask': entity_mask,
+            'missing_numbers': missing_numbers,
+            'missing_entities': missing_entities,
+            'length_ratio': trg_len / np.maximum(src_len, 1)
+        }, index=src.index)
+
+    def flag_names(self, flags, entity_mask=0):
+        """Decodifica los bits de validate_batch a etiquetas legibles."""
+        names = []
+        if flags & FLAG_MISSING_NUMBER:
+            names.append("MISSING_NUMBER")
+        names.extend(f"MISSING_ENTITY_{t}" for i, t in enumerate(self.entity_tokens) if int(entity_mask) >> i & 1)
+        if flags & FLAG_HALLUCINATION:
+            names.append("POSSIBLE_HALLUCINATION_LENGTH")
+        return names
@@ -0,0 +1,223 @@
+# src/metrology.py
+import re
+import sys
+import time
+from collections import namedtuple
+from fractions import Fraction
+from functools import lru_cache
+
+# Metrología paleoasiria: todo peso se normaliza a siclos (GÍN)
+SHEKEL = 1
+MINA = 60 * SHEKEL      # ma-na
+TALENT = 60 * MINA      # GÚ (biltum)
+
+# Unidades de la transliteración (con sufijos: ma-na-im, ma-na.TA, GÍN.TA...)
+SOURCE_UNITS = {'ma-na': MINA, 'GÍN': SHEKEL, 'GÌN': SHEKEL, 'GÚ': TALENT}
+SOURCE_MULTIPLIERS = {'me-at': 100, 'li-im': 1000}
+SOURCE_UNIT_RE = re.compile(r'^(%s)(?:[-.].*)?$' % '|'.join(map(re.escape, SOURCE_UNITS)))
+SOURCE_NUMBER_RE = re.compile(r'^\d+(?:\.\d+)?$')  # token numérico completo (no "SIG5", "ITU.1.KAM")
+# Lo mismo sobre el texto entero (filtro por columna: sin token numérico no hay cantidades)
+SOURCE_HAS_NUMBER = r'(?:^|\s)\d+(?:\.\d+)?(?=\s|$)'
+
+# Traducción inglesa
+ENGLISH_UNITS = {'mina': MINA, 'minas': MINA, 'shekel': SHEKEL, 'shekels': SHEKEL,
+                 'talent': TALENT, 'talents': TALENT}
+ENGLISH_ONES = {w: i for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen "
+    "fifteen sixteen seventeen eighteen nineteen".split())}
+ENGLISH_TENS = {w: 10 * i for i, w in enumerate(
+    "twenty thirty forty fifty sixty seventy eighty ninety".split(), start=2)}
+ENGLISH_SCALES = {'hundred': 100, 'thousand': 1000}
+# Cifra -> numeral inglés ('5' -> 'five'); la tabla que usaba MardukValidator.num_map
+NUMBER_WORDS = {str(v): w for w, v in {**ENGLISH_ONES, **ENGLISH_TENS}.items()}
+ENGLISH_FRACTIONS = {'half': Fraction(1, 2), 'halves': Fraction(1, 2), 'third': Fraction(1, 3),
+                     'thirds': Fraction(1, 3), 'quarter': Fraction(1, 4), 'quarters': Fraction(1, 4),
+                     'sixth': Fraction(1, 6), 'sixths': Fraction(1, 6)}
+VULGAR_FRACTIONS = {'½': Fraction(1, 2), '⅓': Fraction(1, 3), '⅔': Fraction(2, 3), '¼': Fraction(1, 4),
+                    '¾': Fraction(3, 4), '⅙': Fraction(1, 6), '⅚': Fraction(5, 6)}
+ENGLISH_LINKS = {'a', 'an', 'and', 'of'}  # no cortan una cantidad ("one and a half", "half of a mina")
+ENGLISH_ARTICLES = {'a', 'an', 'per'}     # sin número delante, valen una unidad ("a mina", "per mina")
+ENGLISH_TOKEN_RE = re.compile(r'\d+/\d+|\d+(?:\.\d+)?|[%s]|[a-z]+|[,;:.()]' % ''.join(VULGAR_FRACTIONS))
+
+# Cantidad normalizada: texto original, valor (siclos si es peso), ¿es peso?, nº de partes
+Quantity = namedtuple('Quantity', ['text', 'value', 'weight', 'parts'])
+
+@lru_cache(maxsize=4096)
+def canonical_number(literal):
+    """
+    '0.33333' -> 1/3, '1.3333300000000001' -> 4/3, '13.5' -> 27/2.
+    Los decimales periódicos truncados se llevan a la fracción sexagesimal exacta.
+    """
+    value = Fraction(literal)
+    snapped = value.limit_denominator(12)
+    return snapped if abs(snapped - value) < Fraction(1, 1000) else value
+
+@lru_cache(maxsize=65536)
+def parse_source(text):
+    """
+    Cantidades de una transliteración, en orden.
+    '0.33333 ma-na 2 GÍN' es una sola cantidad de 22 siclos; '1 TÚG' es el número 1.
+    """
+    tokens = text.split()
+    quantities = []
+    i = 0
+    while i < len(tokens):
+        if not SOURCE_NUMBER_RE.match(tokens[i]):
+            i += 1
+            continue
+        start, total, parts, last_unit = i, Fraction(0), 0, None
+        # Pesos compuestos en orden descendente: "18 GÚ 6 ma-na", "2 ma-na 13.5 GÍN"
+        while i + 1 < len(tokens) and SOURCE_NUMBER_RE.match(tokens[i]):
+            unit = SOURCE_UNIT_RE.match(tokens[i + 1])
+            if not unit or (last_unit is not None and SOURCE_UNITS[unit.group(1)] >= last_unit):
+                break
+            last_unit = SOURCE_UNITS[unit.group(1)]
+            total += canonical_number(tokens[i]) * last_unit
+            parts += 1
+            i += 2
+        if parts:
+            quantities.append(Quantity(" ".join(tokens[start:i]), total, True, parts))
+            continue
+        value = canonical_number(tokens[i])
+        if i + 1 < len(tokens) and tokens[i + 1] in SOURCE_MULTIPLIERS:
+            value *= SOURCE_MULTIPLIERS[tokens[i + 1]]
+            i += 1
+        quantities.append(Quantity(" ".join(tokens[start:i + 1]), value, False, 1))
+        i += 1
+    return tuple(quantities)
+
+@lru_cache(maxsize=65536)
+def parse_english(text):
+    """
+    Valores numéricos de una traducción: (pesos en siclos, números sueltos, todos los números).
+    Entiende dígitos, decimales, '1/3', '½', numerales ingleses ('twenty-two', 'two thirds',
+    'one and a half') y unidades mina/shekel/talent, sumando pesos contiguos ("2 minas 13.5 shekels").
+    """
+    weights, bare, numbers = set(), set(), set()
+    current = None      # número en construcción
+    adding = False      # se leyó "and": la fracción siguiente se suma
+    chain = None        # peso acumulado mientras sigan llegando "N unidad"
+    article = False     # "a"/"an"/"per" sin número pendiente: la unidad siguiente cuenta como 1
+
+    def flush():
+        nonlocal current, adding, chain
+        if current is not None:
+            bare.add(current)
+            numbers.add(current)
+            chain = None
+        current, adding = None, False
+
+    for tok in ENGLISH_TOKEN_RE.findall(text.lower()):
+        if tok[0].isdigit() or tok in VULGAR_FRACTIONS:
+            if tok in VULGAR_FRACTIONS:
+                value = VULGAR_FRACTIONS[tok]
+            elif '/' in tok:
+                num, den = tok.split('/')
+                value = Fraction(int(num), int(den)) if int(den) else Fraction(int(num))
+            else:
+                value = canonical_number(tok)
+            if current is not None and (tok in VULGAR_FRACTIONS or adding) and value < 1:
+                current += value        # "1½", "1 and 1/2"
+            else:
+                flush()
+                current = value
+            adding = article = False
+        elif tok in ENGLISH_ONES or tok in ENGLISH_TENS:
+            value = ENGLISH_ONES.get(tok, ENGLISH_TENS.get(tok))
+            if current is not None and current % 10 == 0 and current >= 20 and value < 10 and not adding:
+                current += value        # "twenty-two"
+            elif current is not None and current % 100 == 0 and adding:
+                current += value        # "one hundred and five"
+            else:
+                flush()
+                current = Fraction(value)
+            adding = article = False
+        elif tok in ENGLISH_SCALES and current is not None:
+            current *= ENGLISH_SCALES[tok]
+        elif tok in ENGLISH_FRACTIONS:
+            frac = ENGLISH_FRACTIONS[tok]
+            if current is None:
+                current = frac                          # "half a mina"
+            elif adding:
+                current += frac                         # "one and a half"
+            elif frac.denominator > 1 and current.denominator == 1 and current < frac.denominator:
+                current *= frac                         # "two thirds"
+            else:
+                flush()
+                current = frac
+            adding = article = False
+        elif tok in ENGLISH_UNITS and (current is not None or article):
+            if current is None:
+                value = Fraction(ENGLISH_UNITS[tok])   # "a mina": sólo el peso (no hay cifra escrita)
+            else:
+                value = current * ENGLISH_UNITS[tok]
+                numbers.add(current)
+            weights.add(value)
+            chain = value if chain is None else chain + value
+            weights.add(chain)
+            current, adding, article = None, False, False
+        elif tok in ENGLISH_LINKS and (current is not None or tok not in ENGLISH_ARTICLES):
+            adding = adding or tok == 'and'
+        elif tok in ENGLISH_ARTICLES:
+            # "a mina", "1/2 shekel per mina": artículo sin número delante
+            flush()
+            if tok == 'per':
+                chain = None
+            article = True
+        else:
+            flush()
+            chain = None
+            article = False
+    flush()
+    return frozenset(weights), frozenset(bare), frozenset(numbers)
+
+def missing_quantities(source_text, translated_text):
+    """Cantidades de la fuente que no aparecen (como valor) en la traducción."""
+    quantities = parse_source(source_text)
+    if not quantities:
+        return []
+    weights, bare, numbers = parse_english(translated_text)
+    missing = []
+    for q in quantities:
+        if q.weight:
+            # El peso debe coincidir en siclos; con una sola unidad vale también el número sin unidad
+            found = q.value in weights or (q.parts == 1 and _leading_number(q.text) in bare)
+        else:
+            found = q.value in numbers
+        if not found:
+            missing.append(q)
+    return missing
+
+def _leading_number(text):
+    return canonical_number(text.split(' ', 1)[0])
+
+# --- BENCHMARK ---
+
+def benchmark_metrology(csv_path="train.csv"):
+    """Cobertura y coste del normalizador sobre los pares fuente/traducción del corpus."""
+    import pandas as pd
+    df = pd.read_csv(csv_path).dropna(subset=['transliteration', 'translation'])
+    pairs = list(zip(df['transliteration'], df['translation']))
+
+    legacy_missing = 0
+    legacy_map = {n: NUMBER_WORDS[n] for n in ('1', '2', '3', '10', '5')}  # num_map original
+    for src, trg in pairs:
+        legacy_missing += sum(1 for n in re.findall(r'\d+', src)
+                              if n not in trg and legacy_map.get(n, n) not in trg.lower())
+
+    for label in ("frío", "caché"):
+        if label == "frío":
+            parse_source.cache_clear()
+            parse_english.cache_clear()
+        t0 = time.perf_counter()
+        missing = sum(len(missing_quantities(src, trg)) for src, trg in pairs)
+        elapsed = time.perf_counter() - t0
+        print(f"   {label:<6} {len(pairs) / elapsed:>9.0f} pares/s")
+
+    total = sum(len(parse_source(src)) for src, _ in pairs)
+    print(f"--- ⚖️ METROLOGÍA ({len(pairs)} pares de {csv_path}) ---")
+    print(f"   Cantidades en la fuente: {total}")
+    print(f"   Sin respaldo en la traducción: {missing} (antes, dígitos sueltos: {legacy_missing})")
+
+if __name__ == "__main__":
+    benchmark_metrology(*sys.argv[1:2])
@@ -1,13 +1,115 @@
 # src/ontology_injector.py
+import sys
+import time
+
 from neo4j import GraphDatabase
 
+# Tipo de tripleta -> (etiqueta del objeto, relación). El predicado concreto va en r.type,
+# porque Cypher no admite tipos de relación como parámetro.
+TRIPLET_SCHEMAS = {
+    "Commodity": ("Commodity", "TRANSACTION"),   # (Puzur-Ashur)-[OWES]->(Silver)
+    "Location": ("Location", "LOCATED"),         # (Puzur-Ashur)-[TRAVELS_TO]->(Kanesh)
+    "Role": ("Role", "HAS_ROLE"),                # (Puzur-Ashur)-[ACTS_AS]->(tamkarum)
+}
+
+def _triplet_query(kind):
+    label, relation = TRIPLET_SCHEMAS[kind]
+    return f"""
+    UNWIND $rows AS row
+    MERGE (s:Person {{name: row.sub}})
+    MERGE (o:{label} {{name: row.obj}})
+    MERGE (t:Tablet {{id: row.tid}})
+    // Relación dinámica según el predicado
+    MERGE (s)-[r:{relation} {{type: row.pred}}]->(o)
+    SET r.source = row.tid
+    """
+
+TRIPLET_QUERIES = {kind: _triplet_query(kind) for kind in TRIPLET_SCHEMAS}
+
+class BulkTripletWriter:
+    """
+    Escritor por lotes: acumula tripletas y las envía con UNWIND $rows dentro de
+    transacciones de escritura gestionadas (una ida y vuelta por lote, no por hecho).
+    Los errores transitorios los reintenta execute_write (lote completo, con espera exponencial,
+    hasta max_transaction_retry_time del driver): no hay otro bucle de reintentos encima.
+    """
+    def __init__(self, driver, batch_size=1000, database=None):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.database = database
+        self.buffers = {kind: [] for kind in TRIPLET_SCHEMAS}
+        self.rows = 0
+        self.batches = 0
+        self.retries = 0
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    def add(self, subject, predicate, object_, tablet_id, kind="Commodity"):
+        if kind not in TRIPLET_SCHEMAS:
+            raise ValueError(f"Tipo de tripleta desconocido: {kind} (válidos: {', '.join(TRIPLET_SCHEMAS)})")
+        buffer = self.buffers[kind]
+        buffer.append({"sub": subject, "pred": predicate, "obj": object_, "tid": tablet_id})
+        if len(buffer) >= self.batch_size:
+            self._write(kind, buffer)
+            self.buffers[kind] = []
+
+    def add_many(self, triplets):
+        """Tripletas (sujeto, predicado, objeto, tablilla[, tipo])."""
+        for triplet in triplets:
+            self.add(*triplet)
+
+    def flush(self):
+        for kind, buffer in self.buffers.items():
+            if buffer:
+                self._write(kind, buffer)
+                self.buffers[kind] = []
+
+    def _run_batch(self, tx, query, rows):
+        # Cada ejecución de la función de transacción es un intento (los reintentos del driver la repiten)
+        self.attempts += 1
+        tx.run(query, rows=rows).consume()
+
+    def _write(self, kind, rows):
+        session_kwargs = {"database": self.database} if self.database else {}
+        t0 = time.perf_counter()
+        attempts = self.attempts
+        with self.driver.session(**session_kwargs) as session:
+            session.execute_write(self._run_batch, TRIPLET_QUERIES[kind], rows)
+        self.retries += max(0, self.attempts - attempts - 1)
+        self.elapsed += time.perf_counter() - t0
+        self.rows += len(rows)
+        self.batches += 1
+
+    def report(self):
+        rate = self.rows / self.elapsed if self.elapsed else 0.0
+        print(f"✅ {self.rows} tripletas en {self.batches} lotes, {self.elapsed:.2f}s "
+              f"({rate:.0f} filas/s, {self.retries} reintentos)")
+        return {"rows": self.rows, "batches": self.batches, "retries": self.retries,
+                "seconds": self.elapsed, "rows_per_second": rate}
+
+    def close(self):
+        self.flush()
+        return self.report()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
 class OntologyInjector:
     """
     Encargado del 'Schema Design' y la carga de grafos.
     Define la estructura rígida de la realidad de Kanesh.
+    Acepta un driver ya creado (Neo4j local, Aura o un driver de ensayo).
+    max_retry_time: tope (s) de los reintentos de cada transacción gestionada del driver propio.
     """
-    def __init__(self, uri, auth):
-        self.driver = GraphDatabase.driver(uri, auth=auth)
+    def __init__(self, uri=None, auth=None, driver=None, max_retry_time=30.0):
+        self.driver = driver or GraphDatabase.driver(uri, auth=auth, max_transaction_retry_time=max_retry_time)
+
+    def close(self):
+        self.driver.close()
 
     def apply_schema_design(self):
         """
@@ -15,35 +117,108 @@ class OntologyInjector:
         Esto asegura que no haya datos duplicados o tipos incorrectos.
         """
         queries = [
-            # Entidades Únicas
+            # Entidades Únicas (los MERGE de los lotes se apoyan en estos índices)
             "CREATE CONSTRAINT IF NOT EXISTS FOR (p:Person) REQUIRE p.name IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (c:Commodity) REQUIRE c.name IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (l:Location) REQUIRE l.name IS UNIQUE",
-            
+            "CREATE CONSTRAINT IF NOT EXISTS FOR (r:Role) REQUIRE r.name IS UNIQUE",
+            "CREATE CONSTRAINT IF NOT EXISTS FOR (t:Tablet) REQUIRE t.id IS UNIQUE",
+
             # Índices para búsqueda rápida (Semantic Hashing lookup)
             "CREATE INDEX IF NOT EXISTS FOR (t:Tablet) ON (t.semantic_hash)"
         ]
-        
+
         print("💉 Inyectando Diseño de Esquema (Schema Design)...")
         with self.driver.session() as session:
             for q in queries:
                 session.run(q)
         print("✅ Esquema Ontológico aplicado.")
 
-    def inject_triplet(self, subject, predicate, object_, tablet_id):
+    def bulk_writer(self, batch_size=1000, database=None):
+        """Escritor por lotes sobre el driver del inyector (usar con 'with' para el flush final)."""
+        return BulkTripletWriter(self.driver, batch_size=batch_size, database=database)
+
+    def inject_triplets(self, triplets, batch_size=1000, database=None):
+        """Carga masiva: tripletas (sujeto, predicado, objeto, tablilla[, tipo]) en lotes UNWIND."""
+        writer = self.bulk_writer(batch_size=batch_size, database=database)
+        writer.add_many(triplets)
+        return writer.close()
+
+    def inject_triplet(self, subject, predicate, object_, tablet_id, kind="Commodity"):
         """
         Inyecta una relación: (Sujeto)-[PREDICADO]->(Objeto)
         Ej: (Puzur-Ashur)-[OWES]->(Silver)
+        Para corpus completos usar inject_triplets / bulk_writer (un viaje por lote).
         """
-        query = """
-        MERGE (s:Person {name: $sub})
-        MERGE (o:Commodity {name: $obj})
-        MERGE (t:Tablet {id: $tid})
-        
-        # Relación dinámica según el predicado
-        MERGE (s)-[r:TRANSACTION {type: $pred}]->(o)
-        SET r.source = $tid
-        """
-        # Nota: En producción, esto se expande para manejar Locations, Roles, etc.
-        with self.driver.session() as session:
-            session.run(query, sub=subject, obj=object_, pred=predicate, tid=tablet_id)
\ No newline at end of file
+        writer = BulkTripletWriter(self.driver, batch_size=1)
+        writer.add(subject, predicate, object_, tablet_id, kind)
+
+# --- DRIVER DE ENSAYO Y BENCHMARK ---
+
+class DryRunDriver:
+    """
+    Driver de ensayo con la API de neo4j (session / execute_write / run):
+    no necesita base de datos, registra las filas confirmadas y simula la latencia por transacción.
+    """
+    def __init__(self, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every  # cada N transacciones, un error transitorio (prueba de reintentos)
+        self.transactions = 0
+        self.rows = []
+        self._pending = []
+
+    def session(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args, **kwargs):
+        """Como el driver real: ante un error transitorio se deshace la transacción y se repite la función."""
+        while True:
+            self.transactions += 1
+            time.sleep(self.latency)
+            self._pending = []
+            result = fn(self, *args, **kwargs)
+            if self.fail_every and self.transactions % self.fail_every == 0:
+                continue  # Deadlock simulado: rollback y reintento
+            self.rows.extend(self._pending)
+            return result
+
+    def run(self, query, rows=None, **params):
+        self._pending.extend(rows if rows is not None else [params])
+        return self
+
+    def consume(self):
+        return None
+
+    def close(self):
+        pass
+
+def benchmark_injector(n_triplets=20_000, batch_size=1000, latency=0.002):
+    """Un viaje por tripleta vs lotes UNWIND, con la latencia de red simulada por el driver de ensayo."""
+    kinds = list(TRIPLET_SCHEMAS)
+    triplets = [(f"person-{i % 500}", "OWES", f"object-{i % 50}", f"tablet-{i // 10}", kinds[i % len(kinds)])
+                for i in range(n_triplets)]
+    print(f"--- ⏱️ BENCHMARK INYECTOR ({n_triplets} tripletas, latencia simulada {latency * 1000:.0f} ms) ---")
+
+    single = OntologyInjector(driver=DryRunDriver(latency))
+    sample = triplets[:max(1, n_triplets // 20)]
+    t0 = time.perf_counter()
+    for triplet in sample:
+        single.inject_triplet(*triplet)
+    t_single = (time.perf_counter() - t0) * n_triplets / len(sample)
+    print(f"   Una por tripleta (estimado): {t_single:.2f}s ({n_triplets / t_single:.0f} filas/s)")
+
+    driver = DryRunDriver(latency, fail_every=7)
+    bulk = OntologyInjector(driver=driver)
+    summary = bulk.inject_triplets(triplets, batch_size=batch_size)
+    assert len(driver.rows) == n_triplets, "El escritor por lotes perdió o duplicó filas"
+    print(f"   UNWIND en lotes de {batch_size}: {driver.transactions} transacciones "
+          f"({summary['retries']} reintentos simulados)")
+
+if __name__ == "__main__":
+    benchmark_injector(*[int(a) for a in sys.argv[1:3]])
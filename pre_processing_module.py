@@ -8,12 +8,12 @@ class CuneiformTokenizer:
     """
 
     def __init__(self):
-        # Regex patterns
+        # Regex patterns (precompilados una sola vez)
         self.noise_patterns = [
-            (r'\d+\.', ''),          # Elimina números de línea (1., 2.)
-            (r'\(.*?\)', ''),        # Elimina comentarios entre paréntesis (filtro básico)
-            (r'\s+', ' '),           # Normaliza espacios
-            (r'^\s+|\s+$', '')       # Trim
+            (re.compile(r'\d+\.'), ''),          # Elimina números de línea (1., 2.)
+            (re.compile(r'\(.*?\)'), ''),        # Elimina comentarios entre paréntesis (filtro básico)
+            (re.compile(r'\s+'), ' '),           # Normaliza espacios
+            (re.compile(r'^\s+|\s+$'), '')       # Trim
         ]
         
         # Tokens especiales
@@ -26,7 +26,7 @@ class CuneiformTokenizer:
         """
         clean_text = raw_text
         for pattern, replacement in self.noise_patterns:
-            clean_text = re.sub(pattern, replacement, clean_text)
+            clean_text = pattern.sub(replacement, clean_text)
         
         # Estandarización de daños (x -> [DMG], ... -> [MISSING])
         clean_text = clean_text.replace('x', self.damaged_token)
@@ -1,5 +1,65 @@
 # src/preprocessing.py
 import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    # Sin Arrow: las operaciones por columna usan el backend object de pandas
+    pa = pc = None
+
+# Equivalentes RE2 (motor de Arrow) de las clases Unicode de Python:
+# \w -> letras + números + '_' ; \s -> espacios ASCII + separadores Unicode
+RE2_WORD = r'\p{L}\p{N}_'
+RE2_SPACE = r'\s\p{Z}\x0b\x1c-\x1f\x85'
+
+def as_string_series(series):
+    """Columna de texto lista para operaciones vectorizadas (Arrow si existe). No-strings -> ''."""
+    series = pd.Series(series)
+    if isinstance(series.dtype, pd.StringDtype):
+        series = series.fillna("")
+    else:
+        series = series.where(series.map(lambda v: isinstance(v, str)), "")
+    return series.astype("string[pyarrow]" if pa is not None else object)
+
+def split_flat(series, return_joined=False):
+    """
+    Split por espacios de toda una columna.
+    Devuelve (tokens, offsets) planos al estilo Arrow ListArray:
+    los tokens de la fila i son tokens[offsets[i]:offsets[i + 1]].
+    Con return_joined=True añade la columna con los espacios colapsados (' '.join).
+    """
+    if pa is not None:
+        lists = pc.utf8_split_whitespace(pa.array(as_string_series(series).array))
+        if isinstance(lists, pa.ChunkedArray):
+            lists = lists.combine_chunks()
+        offsets = lists.offsets.to_numpy().astype(np.int64)
+        values = lists.values.slice(offsets[0], offsets[-1] - offsets[0])
+        # Arrow deja tokens vacíos en los extremos: se filtran y se recalculan los offsets
+        keep = pc.not_equal(values, pa.scalar('', type=values.type))
+        kept = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(keep.to_numpy(zero_copy_only=False), out=kept[1:])
+        offsets = kept[offsets - offsets[0]]
+        values = values.filter(keep)
+        tokens = values.to_numpy(zero_copy_only=False).astype(object)
+        if return_joined:
+            lists = pa.LargeListArray.from_arrays(pa.array(offsets), values)
+            joined = pc.binary_join(lists, pa.scalar(' ', type=values.type))
+            return tokens, offsets, pd.Series(joined.to_numpy(zero_copy_only=False), index=series.index)
+        return tokens, offsets
+
+    lists = series.str.split()
+    lengths = lists.map(len).to_numpy(dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    tokens = np.fromiter(chain.from_iterable(lists), dtype=object, count=int(offsets[-1]))
+    if return_joined:
+        return tokens, offsets, lists.str.join(' ')
+    return tokens, offsets
 
 class KanishTokenizer:
     """
@@ -17,6 +77,9 @@ class KanishTokenizer:
         # pero la regla simple es: guion -> espacio + guion
         self.re_morph = re.compile(r'-')
 
+        # Regex para caracteres ruidosos (precompilado: se usa en cada llamada)
+        self.re_noise = re.compile(r'[^\w\s\.\[\]ŠšṢṣṬṭÁáÉéÍíÚúÀàÈèÌìÙùÂâÊêÎîÛû]')
+
     def clean_and_tokenize(self, text):
         """
         Transforma transliteración cruda en lista de tokens procesables
@@ -42,7 +105,7 @@ class KanishTokenizer:
         # PASO 3: Limpieza de caracteres ruidosos (pero conservando puntos)
         # Eliminamos caracteres que no sean letras, números, puntos, espacios o corchetes
         # Nota: Permitimos acentos y caracteres especiales latinos extendidos (š, ṣ, etc)
-        text = re.sub(r'[^\w\s\.\[\]ŠšṢṣṬṭÁáÉéÍíÚúÀàÈèÌìÙùÂâÊêÎîÛû]', '', text)
+        text = self.re_noise.sub('', text)
 
         # PASO 4: Tokenización (Split por espacios)
         tokens = text.split()
@@ -52,6 +115,23 @@ class KanishTokenizer:
 
         return tokens
 
+    def refine_series(self, series):
+        """
+        Versión vectorizada de clean_and_tokenize() para una columna completa.
+        Las sustituciones corren como operaciones de columna (RE2 de Arrow si está disponible).
+        Devuelve (tokens, offsets) planos en vez de una lista de listas.
+        """
+        s = as_string_series(series)
+        if pa is not None:
+            s = s.str.replace(r'(?i)\[x+\]|\[\.+\]|\(x+\)', ' [MISSING] ', regex=True)
+            s = s.str.replace('-', ' ', regex=False)
+            s = s.str.replace(rf'[^{RE2_WORD}{RE2_SPACE}\.\[\]ŠšṢṣṬṭÁáÉéÍíÚúÀàÈèÌìÙùÂâÊêÎîÛû]', '', regex=True)
+        else:
+            s = s.str.replace(self.re_broken, ' [MISSING] ', regex=True)
+            s = s.str.replace('-', ' ', regex=False)
+            s = s.str.replace(self.re_noise, '', regex=True)
+        return split_flat(s)
+
 # --- PRUEBA UNITARIA INTEGRADA ---
 if __name__ == "__main__":
     tk = KanishTokenizer()
@@ -0,0 +1,202 @@
+# src/refinery_engine.py
+import importlib.util
+import os
+import re
+import time
+
+try:
+    from .config import CLITICS
+except ImportError:
+    # Fallback si no existe config.py aún (lista de 04_tokenizer_kanish.py)
+    CLITICS = ['ma', 'ni', 'kum', 'šum', 'am', 'kunu', 'šunu', 'ka', 'su']
+
+# Caracteres latinos extendidos que la Refinería SDA-02 conserva
+LATIN_EXT = 'ŠšṢṣṬṭÁáÉéÍíÚúÀàÈèÌìÙùÂâÊêÎîÛû'
+
+# Perfiles: cada uno reproduce uno de los tokenizadores históricos del repo.
+#   rules:   (patrón, reemplazo) en el orden original, una sustitución por regla. Cada una corre
+#            entera en C; fusionarlas en una alternancia obliga a un callback de Python por
+#            coincidencia y resultó más lento en train.csv. Los flags van en línea: (?i:...).
+#   after:   reemplazos literales (str.replace) tras las reglas.
+#   collapse: normalizar espacios (\s+ -> ' ') y recortar extremos.
+#   separators: caracteres que sólo actúan como frontera de token (se resuelven
+#            en el split, a velocidad de C, en vez de una llamada por coincidencia).
+#   output:  "text" o "tokens" (split por espacios tras aplicar los separadores).
+PROFILES = {
+    # preprocessing.KanishTokenizer.clean_and_tokenize
+    "sdic_tokens": {
+        "rules": [
+            (r'(?i:\[x+\]|\[\.+\]|\(x+\))', ' [MISSING] '),
+            # El guion ('-' -> ' ') es separador: se excluye del ruido y se corta en el split
+            (r'[^\w\s\.\[\]\-' + LATIN_EXT + r']', ''),
+        ],
+        "after": [],
+        "collapse": False,
+        "separators": '-',
+        "output": "tokens",
+    },
+    # pre_processing_module.CuneiformTokenizer.clean_noise + tokenize
+    "cuneiform": {
+        "rules": [
+            (r'\d+\.', ''),
+            (r'\(.*?\)', ''),
+            (r'x', '[DMG]'),
+        ],
+        "after": [('[...]', '[MISSING]')],
+        "collapse": True,
+        "separators": '-',
+        "output": "tokens",
+    },
+    # regexrules.KanishRefinery.process_text
+    "refinery": {
+        "rules": [
+            (r'(?i:\[[x\.\s]+\]|\(x+\)|x{2,})', ' <BROKEN> '),
+            (r'(?i:-(' + '|'.join(CLITICS) + r')\b)', r' -\1'),
+        ],
+        "after": [],
+        "collapse": True,
+        "output": "text",
+    },
+    # Sólo los signos rotos de regexrules.KanishRefinery (PASO A), sin separar clíticos:
+    # es la entrada del CapeParser, cuyo léxico tiene las formas con clítico ("um-ma", "qí-bi-ma")
+    "broken_signs": {
+        "rules": [
+            (r'(?i:\[[x\.\s]+\]|\(x+\)|x{2,})', ' <BROKEN> '),
+        ],
+        "after": [],
+        "collapse": True,
+        "output": "text",
+    },
+    # 04_tokenizer_kanish.KanishTokenizer.tokenizar
+    "clitic_split": {
+        "rules": [
+            (r'(?i:-(ma|ni|kum|šum|am|kunu|šunu|ka|su)\b)', r' -\1'),
+        ],
+        "after": [],
+        "collapse": False,
+        "output": "tokens",
+    },
+}
+
+class RefineryEngine:
+    """
+    Refinería Unificada: un solo motor configurable para los tokenizadores históricos.
+    Las reglas de un perfil se precompilan una vez; cada sustitución corre en C
+    (plantillas de reemplazo, sin callbacks por coincidencia).
+    """
+    def __init__(self, profile="refinery", spec=None):
+        self.profile = profile
+        self.spec = spec or PROFILES[profile]
+        self.passes = [(re.compile(pattern), repl) for pattern, repl in self.spec["rules"]]
+        self.after = self.spec.get("after", [])
+        self.collapse = self.spec.get("collapse", False)
+        self.separators = self.spec.get("separators", '')
+        self.output = self.spec.get("output", "text")
+
+    def refine(self, text):
+        """Limpieza completa del perfil. Devuelve el texto refinado."""
+        if not isinstance(text, str):
+            return ""
+        for regex, repl in self.passes:
+            text = regex.sub(repl, text)
+        if self.collapse:
+            text = ' '.join(text.split())
+        for old, new in self.after:
+            text = text.replace(old, new)
+        return text
+
+    def tokenize(self, text):
+        """Texto -> lista de tokens."""
+        if not isinstance(text, str) or not text:
+            return []
+        refined = self.refine(text)
+        for sep in self.separators:
+            refined = refined.replace(sep, ' ')
+        return refined.split()
+
+    def run(self, text):
+        """Salida natural del perfil (texto o tokens), como el tokenizador original."""
+        return self.tokenize(text) if self.output == "tokens" else self.refine(text)
+
+# --- VERIFICACIÓN DORADA Y BENCHMARK ---
+
+def _load_module(name):
+    """Importa un módulo hermano tanto dentro del paquete src como en modo script."""
+    try:
+        if __package__:
+            return importlib.import_module(f'{__package__}.{name}')
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{name}.py')
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except ImportError as e:
+        print(f"⚠️ No se pudo importar {name}: {e}")
+        return None
+
+def reference_tokenizers():
+    """Implementaciones originales, una por perfil (las no importables se omiten)."""
+    refs = {}
+    mod = _load_module('preprocessing')
+    if mod:
+        refs["sdic_tokens"] = mod.KanishTokenizer().clean_and_tokenize
+    mod = _load_module('pre_processing_module')
+    if mod:
+        tk = mod.CuneiformTokenizer()
+        refs["cuneiform"] = lambda text: tk.tokenize(tk.clean_noise(text))
+    mod = _load_module('regexrules')
+    if mod:
+        refinery = mod.KanishRefinery()
+        refs["refinery"] = refinery.process_text
+        refs["broken_signs"] = lambda text: (' '.join(refinery.regex_broken.sub(' <BROKEN> ', text).split())
+                                             if isinstance(text, str) else "")
+    mod = _load_module('04_tokenizer_kanish')
+    if mod:
+        refs["clitic_split"] = mod.KanishTokenizer().tokenizar
+    return refs
+
+def _corpus(csv_path, columns=("transliteration", "translation")):
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    texts = []
+    for col in columns:
+        if col in df.columns:
+            texts.extend(df[col].dropna().astype(str).tolist())
+    return texts
+
+def verify_profiles(csv_path="train.csv"):
+    """
+    Test dorado: cada perfil debe producir exactamente la salida de su tokenizador original
+    sobre todo train.csv (transliteraciones y traducciones).
+    """
+    texts = _corpus(csv_path)
+    ok = True
+    for profile, reference in reference_tokenizers().items():
+        engine = RefineryEngine(profile)
+        mismatches = [t for t in texts if engine.run(t) != reference(t)]
+        status = "✅" if not mismatches else "❌"
+        print(f"{status} {profile:<13} {len(texts) - len(mismatches)}/{len(texts)} idénticos")
+        for t in mismatches[:3]:
+            print(f"   IN:  {t[:120]}")
+        ok = ok and not mismatches
+    return ok
+
+def benchmark_profiles(csv_path="train.csv", repeat=3):
+    """Throughput (textos/s) de cada perfil frente a su tokenizador original."""
+    texts = _corpus(csv_path)
+    print(f"--- ⏱️ BENCHMARK REFINERÍA ({len(texts)} textos x {repeat}) ---")
+    for profile, reference in reference_tokenizers().items():
+        engine = RefineryEngine(profile)
+        timings = {}
+        for label, fn in (("original", reference), ("engine", engine.run)):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                for t in texts:
+                    fn(t)
+            timings[label] = len(texts) * repeat / (time.perf_counter() - t0)
+        print(f"   {profile:<13} original: {timings['original']:>9.0f}/s | "
+              f"engine: {timings['engine']:>9.0f}/s | x{timings['engine'] / timings['original']:.2f}")
+
+if __name__ == "__main__":
+    verify_profiles()
+    benchmark_profiles()
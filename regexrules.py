@@ -1,6 +1,17 @@
 # src/preprocessing.py
 import re
-from .config import CLITICS
+try:
+    from .config import CLITICS
+except ImportError:
+    # Fallback si no existe config.py aún: la misma lista que la Refinería Unificada
+    try:
+        from .refinery_engine import CLITICS
+    except ImportError:
+        from refinery_engine import CLITICS
+try:
+    from .preprocessing import pa, RE2_SPACE, as_string_series, split_flat
+except ImportError:
+    from preprocessing import pa, RE2_SPACE, as_string_series, split_flat
 
 class KanishRefinery:
     """
@@ -42,6 +53,30 @@ class KanishRefinery:
         
         return clean_text
 
+    def refine_series(self, series, return_tokens=False):
+        """
+        Versión vectorizada de process_text() para una columna completa (pandas/Arrow).
+        Con return_tokens=True devuelve también (tokens, offsets) planos.
+        """
+        s = as_string_series(series)
+
+        # PASO A: Signos Rotos -> <BROKEN> (RE2 de Arrow si está disponible)
+        if pa is not None:
+            s = s.str.replace(rf'(?i)\[[x\.{RE2_SPACE}]+\]|\(x+\)|x{{2,}}', ' <BROKEN> ', regex=True)
+        else:
+            s = s.str.replace(self.regex_broken, ' <BROKEN> ', regex=True)
+
+        # PASO B: Clíticos. El \b Unicode de Python no tiene equivalente en RE2:
+        # pandas aplica el patrón compilado sobre toda la columna.
+        s = s.str.replace(self.regex_clitic, r' -\1', regex=True)
+
+        # PASO C: Normalizar espacios = split + join sobre la columna
+        tokens, offsets, clean = split_flat(s, return_joined=True)
+
+        if return_tokens:
+            return clean, tokens, offsets
+        return clean
+
     def unify_directions(self, text):
         """
         Placeholder para la lógica SOV -> SVO (Unifies Directions).
@@ -2,20 +2,55 @@
 import json
 from functools import reduce
 
+import numpy as np
+
+def _factorize(n):
+    """{primo: exponente} de n (vacío para n <= 1)."""
+    factors, p = {}, 2
+    while n > 1 and p * p <= n:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        p += 1
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+    return factors
+
 class SemanticHasher:
     """
     Implementación del 'Prime Cipher' (SDIC-G).
     Convierte texto en un Hash Semántico único usando multiplicación de primos.
     Esto permite comparar tablillas matemáticamente, no lingüísticamente.
+
+    Modo huella (fingerprint): en vez del producto (un entero que crece sin límite con la
+    tablilla) se usa un vector de ancho fijo con el exponente de cada factor primo del producto.
+    Los valores del cifrado no siempre son primos (KÙ = 50 = 2·5², BABBAR = 959 = 7·137), así que
+    cada token aporta su factorización, no una posición propia. Con eso
+    "B contenida en A" pasa de A % B == 0 a all(A >= B) sin cambiar el resultado.
     """
-    def __init__(self, cipher_path="config/master_cipher.json"):
+    def __init__(self, cipher_path="config/master_cipher.json", registry=None, registry_buckets=256):
+        # Fallback (Valores por defecto si no hay JSON o el token no está en el registro)
+        self._default_primes = {"KÙ.BABBAR": 2, "AN.NA": 3, "TÚG": 5, "DUMU": 7}
         try:
             with open(cipher_path, 'r') as f:
                 self.cipher = json.load(f).get('registry', {})
         except FileNotFoundError:
             self.cipher = {}
-            # Fallback (Valores por defecto si no hay JSON)
-            self._default_primes = {"KÙ.BABBAR": 2, "AN.NA": 3, "TÚG": 5, "DUMU": 7}
+
+        # Una posición por factor primo de los valores del cifrado (los neutros, valor 1, no ocupan posición)
+        tokens = list(self._default_primes) + list(self.cipher)
+        factors = {t.upper(): _factorize(self._get_prime(t)) for t in tokens}
+        primes = sorted({p for f in factors.values() for p in f})
+        slot_of_prime = {p: i for i, p in enumerate(primes)}
+        self.slot_primes = np.array(primes, dtype=np.int64)
+        self._slots = {t: tuple((slot_of_prime[p], e) for p, e in sorted(f.items()))
+                       for t, f in factors.items() if f}
+
+        # Opcional: tokens del GematriaRegistry plegados en cubetas fijas (como un count-min:
+        # la contención no tiene falsos negativos, pero sí puede tener falsos positivos)
+        self.registry = registry
+        self.registry_buckets = registry_buckets if registry is not None else 0
+        self.width = len(primes) + self.registry_buckets
 
     def _get_prime(self, token):
         # Si está en el registro, devuelve su primo. Si no, devuelve 1 (neutro).
@@ -37,10 +72,52 @@ class SemanticHasher:
         semantic_hash = reduce(lambda x, y: x * y, primes, 1)
         return semantic_hash
 
+    def _slots_of(self, token):
+        """Pares (posición, exponente) del token en la huella (vacío = neutro)."""
+        slots = self._slots.get(token.upper())
+        if slots is None and self.registry is not None:
+            idx = self.registry.token_index.get(token)
+            if idx is not None:
+                slots = ((len(self.slot_primes) + idx % self.registry_buckets, 1),)
+        return slots or ()
+
+    def compute_fingerprint(self, text_tokens):
+        """Huella de ancho fijo: exponente de cada factor primo del producto de la frase."""
+        fingerprint = np.zeros(self.width, dtype=np.uint32)
+        for token in text_tokens:
+            for slot, exponent in self._slots_of(token):
+                fingerprint[slot] += exponent
+        return fingerprint
+
+    def fingerprint_batch(self, token_lists):
+        """Matriz (n_frases x width) de huellas, calculada en una sola pasada."""
+        token_lists = list(token_lists)
+        cells, exponents = [], []
+        for row, tokens in enumerate(token_lists):
+            base = row * self.width
+            for token in tokens:
+                for slot, exponent in self._slots_of(token):
+                    cells.append(base + slot)
+                    exponents.append(exponent)
+        n = len(token_lists)
+        flat = np.bincount(np.asarray(cells, dtype=np.int64), weights=np.asarray(exponents, dtype=np.float64),
+                           minlength=n * self.width)
+        return flat.reshape(n, self.width).astype(np.uint32)
+
+    def contains(self, fp_a, fp_b):
+        """
+        Equivalente a hash_a % hash_b == 0 para los tokens del cifrado: cada exponente de A cubre el de B.
+        Los tokens del GematriaRegistry (plegados en cubetas) no entran en compute_hash.
+        """
+        return bool(np.all(fp_a >= fp_b))
+
     def compare_similarity(self, hash_a, hash_b):
         """
         Si Hash A es divisible por Hash B, entonces la frase B está contenida en A.
         Esto es magia matemática pura.
+        Con huellas (np.ndarray) se usa la comprobación de contención equivalente.
         """
+        if isinstance(hash_a, np.ndarray):
+            return self.contains(hash_a, hash_b)
         if hash_b == 0: return False
-        return (hash_a % hash_b) == 0
\ No newline at end of file
+        return (hash_a % hash_b) == 0
@@ -0,0 +1,173 @@
+# src/semantic_index.py
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .semantic_hasher import SemanticHasher
+except ImportError:
+    from semantic_hasher import SemanticHasher
+
+class SemanticIndex:
+    """
+    Índice Invertido de Huellas Semánticas (SDIC-G).
+    Para cada posición de la huella (un primo del cifrado) guarda la lista de tablillas
+    que lo contienen y cuántas veces (postings). Responde sin recorrer todos los pares:
+      - contains(frase): tablillas cuyo hash es divisible por el de la frase.
+      - top_k(frase): tablillas más similares (Jaccard ponderado sobre los conteos).
+    """
+    def __init__(self, hasher):
+        self.hasher = hasher
+        self.ids = np.empty(0, dtype=str)
+        self.doc_totals = np.empty(0, dtype=np.int64)
+        self.slot_ptr = np.zeros(hasher.width + 1, dtype=np.int64)
+        self.post_docs = np.empty(0, dtype=np.int32)
+        self.post_counts = np.empty(0, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, token_lists, ids):
+        """Construcción masiva: una matriz de huellas y una transposición a postings por posición."""
+        fingerprints = self.hasher.fingerprint_batch(token_lists)
+        self.ids = np.asarray([str(i) for i in ids])
+        self.doc_totals = fingerprints.sum(axis=1, dtype=np.int64)
+
+        # Orden posición-mayor: los postings de cada primo quedan contiguos y ordenados por tablilla
+        slots, docs = np.nonzero(fingerprints.T)
+        self.post_docs = docs.astype(np.int32)
+        self.post_counts = fingerprints[docs, slots]
+        self.slot_ptr = np.zeros(self.hasher.width + 1, dtype=np.int64)
+        np.cumsum(np.bincount(slots, minlength=self.hasher.width), out=self.slot_ptr[1:])
+        return self
+
+    @classmethod
+    def from_csv(cls, hasher, csv_path="train.csv", id_col="oare_id", text_col="transliteration"):
+        """Construcción desde un CSV del corpus (tokens = transliteración separada por espacios)."""
+        df = pd.read_csv(csv_path, usecols=[id_col, text_col])
+        token_lists = [str(t).split() if isinstance(t, str) else [] for t in df[text_col]]
+        return cls(hasher).build(token_lists, df[id_col])
+
+    def _postings(self, slot):
+        start, end = self.slot_ptr[slot], self.slot_ptr[slot + 1]
+        return self.post_docs[start:end], self.post_counts[start:end]
+
+    def contains(self, tokens):
+        """
+        Ids de las tablillas que contienen la frase: las que cubren cada exponente de su huella.
+        Coincide con hash_tablilla % hash_frase == 0 (la huella factoriza los valores del cifrado).
+        """
+        query = self.hasher.compute_fingerprint(tokens)
+        slots = np.flatnonzero(query)
+        if not len(slots):
+            return self.ids.tolist()  # Hash 1: divide a todas
+
+        # Intersección empezando por el primo más raro (lista de postings más corta)
+        slots = slots[np.argsort(np.diff(self.slot_ptr)[slots], kind="stable")]
+        matches = None
+        for slot in slots:
+            docs, counts = self._postings(slot)
+            docs = docs[counts >= query[slot]]
+            matches = docs if matches is None else np.intersect1d(matches, docs, assume_unique=True)
+            if not len(matches):
+                break
+        return self.ids[matches].tolist()
+
+    def top_k(self, tokens, k=10):
+        """
+        Las k tablillas más similares a la frase: Jaccard ponderado
+        sum(min(q, d)) / sum(max(q, d)). Sólo se puntúan las que comparten algún primo.
+        """
+        query = self.hasher.compute_fingerprint(tokens)
+        slots = np.flatnonzero(query)
+        if not len(slots) or not len(self):
+            return []
+
+        overlap = np.zeros(len(self), dtype=np.int64)
+        for slot in slots:
+            docs, counts = self._postings(slot)
+            overlap[docs] += np.minimum(counts, query[slot])
+
+        candidates = np.flatnonzero(overlap)
+        union = int(query.sum()) + self.doc_totals[candidates] - overlap[candidates]
+        scores = overlap[candidates] / union
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return [(str(self.ids[candidates[i]]), float(scores[i])) for i in top]
+
+    # --- PERSISTENCIA ---
+
+    def save(self, path):
+        """Guarda el índice en .npz (junto con la configuración del hasher para validarla al cargar)."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path, ids=self.ids, doc_totals=self.doc_totals, slot_ptr=self.slot_ptr,
+            post_docs=self.post_docs, post_counts=self.post_counts,
+            slot_primes=self.hasher.slot_primes, registry_buckets=self.hasher.registry_buckets
+        )
+        print(f"💾 Índice semántico guardado en {path} ({len(self)} tablillas)")
+
+    @classmethod
+    def load(cls, path, hasher):
+        with np.load(path) as data:
+            if (not np.array_equal(data["slot_primes"], hasher.slot_primes)
+                    or int(data["registry_buckets"]) != hasher.registry_buckets):
+                raise ValueError(f"El índice {path} se construyó con otro cifrado/registro")
+            index = cls(hasher)
+            index.ids = data["ids"]
+            index.doc_totals = data["doc_totals"]
+            index.slot_ptr = data["slot_ptr"]
+            index.post_docs = data["post_docs"]
+            index.post_counts = data["post_counts"]
+        return index
+
+def benchmark_index(index, token_lists, queries):
+    """contains() del índice frente al recorrido por pares (compare_similarity) sobre todo el corpus."""
+    hasher = index.hasher
+    hashes = [hasher.compute_hash(tokens) for tokens in token_lists]
+    print(f"--- ⏱️ BENCHMARK ÍNDICE SEMÁNTICO ({len(index)} tablillas, {len(queries)} consultas) ---")
+
+    t0 = time.perf_counter()
+    for q in queries:
+        q_hash = hasher.compute_hash(q)
+        [i for i, h in enumerate(hashes) if hasher.compare_similarity(h, q_hash)]
+    t_pairs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = [index.contains(q) for q in queries]
+    t_index = time.perf_counter() - t0
+
+    for q, found in zip(queries, results):
+        q_hash = hasher.compute_hash(q)
+        expected = [index.ids[i] for i, h in enumerate(hashes) if hasher.compare_similarity(h, q_hash)]
+        assert found == expected, f"El índice no coincide con el recorrido por pares para {q}"
+    print(f"   Por pares (producto de primos): {t_pairs:.3f}s | índice: {t_index:.3f}s "
+          f"| x{t_pairs / max(t_index, 1e-9):.1f}")
+
+if __name__ == "__main__":
+    cipher = sys.argv[1] if len(sys.argv) > 1 else "master_cipher.json"
+    corpus = sys.argv[2] if len(sys.argv) > 2 else "train.csv"
+    hasher = SemanticHasher(cipher)
+
+    t0 = time.perf_counter()
+    index = SemanticIndex.from_csv(hasher, corpus)
+    print(f"🗂️ Índice construido: {len(index)} tablillas, {len(index.post_docs)} postings "
+          f"en {time.perf_counter() - t0:.3f}s")
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(os.path.join(tmp, "semantic_index.npz"))
+
+    phrase = ["KÙ.BABBAR", "DUMU"]
+    print(f"🔎 Contienen {phrase}: {len(index.contains(phrase))} tablillas")
+    print(f"🏆 Top-5 similares: {index.top_k(phrase, k=5)}")
+
+    token_lists = [str(t).split() for t in pd.read_csv(corpus)["transliteration"].fillna("")]
+    queries = [tokens[:3] for tokens in token_lists[:200]]
+    benchmark_index(index, token_lists, queries)
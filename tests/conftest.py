@@ -0,0 +1,34 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Los módulos viven en la raíz del repo (se importan como src.* en el pipeline)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Los scripts de nivel superior (main_pipeline...) importan src.*: la raíz del checkout es ese paquete
+if "src" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("src", os.path.join(ROOT, "__init__.py"),
+                                                   submodule_search_locations=[ROOT])
+    sys.modules["src"] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules["src"])
+
+@pytest.fixture(scope="session")
+def train_sample():
+    """Muestra pequeña de train.csv: corchetes, <gap>, '...', clíticos y decimales."""
+    return os.path.join(FIXTURES, "train_sample.csv")
+
+@pytest.fixture(scope="session")
+def cipher_path():
+    return os.path.join(ROOT, "master_cipher.json")
+
+@pytest.fixture(scope="session")
+def cipher(cipher_path):
+    import json
+    with open(cipher_path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,84 @@
+import pytest
+
+from cape_parser import CapeParser, WORD_BREAK
+
+LEXICON = """type,form,norm,lexeme
+word,a-šur,Aššur,Aššur
+PN,PUZUR₄-a-šur,Puzur-Aššur,Puzur-Aššur
+PN,ma-na,Mana,Mana
+word,ma-na,manûm,manûm
+word,ša ke-na-tim,ša kēnātim,kēnum
+"""
+
+@pytest.fixture
+def parser(cipher, tmp_path):
+    lexicon = tmp_path / "lexicon.csv"
+    lexicon.write_text(LEXICON, encoding="utf-8")
+    return CapeParser(cipher, str(lexicon))
+
+def english(vector):
+    return [item["english"] for item in vector]
+
+def test_to_signs_splits_words_and_marks_breaks():
+    assert CapeParser.to_signs(["KÙ.BABBAR", "a-šur"]) == ["KÙ", "BABBAR", WORD_BREAK, "a", "šur"]
+
+def test_longest_match_prefers_the_longest_form(parser):
+    assert english(parser.parse_text("PUZUR₄-a-šur a-šur")) == ["Puzur-Aššur", "Aššur"]
+
+def test_registry_compounds_are_single_segments(parser):
+    assert english(parser.parse_text("DAM.GÀR É.GAL")) == ["merchant", "palace"]
+
+def test_multiword_forms_cross_word_breaks_only_when_listed(parser):
+    assert english(parser.parse_text("ša ke-na-tim")) == ["ša kēnātim"]
+    # "ke-na-tim" suelto no es una forma del léxico: cada signo queda en cuarentena
+    assert [item.get("status") for item in parser.parse_text("ke-na-tim")] == ["QUARANTINE"] * 3
+
+def test_common_word_wins_over_homograph_name(parser):
+    assert parser.parse_text("ma-na")[0]["type"] == "WORD"
+
+def test_special_segments(parser):
+    vector = parser.parse_text("5 [BROKEN] xx")
+    assert vector[0] == {"type": "NUM", "val": "5", "english": "5"}
+    assert vector[1]["status"] == "CORRUPT"
+    assert vector[2]["status"] == "QUARANTINE"
+
+def test_context_resolution_in_longest_match(parser):
+    # UD tras un número es "día"; tras KÙ es "plata" (BABBAR)
+    assert english(parser.parse_text("5 UD")) == ["5", "day"]
+    assert english(parser.parse_text("KÙ UD"))[1] == "white/pure"
+
+RULE_CIPHER = {"registry": {
+    "KÙ": {"prime": 50, "type": "PREFIX", "english": "silver_prefix"},
+    "UD": [{"val": "UD", "english": "day", "rule": {"prev": "NUMERIC"}},
+           {"val": "BABBAR", "english": "white/pure", "rule": {"prev": "KÙ"}}],
+    "A": [{"val": "a0", "english": "a0"},
+          {"val": "a1", "english": "a1", "rule": {"prev": "KÙ"}},
+          {"val": "a2", "english": "a2", "rule": {"prev": "NUMERIC"}},
+          {"val": "a3", "english": "a3", "rule": {"prev": "5"}}],
+    "B": [{"val": "b0", "english": "b0", "rule": {"prev": "5"}},
+          {"val": "b1", "english": "b1", "rule": {"prev": "NUMERIC"}}],
+    "C": [{"val": "c0", "english": "c0"},
+          {"val": "c1", "english": "c1", "rule": {"next": "GÍN"}}],
+    "D": [{"val": "d0", "english": "d0"},
+          {"val": "d1", "english": "d1", "rule": {"window": ["KÙ", "NUMERIC"]}}],
+}}
+
+@pytest.mark.parametrize("prev", [None, "KÙ", "5", "7", "1.5", "A", "xx"])
+def test_compiled_rules_match_rule_walk(prev):
+    parser = CapeParser(RULE_CIPHER)
+    for token in parser.registry:
+        if token not in parser.windows:
+            assert parser._resolve_ambiguity(token, prev) is parser._resolve_by_walk(token, prev), (token, prev)
+
+def test_window_rules_look_at_both_neighbours():
+    parser = CapeParser(RULE_CIPHER)
+    assert parser._resolve_ambiguity("C", "KÙ", "GÍN")["val"] == "c1"
+    assert parser._resolve_ambiguity("C", "KÙ", "ma-na")["val"] == "c0"
+    assert parser._resolve_ambiguity("D", "KÙ", "12")["val"] == "d1"
+    assert parser._resolve_ambiguity("D", "KÙ", None)["val"] == "d0"
+
+def test_decimal_numbers_stay_single_signs(parser):
+    assert CapeParser.to_signs(["0.33333", "ma-na", "ITU.1.KAM"]) == \
+        ["0.33333", WORD_BREAK, "ma", "na", WORD_BREAK, "ITU", "1", "KAM"]
+    vector = parser.parse_text("0.33333 ma-na KÙ.BABBAR 1.5 GÍN")
+    assert [item["val"] for item in vector if item.get("type") == "NUM"] == ["0.33333", "1.5"]
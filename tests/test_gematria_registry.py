@@ -0,0 +1,91 @@
+import logging
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from gematria_registry import GematriaRegistry, PrimeSieve, SnapshotIndex, _legacy_primes
+
+@pytest.mark.parametrize("segment_size", [8, 64, 1 << 16])
+def test_sieve_matches_trial_division(segment_size):
+    sieve = PrimeSieve(segment_size=segment_size)
+    assert sieve.ensure(2000)[:2000].tolist() == _legacy_primes(2000)
+
+def test_sieve_grows_on_demand():
+    sieve = PrimeSieve(segment_size=16)
+    first = sieve.ensure(10).copy()
+    more = sieve.ensure(500)
+    assert len(more) >= 500
+    assert np.array_equal(more[:len(first)], first)
+    assert np.all(np.diff(more) > 0)
+
+def test_registry_assigns_primes_in_registration_order():
+    registry = GematriaRegistry()
+    tokens = ["É", "GAL", "DUMU", "MUNUS", "be", "lí", "ni"]
+    assert [registry.get_gematria_value(t) for t in tokens] == _legacy_primes(len(tokens))
+    assert registry.register_token("a-šur") == _legacy_primes(len(tokens) + 1)[-1]
+    assert registry.register_token("É") == 2
+    assert registry.get_gematria_value("[DMG]") == 0
+
+LEXICON = "type,form,norm,lexeme\n" + "".join(f"word,{form},{form},{form}\n" for form in
+                                              ["a-na", "KÙ.BABBAR", "ša", "DUMU", "PUZUR₄-a-šur", "ṭup-pì", "a-na"])
+
+@pytest.fixture
+def lexicon(tmp_path):
+    path = tmp_path / "lexicon.csv"
+    path.write_text(LEXICON, encoding="utf-8")
+    return str(path)
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_snapshot_round_trip(lexicon, tmp_path, lazy):
+    registry = GematriaRegistry(lexicon)
+    snapshot = str(tmp_path / "cache" / "gematria.snapshot")
+    registry.save_snapshot(snapshot, lexicon)
+    loaded = GematriaRegistry.from_snapshot(snapshot, lexicon, lazy=lazy)
+    assert isinstance(loaded.token_index, SnapshotIndex) == lazy
+    assert dict(loaded.sign_map) == dict(registry.sign_map)
+    assert loaded.get_gematria_value("no-existe") == 0
+    # Tokens nuevos tras abrir: mismo primo que en el registro original; el fichero no cambia
+    assert loaded.register_token("a-šur") == registry.register_token("a-šur")
+    assert GematriaRegistry.from_snapshot(snapshot, lazy=lazy).get_gematria_value("a-šur") == 0
+
+def test_load_or_build_rebuilds_stale_snapshots(lexicon, tmp_path):
+    snapshot = str(tmp_path / "gematria.snapshot")
+    built = GematriaRegistry.load_or_build(lexicon, snapshot)
+    reused = GematriaRegistry.load_or_build(lexicon, snapshot)
+    assert not hasattr(built, "snapshot_path") and reused.snapshot_path == snapshot
+
+    with open(lexicon, "a", encoding="utf-8") as f:
+        f.write("word,um-ma,umma,umma\n")
+    with pytest.raises(ValueError):
+        GematriaRegistry.from_snapshot(snapshot, lexicon)
+    rebuilt = GematriaRegistry.load_or_build(lexicon, snapshot)
+    assert rebuilt.get_gematria_value("um-ma") == _legacy_primes(len(rebuilt.token_index))[-1]
+    assert GematriaRegistry.from_snapshot(snapshot, lexicon).get_gematria_value("um-ma") == \
+        rebuilt.get_gematria_value("um-ma")
+
+def test_snapshot_rejects_foreign_files(tmp_path):
+    path = tmp_path / "not-a-snapshot"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        GematriaRegistry.from_snapshot(str(path))
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_calculate_hash_batch_matches_calculate_hash(lexicon, tmp_path, lazy, caplog):
+    snapshot = str(tmp_path / "gematria.snapshot")
+    GematriaRegistry(lexicon).save_snapshot(snapshot, lexicon)
+    registry = GematriaRegistry.from_snapshot(snapshot, lexicon, lazy=lazy)
+    token_lists = [["a-na", "KÙ.BABBAR", "a-na"], [], ["[DMG]", "x", "[MISSING]"], ["[UNK]", "ša", "no-existe"],
+                   [], ["DUMU", "no-existe", "otro"], ["ṭup-pì"]]
+
+    with caplog.at_level(logging.WARNING):
+        expected = [registry.calculate_hash(tokens) for tokens in token_lists]
+    warned = Counter(r.getMessage().rsplit(": ", 1)[1] for r in caplog.records if r.levelno == logging.WARNING)
+
+    hashes, unknown = registry.calculate_hash_batch(token_lists)
+    assert hashes.dtype == np.int64 and hashes.tolist() == expected
+    assert unknown == warned == Counter({"[UNK]": 1, "no-existe": 2, "otro": 1})
+
+    empty, none = registry.calculate_hash_batch([])
+    assert empty.shape == (0,) and not none
+    assert registry.calculate_hash_batch([[], []])[0].tolist() == [0, 0]
@@ -0,0 +1,65 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("community")
+from graph_analyst import SocialGraphEngine
+
+TEXTS = [
+    "Puzur gave silver to Enlil and Amur", "Amur sent tin to Kanesh with Enlil", "Iddin owes Puzur",
+    "Assur and Iddin travelled", "Lone Tablet", "Buzazu paid Amur", "Ennam met Buzazu and Iddin",
+    "Kanesh merchants: Puzur Ennam", "Enlil blessed Assur", "Shalim wrote to Buzazu",
+]
+
+def run(tmp_path, rows, **extra):
+    df = pd.DataFrame({"id": [r[0] for r in rows], "translation": [r[1] for r in rows], **extra})
+    csv_path, state_path, out_path = (str(tmp_path / name) for name in ("in.csv", "state.npz", "metrics.csv"))
+    df.to_csv(csv_path, index=False)
+    SocialGraphEngine().update_incremental(csv_path, state_path, out_path, text_column="translation", workers=1)
+    return pd.read_csv(out_path, keep_default_na=False), pd.read_csv(out_path.replace(".csv", "_delta.csv"),
+                                                                   keep_default_na=False)
+
+def full_graph(texts):
+    engine = SocialGraphEngine()
+    engine.build_cooccurrence(pd.Series(texts))
+    return engine.G
+
+def weights(G):
+    return {frozenset((u, v)): d["weight"] for u, v, d in G.edges(data=True)}
+
+def test_incremental_matches_full_rebuild(tmp_path):
+    day1 = [(f"t{i}", t) for i, t in enumerate(TEXTS[:6])]
+    before, _ = run(tmp_path, day1)
+
+    # Día 2: una tablilla editada, tres nuevas y el CSV reexportado con otra columna
+    day2 = day1[:2] + [("t2", "Iddin owes Shalim")] + day1[3:] + [(f"t{i}", t) for i, t in enumerate(TEXTS) if i >= 6]
+    after, delta = run(tmp_path, day2, scribe=["x"] * len(day2))
+
+    G = full_graph([t for _, t in day2])
+    state = SocialGraphEngine.load_state(str(tmp_path / "state.npz"))
+    names = state["entities"]
+    stored = {frozenset((names[r], names[c])): w
+              for r, c, w in zip(state["edge_row"], state["edge_col"], state["edge_weight"])}
+    assert stored == weights(G)
+
+    expected = nx.betweenness_centrality(G)
+    assert set(after["entity"]) == set(G)
+    for entity, score in zip(after["entity"], after["centrality_score"]):
+        assert score == pytest.approx(expected[entity])
+
+    # El delta lista toda entidad cuya fila cambió (incluidas las que salen del grafo)
+    merged = after.merge(before, on="entity", how="outer", suffixes=("", "_prev"))
+    changed = merged[~np.isclose(merged["centrality_score"].fillna(-1), merged["centrality_score_prev"].fillna(-1))
+                     | (merged["degree_connections"].fillna(0) != merged["degree_connections_prev"].fillna(0))]
+    assert set(changed["entity"]) <= set(delta["entity"])
+    assert "Puzur" in set(delta["entity"])
+
+def test_reexport_without_changes_is_a_no_op(tmp_path):
+    rows = [(f"t{i}", t) for i, t in enumerate(TEXTS)]
+    run(tmp_path, rows)
+    state = SocialGraphEngine.load_state(str(tmp_path / "state.npz"))
+    run(tmp_path, rows, scribe=["x"] * len(rows), line=range(len(rows)))
+    again = SocialGraphEngine.load_state(str(tmp_path / "state.npz"))
+    assert again["edge_weight"].sum() == state["edge_weight"].sum()
+    assert list(again["tablet_ids"]) == list(state["tablet_ids"])
@@ -0,0 +1,45 @@
+import networkx as nx
+import pytest
+
+from graph_metrics import betweenness_centrality, error_bound, pivot_sample_size
+
+@pytest.fixture(scope="module")
+def trade_graph():
+    G = nx.powerlaw_cluster_graph(300, 3, 0.1, seed=7)
+    for i, (u, v) in enumerate(G.edges):
+        G[u][v]["distance"] = 1 + i % 4
+    return G
+
+def assert_close(got, expected, tol=1e-9):
+    assert got.keys() == expected.keys()
+    assert max(abs(got[v] - expected[v]) for v in expected) <= tol
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_exact_matches_networkx(trade_graph, workers):
+    assert_close(betweenness_centrality(trade_graph, "exact", workers=workers),
+                 nx.betweenness_centrality(trade_graph))
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_weighted_exact_matches_networkx(trade_graph, workers):
+    assert_close(betweenness_centrality(trade_graph, "exact", workers=workers, weight="distance"),
+                 nx.betweenness_centrality(trade_graph, weight="distance"))
+
+def test_unnormalized_matches_networkx(trade_graph):
+    assert_close(betweenness_centrality(trade_graph, "exact", workers=1, normalized=False),
+                 nx.betweenness_centrality(trade_graph, normalized=False))
+
+def test_approx_within_error_bound(trade_graph):
+    n, epsilon = trade_graph.number_of_nodes(), 0.2
+    k = pivot_sample_size(n, epsilon)
+    assert k < n and error_bound(n, k) <= epsilon
+    approx = betweenness_centrality(trade_graph, "approx", epsilon=epsilon, workers=1)
+    assert_close(approx, nx.betweenness_centrality(trade_graph), tol=epsilon)
+
+def test_auto_is_exact_on_small_graphs(trade_graph):
+    assert_close(betweenness_centrality(trade_graph, workers=1), nx.betweenness_centrality(trade_graph))
+
+def test_trivial_graphs_and_bad_mode():
+    assert betweenness_centrality(nx.path_graph(2)) == {0: 0.0, 1: 0.0}
+    assert betweenness_centrality(nx.empty_graph(5)) == dict.fromkeys(range(5), 0.0)
+    with pytest.raises(ValueError):
+        betweenness_centrality(nx.path_graph(5), mode="bogus")
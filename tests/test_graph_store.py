@@ -0,0 +1,61 @@
+import errno
+import json
+import multiprocessing as mp
+import os
+import shutil
+
+from conftest import ROOT
+import graph_store
+from graph_store import GraphStore, open_brain, write_graph_store
+from marduk_validator import MardukValidator
+
+def test_open_brain_converts_json_once(tmp_path):
+    json_path = str(tmp_path / "brain.json")
+    shutil.copy(os.path.join(ROOT, "kanish_brain_frozen.json"), json_path)
+    store = open_brain(json_path)
+    assert store.path == str(tmp_path / "brain.graph")
+    assert store.commodities()["kaspum"] == ["silver"]
+    assert store.label("puzur-ashur") == "Person"
+    stamp = os.path.getmtime(tmp_path / "brain.graph" / "meta.json")
+    open_brain(json_path)
+    assert os.path.getmtime(tmp_path / "brain.graph" / "meta.json") == stamp
+
+def test_marduk_loads_json_and_snapshot_alike(tmp_path):
+    json_path = str(tmp_path / "brain.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"entities": {}, "relations": [], "commodities": {"AN.NA": ["tin", "lead"], "kaspum": "silver"}}, f)
+    from_json = MardukValidator(json_path).entity_map
+    from_store = MardukValidator(str(tmp_path / "brain.graph")).entity_map
+    assert from_json == from_store
+    assert from_json["AN.NA"] == ["tin", "lead"] and from_json["kaspum"] == ["silver"]
+
+def test_commodities_without_gloss_use_their_name(tmp_path):
+    # Nodos Commodity de OntologyInjector: sólo name, sin propiedad english
+    path = str(tmp_path / "neo.graph")
+    write_graph_store(path, ["Puzur-Ashur", "Silver"], ["Puzur-Ashur"], ["Silver"], relation_types=["TRANSACTION"],
+                      labels={"Puzur-Ashur": "Person", "Silver": "Commodity"}, directed=True)
+    store = GraphStore(path)
+    assert store.commodities() == {"Silver": ["Silver"]}
+    assert store.neighbors("Puzur-Ashur") == [("Silver", 1.0, "TRANSACTION")]
+
+def test_marduk_falls_back_to_json_on_read_only_mount(tmp_path, monkeypatch):
+    json_path = str(tmp_path / "brain.json")
+    shutil.copy(os.path.join(ROOT, "kanish_brain_frozen.json"), json_path)
+
+    def read_only(*args, **kwargs):
+        raise OSError(errno.EROFS, "Read-only file system")
+    monkeypatch.setattr(graph_store, "export_brain_json", read_only)
+    validator = MardukValidator(json_path)
+    assert validator.entity_map["kaspum"] == ["silver"]
+    assert not os.path.exists(tmp_path / "brain.graph")
+
+def _open(json_path):
+    return len(open_brain(json_path).commodities())
+
+def test_concurrent_conversions_do_not_clash(tmp_path):
+    json_path = str(tmp_path / "brain.json")
+    shutil.copy(os.path.join(ROOT, "kanish_brain_frozen.json"), json_path)
+    with mp.get_context("fork").Pool(4) as pool:
+        counts = pool.map(_open, [json_path] * 8)
+    assert len(set(counts)) == 1 and counts[0] > 0
+    assert sorted(os.listdir(tmp_path)) == ["brain.graph", "brain.json"]
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+import inference_pool
+from inference_pool import InferencePool
+
+class FakeModel:
+    def share_memory(self):
+        return self
+
+class FakeEngine:
+    """Motor de ensayo: 'traduce' a mayúsculas (con el pid del worker) y guarda una memoria en dict."""
+    device = "cpu"
+    batch_size = 4
+
+    def __init__(self):
+        self.model = FakeModel()
+        self.cache = {}
+
+    def _cache_lookup(self, texts):
+        translations = [self.cache.get(t) for t in texts]
+        pending = {}
+        for i, (text, translation) in enumerate(zip(texts, translations)):
+            if translation is None:
+                pending.setdefault(text, []).append(i)
+        return translations, pending
+
+    def _cache_store(self, items):
+        self.cache.update(items)
+
+    def _translate_uncached(self, texts, batch_size):
+        # Los shards cortos terminan antes: el pool recibe resultados desordenados
+        time.sleep(0.01 * len(texts))
+        return [f"{t.upper()}|{os.getpid()}" for t in texts]
+
+    def _judge(self, text, translation):
+        return {"source": text, "translation": translation.split("|")[0]}
+
+CHUNKS = [[f"t{c}-{i}" for i in range(n)] for c, n in enumerate([5, 1, 0, 7, 2, 3])]
+
+def test_pool_streams_chunks_in_order():
+    engine = FakeEngine()
+    with InferencePool(engine, num_workers=3, intra_op_threads=1, shard_size=2) as pool:
+        results = list(pool.imap_predict_chunks(enumerate(CHUNKS), max_inflight=3))
+        assert [tag for tag, _ in results] == list(range(len(CHUNKS)))
+        for (_, outputs), texts in zip(results, CHUNKS):
+            assert [o["source"] for o in outputs] == texts
+            assert [o["translation"] for o in outputs] == [t.upper() for t in texts]
+
+        # Repeticiones dentro del bloque: un solo forward; lo ya traducido sale de la memoria
+        assert [o["translation"] for o in pool.imap_predict(["t0-0", "nuevo", "nuevo"])] == ["T0-0", "NUEVO", "NUEVO"]
+    pids = {engine.cache[t].split("|")[1] for texts in CHUNKS for t in texts}
+    assert str(os.getpid()) not in pids and len(pids) > 1
+
+def test_pool_shuts_down_workers():
+    engine = FakeEngine()
+    pool = InferencePool(engine, num_workers=2, intra_op_threads=1)
+    workers = list(pool.pool._pool)
+    assert inference_pool._ENGINE is engine
+    # Un consumidor que abandona el generador a mitad no impide el cierre
+    next(pool.imap_predict_chunks(enumerate(CHUNKS)))
+    pool.close()
+    assert inference_pool._ENGINE is None
+    assert not any(worker.is_alive() for worker in workers)
+
+def test_pool_rejects_gpu_engines():
+    engine = FakeEngine()
+    engine.device = "cuda"
+    with pytest.raises(ValueError):
+        InferencePool(engine)
@@ -0,0 +1,91 @@
+import io
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import kanish_inference
+from kanish_inference import SubmissionWriter, iter_batches, run_inference_pipeline, skip_records
+
+# Registro con un salto de línea entrecomillado: una línea física más que registros
+TEST_CSV = 'id,transliteration\n' + ''.join(
+    f'{i},"a-na\n{i}"\n' if i == 3 else f'{i},a-na {i}\n' for i in range(10))
+
+class FakeEngine:
+    """Motor de ensayo: traduce sin modelo y puede fallar tras n bloques (corte de la ejecución)."""
+    device = "cpu"
+    cache = None
+
+    def __init__(self, fail_after=None, **kwargs):
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def predict_batch(self, texts, batch_size=16):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("corte simulado")
+        return [{'translation': f"to {t.split()[-1]}", 'confidence': 0.9, 'flags': []} for t in texts]
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    test_path = tmp_path / "test.csv"
+    test_path.write_text(TEST_CSV, encoding="utf-8")
+    monkeypatch.setitem(kanish_inference.PATHS, "RAW_TEST", str(test_path))
+    return {"submission_path": str(tmp_path / "submission.csv"), "audit_path": str(tmp_path / "audit.csv"),
+            "checkpoint_path": str(tmp_path / "ckpt.json")}
+
+def test_skip_records_counts_records_across_chunks():
+    chunks = pd.read_csv(io.StringIO(TEST_CSV), chunksize=3)
+    assert pd.concat(skip_records(chunks, 4))['id'].tolist() == list(range(4, 10))
+    assert list(skip_records(pd.read_csv(io.StringIO(TEST_CSV), chunksize=3), 10)) == []
+
+def test_iter_batches_numbers_rows_without_id_from_the_offset():
+    chunks = pd.read_csv(io.StringIO("text\na\nb\nc\n"), chunksize=2)
+    assert [(list(ids), texts) for ids, texts in iter_batches(chunks, offset=7)] == [([7, 8], ["a", "b"]), ([9], ["c"])]
+
+def test_writer_truncates_rows_after_the_checkpoint(paths):
+    writer = SubmissionWriter(**paths, flush_every=2)
+    for i in range(5):
+        writer.write(i, {'translation': f"t{i}", 'confidence': 0.9, 'flags': []})
+    writer.f_sub.flush()
+    writer.f_audit.flush()  # La fila 4 llega a disco pero no al checkpoint
+    with open(paths["checkpoint_path"], encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    assert checkpoint['rows_done'] == 4 and checkpoint['last_id'] == 3
+
+    resumed = SubmissionWriter(**paths, flush_every=2)
+    assert resumed.rows_done == 4
+    resumed.write(4, {'translation': "t4", 'confidence': 0.5, 'flags': ['X']})
+    resumed.close(completed=True)
+    assert pd.read_csv(paths["submission_path"])['id'].tolist() == [0, 1, 2, 3, 4]
+    assert pd.read_csv(paths["audit_path"])['confidence'].tolist()[-1] == 0.5
+
+def test_pipeline_resumes_after_a_crash(paths, monkeypatch):
+    monkeypatch.setattr(kanish_inference, "KanishInferenceEngine", lambda **kw: FakeEngine(fail_after=2))
+    with pytest.raises(RuntimeError):
+        run_inference_pipeline(chunk_size=3, flush_every=1, **paths)
+    assert pd.read_csv(paths["submission_path"])['id'].tolist() == list(range(6))
+
+    monkeypatch.setattr(kanish_inference, "KanishInferenceEngine", FakeEngine)
+    run_inference_pipeline(chunk_size=3, flush_every=1, **paths)
+    df = pd.read_csv(paths["submission_path"])
+    assert df['id'].tolist() == list(range(10))
+    assert df['translation'].tolist()[3] == "to 3"
+    assert not os.path.exists(paths["checkpoint_path"])
+
+def test_failed_start_keeps_the_previous_submission(paths, monkeypatch):
+    with open(paths["submission_path"], "w", encoding="utf-8") as f:
+        f.write("id,translation\n0,anterior\n")
+
+    def broken_engine(**kwargs):
+        raise OSError("modelo no encontrado")
+    monkeypatch.setattr(kanish_inference, "KanishInferenceEngine", broken_engine)
+    with pytest.raises(OSError):
+        run_inference_pipeline(**paths)
+    monkeypatch.setitem(kanish_inference.PATHS, "RAW_TEST", paths["submission_path"] + ".missing")
+    run_inference_pipeline(**paths)
+
+    with open(paths["submission_path"], encoding="utf-8") as f:
+        assert f.read() == "id,translation\n0,anterior\n"
+    assert not os.path.exists(paths["checkpoint_path"])
@@ -0,0 +1,36 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+import main_pipeline
+
+# Línea real de train.csv: "um-ma" y "qí-bi-ma" son formas completas del léxico
+TABLET = ("um-ma i-tur₄-DINGIR-ma a-na en-um-a-šur ù a-lá-ḫi-im qí-bi-ma [x x] "
+          "a-pu-tum a-pu-tum ra-ma-ku-nu za-ki-a-ma")
+
+@pytest.fixture(scope="module")
+def engines(cipher):
+    main_pipeline.init_engines(cipher, os.path.join(ROOT, "OA_Lexicon_eBL.csv"))
+
+def test_refinement_keeps_clitic_forms_for_the_parser(engines):
+    assert main_pipeline._REFINERY.refine(TABLET).split()[:7] == TABLET.split()[:7]
+    [(row_id, source, translation, trace)] = main_pipeline._translate_chunk([(7, "train.csv", TABLET)])
+    trace = json.loads(trace)
+    assert (row_id, source) == (7, "train.csv")
+    assert trace[:8] == [["umma", "WORD"], ["Itūr-ilī-ma", "PERSON"], ["ana", "WORD"], ["Ennum-Aššur", "PERSON"],
+                         ["u", "WORD"], ["Al-aḫim", "PERSON"], ["qibima", "WORD"], ["[...]", "CORRUPT"]]
+    assert "umma" in translation and "qibima" in translation
+
+def test_pipeline_writes_rows_in_input_order(engines, tmp_path, cipher_path, monkeypatch):
+    csv_path = tmp_path / "test.csv"
+    csv_path.write_text("id,transliteration\n" + "".join(f"{i},{TABLET}\n" for i in range(10)), encoding="utf-8")
+    out = tmp_path / "out.csv"
+    main_pipeline.run_sdic_g_system([str(csv_path)], str(out), workers=2, chunk_size=3,
+                                    cipher_path=cipher_path, lexicon_path=os.path.join(ROOT, "OA_Lexicon_eBL.csv"),
+                                    max_inflight=2)
+    df = pd.read_csv(out)
+    assert df["id"].tolist() == list(range(10))
+    assert (df["source"] == "test.csv").all()
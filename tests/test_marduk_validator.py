@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+from marduk_validator import FLAG_MISSING_ENTITY, MardukValidator, PatternAutomaton
+
+@pytest.fixture(scope="module")
+def pairs(train_sample):
+    df = pd.read_csv(train_sample)
+    sources = df["transliteration"].tolist()
+    translations = df["translation"].tolist()
+    # Traducciones degradadas (sin cifras, sin mercancías, alucinadas) y filas repetidas
+    sources += sources[:6] + ["KÙ.BABBAR 5 ma-na", "", "TÚG 2"]
+    translations += ["", "the son", "10 minas of tin", translations[3], "x " * 500, translations[5],
+                     "5 minas of silver", "", "two"]
+    return sources, translations
+
+@pytest.mark.parametrize("ontology", [None, "kanish_brain_frozen.json"])
+def test_validate_batch_matches_validate(pairs, ontology, tmp_path):
+    if ontology:
+        # Copia: la primera carga deja el snapshot .graph junto al JSON
+        shutil.copy(os.path.join(ROOT, ontology), tmp_path / ontology)
+    marduk = MardukValidator(str(tmp_path / ontology) if ontology else None)
+    sources, translations = pairs
+    report = marduk.validate_batch(sources, translations)
+    for row, (src, trg) in enumerate(zip(sources, translations)):
+        confidence, warnings = marduk.validate(src, trg)
+        assert report["confidence"].iat[row] == confidence, (src, trg)
+        assert report["missing_numbers"].iat[row] == sum(w.startswith("MISSING_NUMBER_") for w in warnings)
+        entities = [w for w in warnings if w.startswith("MISSING_ENTITY_")]
+        assert marduk.flag_names(report["flag_bits"].iat[row], report["entity_mask"].iat[row]) == \
+            (["MISSING_NUMBER"] if report["missing_numbers"].iat[row] else []) + entities + \
+            [w for w in warnings if w == "POSSIBLE_HALLUCINATION_LENGTH"]
+
+def test_missing_entity_flag():
+    marduk = MardukValidator()
+    report = marduk.validate_batch(["KÙ.BABBAR", "KÙ.BABBAR"], ["the silver", "the gold"])
+    assert report["flag_bits"].tolist() == [0, FLAG_MISSING_ENTITY]
+    assert marduk.flag_names(report["flag_bits"].iat[1], report["entity_mask"].iat[1]) == ["MISSING_ENTITY_KÙ.BABBAR"]
+
+def test_num_map_is_kept_for_compatibility():
+    num_map = MardukValidator().num_map
+    assert {n: num_map[n] for n in ('1', '2', '3', '5', '10')} == \
+        {'1': 'one', '2': 'two', '3': 'three', '5': 'five', '10': 'ten'}
+
+def test_validate_batch_aligns_translations_by_position():
+    marduk = MardukValidator()
+    sources = pd.Series(["KÙ.BABBAR 5 ma-na", "TÚG 2"], index=[10, 11])
+    report = marduk.validate_batch(sources, pd.Series(["5 minas of silver", "two textiles"], index=[1, 0]))
+    assert report.index.tolist() == [10, 11]
+    assert report["flag_bits"].tolist() == [0, 0]
+
+@pytest.mark.parametrize("min_patterns", [0, 1000])
+def test_find_matrix_matches_find(min_patterns):
+    automaton = PatternAutomaton(["silver", "tin", "sil", "lead"], min_patterns=min_patterns)
+    texts = ["silver and tin", "", "lead", "the silversmith", "nothing"]
+    matrix = automaton.find_matrix(texts)
+    assert [set(np.flatnonzero(row)) for row in matrix] == [automaton.find(t) for t in texts]
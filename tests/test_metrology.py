@@ -0,0 +1,68 @@
+from fractions import Fraction
+
+import pytest
+
+from metrology import canonical_number, missing_quantities, parse_english, parse_source
+
+@pytest.mark.parametrize("literal, value", [
+    ("0.33333", Fraction(1, 3)),
+    ("1.3333300000000001", Fraction(4, 3)),
+    ("0.83333", Fraction(5, 6)),
+    ("13.5", Fraction(27, 2)),
+    ("7", Fraction(7)),
+])
+def test_canonical_number(literal, value):
+    assert canonical_number(literal) == value
+
+@pytest.mark.parametrize("text, expected", [
+    # Pesos compuestos en orden descendente -> siclos
+    ("18 GÚ 6 ma-na", [("18 GÚ 6 ma-na", 18 * 3600 + 6 * 60, True, 2)]),
+    ("2 ma-na 13.5 GÍN", [("2 ma-na 13.5 GÍN", Fraction(267, 2), True, 2)]),
+    ("0.33333 ma-na 2 GÍN", [("0.33333 ma-na 2 GÍN", 22, True, 2)]),
+    ("1.5 GÍN.TA a-na 1 ma-na-im", [("1.5 GÍN.TA", Fraction(3, 2), True, 1), ("1 ma-na-im", 60, True, 1)]),
+    # Unidad no descendente: dos cantidades
+    ("2 GÍN 1 ma-na", [("2 GÍN", 2, True, 1), ("1 ma-na", 60, True, 1)]),
+    # Multiplicadores
+    ("2 me-at TÚG", [("2 me-at", 200, False, 1)]),
+    ("3 li-im", [("3 li-im", 3000, False, 1)]),
+    # Números sueltos; "SIG5" o "ITU.1.KAM" no son cifras
+    ("1 TÚG SIG5 ITU.1.KAM 4", [("1", 1, False, 1), ("4", 4, False, 1)]),
+    ("", []),
+])
+def test_parse_source(text, expected):
+    assert [tuple(q) for q in parse_source(text)] == expected
+
+@pytest.mark.parametrize("text, weights, numbers", [
+    ("2 minas 13.5 shekels", {120, Fraction(27, 2), Fraction(267, 2)}, {2, Fraction(27, 2)}),
+    ("twenty-two shekels", {22}, {22}),
+    ("two thirds of a mina", {40}, {Fraction(2, 3)}),
+    ("1½ minas", {90}, {Fraction(3, 2)}),
+    ("1 and 1/2 minas", {90}, {Fraction(3, 2)}),
+    ("one and a half minas", {90}, {Fraction(3, 2)}),
+    ("half a mina", {30}, {Fraction(1, 2)}),
+    ("a third of a mina", {20}, {Fraction(1, 3)}),
+    ("one hundred and five", set(), {105}),
+    # Artículo sin número: una unidad
+    ("a mina of silver", {60}, set()),
+    ("an ox and a talent", {3600}, set()),
+    ("1/2 shekel per mina", {Fraction(1, 2), 60}, {Fraction(1, 2)}),
+    ("a textile for 5 shekels", {5}, {5}),
+])
+def test_parse_english(text, weights, numbers):
+    found_weights, _, found_numbers = parse_english(text)
+    assert found_weights == weights
+    assert found_numbers == numbers
+
+@pytest.mark.parametrize("source, translation, missing", [
+    ("0.33333 ma-na 2 GÍN KÙ.BABBAR", "22 shekels of silver", []),
+    ("0.33333 ma-na 2 GÍN KÙ.BABBAR", "1/3 mina 2 shekels of silver", []),
+    ("1 ma-na KÙ.BABBAR", "a mina of silver", []),
+    ("1.5 GÍN.TA a-na 1 ma-na-im", "1½ shekels per mina", []),
+    ("5 ma-na", "5 shekels", ["5 ma-na"]),
+    ("5 ma-na", "5", []),  # una sola unidad: vale el número sin unidad
+    ("2 me-at TÚG", "two hundred textiles", []),
+    ("2 me-at TÚG", "2 textiles", ["2 me-at"]),
+    ("a-na DAM.GÀR", "to the merchant", []),
+])
+def test_missing_quantities(source, translation, missing):
+    assert [q.text for q in missing_quantities(source, translation)] == missing
@@ -0,0 +1,21 @@
+import pytest
+
+neo4j = pytest.importorskip("neo4j")
+
+from ontology_injector import BulkTripletWriter, DryRunDriver, OntologyInjector
+
+def _triplets(n):
+    return [(f"p{i % 7}", "OWES", f"o{i % 3}", f"t{i}", "Commodity") for i in range(n)]
+
+def test_inject_triplets_reports_once(capsys):
+    driver = DryRunDriver()
+    summary = OntologyInjector(driver=driver).inject_triplets(_triplets(25), batch_size=10)
+    assert summary["rows"] == 25 and summary["batches"] == 3
+    assert capsys.readouterr().out.count("tripletas en") == 1
+
+def test_driver_retries_are_counted_without_duplicates():
+    driver = DryRunDriver(fail_every=2)
+    with BulkTripletWriter(driver, batch_size=5) as writer:
+        writer.add_many(_triplets(20))
+    assert [r["tid"] for r in driver.rows] == [f"t{i}" for i in range(20)]
+    assert writer.retries == driver.transactions - writer.batches > 0
@@ -0,0 +1,17 @@
+from reconstructor import SyntacticReconstructor
+
+def test_reorders_subject_verb_object():
+    vector = [
+        {"type": "PERSON", "english": "Puzur-Aššur"},
+        {"type": "OBJ", "english": "silver"},
+        {"type": "PREP", "english": "to"},
+        {"type": "LOC", "english": "Kanesh"},
+        {"status": "QUARANTINE", "token": "UNK_4", "english": "???"},
+        {"type": "VERB_ROOT", "english": "brought"},
+    ]
+    assert SyntacticReconstructor().reconstruct(vector) == "Puzur-aššur brought silver to kanesh ???"
+
+def test_trailing_preposition_and_unknown_types():
+    vector = [{"type": "MISC", "english": "umma"}, {"type": "NUM", "val": "5", "english": "5"},
+              {"type": "PREP", "english": "ana"}]
+    assert SyntacticReconstructor().reconstruct(vector) == "5 ana umma"
@@ -0,0 +1,27 @@
+import pytest
+
+from refinery_engine import PROFILES, RefineryEngine, _corpus, reference_tokenizers
+
+EDGE_CASES = [
+    "",
+    "[x]",
+    "KÙ.BABBAR [...] a-na-kam x x",
+    "<gap> 1.5 GÍN.TA a-na 1 ma-na-im",
+    "(d)UTU-ši ù šu-ma-ma",
+    "  espacios   dobles\t",
+    "iqbi-maxx um-ma [x x] x",
+]
+
+REFERENCES = reference_tokenizers()
+
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_profile_matches_reference(profile, train_sample):
+    """Test dorado: cada perfil reproduce su tokenizador original."""
+    assert profile in REFERENCES, f"tokenizador original de {profile} no importable"
+    engine, reference = RefineryEngine(profile), REFERENCES[profile]
+    for text in _corpus(train_sample) + EDGE_CASES:
+        assert engine.run(text) == reference(text), text
+
+def test_unknown_profile():
+    with pytest.raises((KeyError, ValueError)):
+        RefineryEngine("no-existe")
@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+import pytest
+
+from semantic_hasher import SemanticHasher
+
+@pytest.fixture(scope="module")
+def hasher(cipher_path):
+    return SemanticHasher(cipher_path)
+
+def test_composite_cipher_values_are_factorized(hasher):
+    # KÙ = 50 = 2·5², BABBAR = 959 = 7·137: la huella guarda los factores, no el valor
+    fp = hasher.compute_fingerprint(["KÙ"])
+    assert dict(zip(hasher.slot_primes[fp > 0].tolist(), fp[fp > 0].tolist())) == {2: 1, 5: 2}
+    assert hasher.contains(hasher.compute_fingerprint(["KÙ"]), hasher.compute_fingerprint(["KÙ.BABBAR"]))
+    assert hasher.contains(hasher.compute_fingerprint(["BABBAR"]), hasher.compute_fingerprint(["DUMU"]))
+
+def test_contains_matches_hash_divisibility(hasher):
+    rng = random.Random(7)
+    vocab = list(hasher.cipher) + list(hasher._default_primes) + ["a-na", "UD"]
+    phrases = [[rng.choice(vocab) for _ in range(rng.randint(0, 4))] for _ in range(120)]
+    hashes = [hasher.compute_hash(p) for p in phrases]
+    fingerprints = hasher.fingerprint_batch(phrases)
+    for a, fa in zip(hashes, fingerprints):
+        for b, fb in zip(hashes, fingerprints):
+            assert hasher.contains(fa, fb) == (a % b == 0)
+
+def test_batch_matches_single(hasher):
+    phrases = [["KÙ", "BABBAR", "KÙ"], [], ["UD", "DUMU", "xx"]]
+    assert np.array_equal(hasher.fingerprint_batch(phrases),
+                          np.array([hasher.compute_fingerprint(p) for p in phrases]))
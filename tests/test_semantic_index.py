@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from semantic_hasher import SemanticHasher
+from semantic_index import SemanticIndex
+
+@pytest.fixture(scope="module")
+def corpus(cipher_path):
+    hasher = SemanticHasher(cipher_path)
+    rng = random.Random(11)
+    vocab = list(hasher.cipher) + list(hasher._default_primes) + ["a-na", "i-šu"]
+    token_lists = [[rng.choice(vocab) for _ in range(rng.randint(0, 8))] for _ in range(300)]
+    ids = [f"t{i}" for i in range(len(token_lists))]
+    return hasher, SemanticIndex(hasher).build(token_lists, ids), token_lists, ids
+
+@pytest.mark.parametrize("query", [["KÙ.BABBAR"], ["KÙ"], ["BABBAR", "DUMU"], ["TÚG", "TÚG"], [], ["a-na"]])
+def test_contains_matches_hash_divisibility(corpus, query):
+    hasher, index, token_lists, ids = corpus
+    q_hash = hasher.compute_hash(query)
+    expected = [i for i, tokens in zip(ids, token_lists) if hasher.compute_hash(tokens) % q_hash == 0]
+    assert index.contains(query) == expected
+
+def test_top_k_scores_are_sorted(corpus):
+    _, index, _, _ = corpus
+    top = index.top_k(["KÙ", "BABBAR"], k=5)
+    assert len(top) == 5
+    assert [s for _, s in top] == sorted((s for _, s in top), reverse=True)
+
+def test_save_and_load_roundtrip(corpus, tmp_path):
+    hasher, index, _, _ = corpus
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = SemanticIndex.load(path, hasher)
+    assert loaded.contains(["KÙ"]) == index.contains(["KÙ"])
+    with pytest.raises(ValueError):
+        SemanticIndex.load(path, SemanticHasher(str(tmp_path / "missing.json")))
@@ -0,0 +1,101 @@
+# src/translation_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+
+class TranslationCache:
+    """
+    Memoria de Traducciones (Translation Memory) local.
+    Nivel 1: LRU en RAM. Nivel 2: SQLite en disco (sobrevive entre ejecuciones).
+    La clave combina el texto normalizado + huella del modelo + parámetros de generación,
+    así un checkpoint nuevo o un cambio de beams nunca reutiliza traducciones viejas.
+    """
+    def __init__(self, db_path="cache/kanish_translations.sqlite", max_memory_items=20000):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translation TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(text):
+        """Normalización de la clave: Unicode NFC + espacios colapsados."""
+        return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', str(text))).strip()
+
+    @staticmethod
+    def fingerprint(*parts):
+        """Huella estable (sha256) de cualquier combinación de valores serializables."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def make_key(self, text, model_fingerprint):
+        return self.fingerprint(self.normalize(text), model_fingerprint)
+
+    def _remember(self, key, translation):
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Devuelve {key: traducción} para las claves encontradas (RAM primero, luego disco)."""
+        found = {}
+        pending = []
+        for key in dict.fromkeys(keys):
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                found[key] = self.memory[key]
+            else:
+                pending.append(key)
+
+        # SQLite limita el número de parámetros por consulta: consultamos en bloques
+        for start in range(0, len(pending), 500):
+            block = pending[start:start + 500]
+            placeholders = ",".join("?" * len(block))
+            rows = self.conn.execute(
+                f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", block
+            )
+            for key, translation in rows:
+                found[key] = translation
+                self._remember(key, translation)
+
+        for key in keys:
+            if key in found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def put_many(self, items):
+        """Guarda pares (key, traducción) en RAM y en disco."""
+        items = list(items)
+        for key, translation in items:
+            self._remember(key, translation)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)", items
+        )
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_items": len(self.memory)
+        }
+
+    def close(self):
+        self.conn.close()